@@ -0,0 +1,428 @@
+"""가짜 디스코드 전송 계층으로 스케줄러의 부하와 지연을 측정하는 벤치마크
+
+main.py의 실제 디스패처와 명령어 핸들러를 가상 시계 위에서 실행하므로 일주일 분량의
+실행도 몇 초 안에 끝납니다. 결과는 JSON으로 저장해 버전끼리 비교할 수 있습니다.
+
+    python bench.py --sizes 1000 10000 100000 --output bench.json
+    python bench.py --sizes 1000 --compare bench.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import discord
+
+COMMANDS = ("list", "info", "update", "delete", "export", "create", "import")
+
+
+def percentile(values, q):
+    """정렬하지 않은 값 목록의 q 분위수를 계산합니다"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def summarize(values, scale=1000):
+    """값 목록을 밀리초 단위 분위수로 요약합니다"""
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 50) * scale, 3),
+        "p90": round(percentile(values, 90) * scale, 3),
+        "p99": round(percentile(values, 99) * scale, 3),
+        "max": round(max(values, default=0) * scale, 3),
+    }
+
+
+class VirtualClock:
+    """벤치마크가 직접 앞으로 돌리는 가상 시계"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+
+
+class FakeChannel:
+    """전송 지연과 429 응답을 흉내 내는 채널"""
+
+    def __init__(self, transport, channel_id, guild):
+        self.transport = transport
+        self.id = channel_id
+        self.guild = guild
+        self.name = f"channel-{channel_id}"
+        self.mention = f"<#{channel_id}>"
+
+    async def send(self, content=None, **kwargs):
+        transport = self.transport
+        transport.lateness.append(time.perf_counter() - transport.tick_started)
+        if transport.rate_limit_rate and transport.random.random() < transport.rate_limit_rate:
+            # discord.py처럼 경고를 남기고 retry_after만큼 기다린 뒤 다시 보냄
+            transport.rate_limited += 1
+            logging.getLogger("discord.http").warning(
+                "We are being rate limited. %s %s responded with 429. Retrying in %.2f seconds.",
+                "POST", f"/channels/{self.id}/messages", transport.retry_after)
+            await asyncio.sleep(transport.retry_after)
+        if transport.send_latency:
+            await asyncio.sleep(transport.send_latency)
+        transport.sends += 1
+
+
+class FakeTransport:
+    """bot.get_channel을 대신하는 가짜 채널 모음"""
+
+    def __init__(self, send_latency=0.0, rate_limit_rate=0.0, retry_after=0.05, seed=0):
+        self.channels = {}
+        self.send_latency = send_latency
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.sends = 0
+        self.rate_limited = 0
+        self.lateness = []  # 실행 시각부터 send 호출까지 걸린 시간
+        self.tick_started = time.perf_counter()
+
+    def add_channel(self, channel_id, guild):
+        self.channels[channel_id] = FakeChannel(self, channel_id, guild)
+        return self.channels[channel_id]
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.display_name = f"user-{user_id}"
+        self.avatar = None
+        self.mention = f"<@{user_id}>"
+
+
+class FakeResponse:
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, *args, **kwargs):
+        self.messages.append(kwargs)
+
+    async def send_modal(self, modal):
+        self.messages.append({"modal": modal})
+
+    async def edit_message(self, *args, **kwargs):
+        self.messages.append(kwargs)
+
+    async def defer(self, *args, **kwargs):
+        pass
+
+
+class FakeFollowup:
+    def __init__(self, response):
+        self.response = response
+
+    async def send(self, *args, **kwargs):
+        self.response.messages.append(kwargs)
+
+
+class FakeInteraction:
+    def __init__(self, guild_id, user_id):
+        self.guild_id = guild_id
+        self.guild = None
+        self.user = FakeUser(user_id)
+        self.response = FakeResponse()
+        self.followup = FakeFollowup(self.response)
+
+
+def fill_modal(modal, **values):
+    """모달의 입력 값을 채웁니다"""
+    for name, value in values.items():
+        getattr(modal, name)._value = value
+    return modal
+
+
+async def populate(main, transport, args, size, start, rng):
+    """여러 서버/사용자/채널에 걸친 가상 스케줄을 만듭니다"""
+    guilds = max(1, min(args.guilds, size))
+    owners = []
+    for g in range(guilds):
+        guild_id = (g + 1) << 22
+        guild = FakeGuild(guild_id)
+        for c in range(args.channels_per_guild):
+            transport.add_channel(guild_id + c + 1, guild)
+
+    intervals = [(3600, 0.1), (86400, 0.6), (7 * 86400, 0.3)]
+    first_hour = start - start % 3600 + 3600
+    hot_guilds = min(args.hot_channels, guilds)
+    for i in range(size):
+        guild_id = (i % guilds + 1) << 22
+        user_id = 10 ** 6 + rng.randrange(args.users_per_guild)
+        interval = rng.choices([value for value, _ in intervals], [weight for _, weight in intervals])[0]
+        channel_id = guild_id + rng.randrange(args.channels_per_guild) + 1
+        date = start + rng.randrange(interval)
+        if hot_guilds and rng.random() < args.hot_share:
+            # 인기 있는 시각(정각, 30분)에 몇몇 채널로 몰리는 스케줄: 합쳐 보내기와 한도 경로를 실제로 거침
+            guild_id = (rng.randrange(hot_guilds) + 1) << 22
+            channel_id = guild_id + 1
+            date = first_hour + rng.randrange(max(1, interval // 3600)) * 3600 + rng.choice((0, 1800))
+        schedule = await main.store.add(
+            server=guild_id,
+            channel=channel_id,
+            message=f"알림 {i % 100}",
+            user=user_id,
+            date=date,
+            interval=interval
+        )
+        main.reschedule(schedule)
+        owners.append((guild_id, user_id, schedule['id']))
+    await main.store.commit()
+    return owners
+
+
+async def simulate(main, clock, transport, args, start):
+    """가상 시계를 돌리며 정해진 기간 동안의 실행을 처리합니다"""
+    end = start + args.days * 86400
+    windowed = main.dispatch_until is not None
+    next_fill = start
+    ticks = []
+    while True:
+        next_due = main.dispatcher.next_time()
+        if windowed and next_fill <= end and (next_due is None or next_fill < next_due):
+            clock.now = next_fill
+            await main.extend_dispatch_window()
+            next_fill += max(1, main.DISPATCH_WINDOW // 2)
+            continue
+        if next_due is None or next_due > end:
+            return ticks
+
+        clock.now = max(clock.now, next_due)
+        transport.tick_started = time.perf_counter()
+        count = await main.dispatch_due(int(clock.now))
+        await main.send_queue.join()  # 꺼낸 작업이 모두 전송될 때까지를 한 틱으로 잼
+        ticks.append((time.perf_counter() - transport.tick_started, count))
+
+
+async def bench_commands(main, transport, owners, rng, samples, start):
+    """명령어 핸들러별 지연 시간을 측정합니다"""
+    timings = {name: [] for name in COMMANDS}
+    target = datetime.datetime.fromtimestamp(start + 30 * 86400)
+
+    async def timed(name, coro):
+        started = time.perf_counter()
+        await coro
+        timings[name].append(time.perf_counter() - started)
+
+    for _ in range(samples):
+        guild_id, user_id, schedule_id = rng.choice(owners)
+        channel = transport.get_channel(guild_id + 1)
+
+        await timed("list", main.list_schedules.callback(FakeInteraction(guild_id, user_id)))
+        await timed("info", main.schedule_info.callback(FakeInteraction(guild_id, user_id), schedule_id))
+        await timed("update", main.update_schedule.callback(FakeInteraction(guild_id, user_id), schedule_id,
+                                                            message="수정된 알림"))
+        await timed("export", main.export_schedules.callback(FakeInteraction(guild_id, user_id)))
+
+        modal = fill_modal(main.ScheduleCreateModal(channel), message="새 알림",
+                           date=target.strftime("%Y-%m-%d"), time=target.strftime("%H:%M"), interval="60")
+        await timed("create", modal.on_submit(FakeInteraction(guild_id, user_id)))
+
+        rows = [{"channel": channel.id, "message": "가져온 알림", "date": start + 30 * 86400,
+                 "interval": 3600, "last": 0} for _ in range(5)]
+        modal = fill_modal(main.ImportScheduleModal(), json_content=json.dumps({"schedules": rows}),
+                           overwrite="add")
+        await timed("import", modal.on_submit(FakeInteraction(guild_id, user_id)))
+
+        await timed("delete", main.delete_schedule.callback(FakeInteraction(guild_id, user_id), schedule_id))
+        owners.remove((guild_id, user_id, schedule_id))
+        if not owners:
+            break
+    return timings
+
+
+def run_size(size, args):
+    """새 프로세스에서 main.py를 불러와 한 규모의 벤치마크를 실행합니다"""
+    os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="scheduler-bench-")
+    os.environ["STORAGE_BACKEND"] = args.storage
+    if args.coalesce:
+        os.environ["COALESCE_GUILDS"] = "*"
+    os.environ["LOG_FLUSH_INTERVAL"] = "0"  # 가상 시계에서는 모으는 대기 시간 없이 바로 기록
+    sys.stdout = open(os.devnull, "w")  # 실행마다 찍히는 로그는 버림
+
+    import main
+
+    async def run():
+        rng = random.Random(args.seed)
+        start = int(time.time()) + 60
+        clock = VirtualClock(start)
+        transport = FakeTransport(args.send_latency, args.rate_limit_rate, args.retry_after, args.seed)
+        main.dispatcher.clock = clock
+        main.bot.get_channel = transport.get_channel
+        if main.schedule_log:
+            main.schedule_log.start()
+
+        started = time.perf_counter()
+        owners = await populate(main, transport, args, size, start, rng)
+        populate_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        ticks = await simulate(main, clock, transport, args, start)
+        simulate_seconds = time.perf_counter() - started
+
+        timings = await bench_commands(main, transport, owners, rng, min(args.samples, size), start)
+        return {
+            "size": size,
+            "storage": args.storage,
+            "hot_share": args.hot_share,
+            "populate_seconds": round(populate_seconds, 3),
+            "simulated_days": args.days,
+            "simulate_seconds": round(simulate_seconds, 3),
+            "ticks": len(ticks),
+            "sends": transport.sends,
+            "rate_limited": transport.rate_limited,
+            "tick_duration_ms": summarize([duration for duration, _ in ticks]),
+            "max_due_per_tick": max((count for _, count in ticks), default=0),
+            "lateness_ms": summarize(transport.lateness),
+            "commands_ms": {name: summarize(values) for name, values in timings.items()},
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+
+    return asyncio.run(run())
+
+
+def measure_record_size(count):
+    """dict와 Schedule 레코드의 스케줄당 메모리 사용량을 측정합니다"""
+    from store import Schedule, ScheduleStore
+
+    def rows():
+        for i in range(count):
+            guild_id = (i % 500 + 1) << 22
+            yield {'id': i + 1, 'server': guild_id, 'channel': guild_id + i % 5 + 1,
+                   'message': f"알림 {i % 100}", 'user': 10 ** 17 + i % 25000,
+                   'date': 1_700_000_000 + i, 'interval': 86400, 'last': 0}
+
+    def measure(build):
+        tracemalloc.start()
+        kept = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del kept
+        return round(size / count, 1)
+
+    result = {
+        "count": count,
+        "dict_bytes": measure(lambda: list(rows())),
+        "slots_bytes": measure(lambda: [Schedule.from_dict(row) for row in rows()]),
+    }
+
+    def build_store():
+        store = ScheduleStore()
+        store.restore(rows())
+        return store
+
+    result["store_bytes"] = measure(build_store)
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(baseline, current):
+    """두 결과 파일의 주요 지표를 비교해 출력합니다"""
+    base = {result["size"]: result for result in baseline["results"]}
+    for result in current["results"]:
+        old = base.get(result["size"])
+        if not old:
+            continue
+        print(f"[{result['size']}개] {baseline['meta']['revision']} -> {current['meta']['revision']}")
+        metrics = [("틱 p99", "tick_duration_ms", "p99"), ("지연 p99", "lateness_ms", "p99")]
+        metrics += [(f"/{name} p99", "commands_ms", name) for name in COMMANDS]
+        for label, section, key in metrics:
+            before, after = old[section][key], result[section][key]
+            if isinstance(before, dict):
+                before, after = before["p99"], after["p99"]
+            change = (after - before) / before * 100 if before else 0.0
+            print(f"  {label}: {before:.2f}ms -> {after:.2f}ms ({change:+.1f}%)")
+        print(f"  최대 RSS: {old['peak_rss_mb']}MB -> {result['peak_rss_mb']}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="스케줄러 부하/지연 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--storage", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--guilds", type=int, default=500)
+    parser.add_argument("--users-per-guild", type=int, default=50)
+    parser.add_argument("--channels-per-guild", type=int, default=5)
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--samples", type=int, default=200, help="명령어별 측정 횟수")
+    parser.add_argument("--send-latency", type=float, default=0.0, help="가짜 전송 지연 (초)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="429 응답 비율")
+    parser.add_argument("--retry-after", type=float, default=0.05, help="429 응답 후 대기 시간 (초)")
+    parser.add_argument("--coalesce", action="store_true", help="같은 채널 메시지를 합쳐 보내기")
+    parser.add_argument("--hot-share", type=float, default=0.0,
+                        help="정각/30분에 몇몇 채널로 몰리게 만들 스케줄 비율 (0~1)")
+    parser.add_argument("--hot-channels", type=int, default=3, help="몰리는 스케줄이 쓸 채널 수 (서버마다 하나)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="결과를 저장할 JSON 파일")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON 파일")
+    parser.add_argument("--record-size", type=int, metavar="N",
+                        help="N개 스케줄의 레코드당 메모리 사용량만 측정")
+    args = parser.parse_args()
+
+    if args.record_size:
+        result = measure_record_size(args.record_size)
+        print(f"스케줄 {result['count']}개: dict {result['dict_bytes']}B, "
+              f"__slots__ {result['slots_bytes']}B, 인덱스 포함 저장소 {result['store_bytes']}B (스케줄당)")
+        return
+
+    import multiprocessing
+
+    context = multiprocessing.get_context("spawn")  # 규모마다 main.py 상태와 RSS를 새로 측정
+    results = []
+    for size in args.sizes:
+        with context.Pool(1) as pool:
+            result = pool.apply(run_size, (size, args))
+        results.append(result)
+        print(f"[{size}개] 틱 p99 {result['tick_duration_ms']['p99']}ms, "
+              f"지연 p99 {result['lateness_ms']['p99']}ms, 전송 {result['sends']}회, "
+              f"시뮬레이션 {result['simulate_seconds']}초, 최대 RSS {result['peak_rss_mb']}MB")
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "discord.py": discord.__version__,
+            "date": datetime.datetime.now().isoformat(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+from collections import OrderedDict, defaultdict
+
+
+class LRUCache:
+    """크기가 제한된 LRU 캐시 (태그 단위로 한 번에 무효화할 수 있음)"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = OrderedDict()  # 키 -> (태그, 값)
+        self._tags = defaultdict(set)  # 태그 -> 키 목록
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        """값을 꺼내고 가장 최근에 쓴 항목으로 표시합니다"""
+        entry = self._items.get(key)
+        if entry is None:
+            return default
+        self._items.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, value, tag=None):
+        """값을 저장하고 크기를 넘으면 가장 오래된 항목을 버립니다"""
+        if key in self._items:
+            self._remove(key)
+        self._items[key] = (tag, value)
+        if tag is not None:
+            self._tags[tag].add(key)
+        while len(self._items) > self.maxsize:
+            self._remove(next(iter(self._items)))
+
+    def invalidate(self, tag):
+        """태그에 속한 항목을 모두 버립니다"""
+        for key in self._tags.pop(tag, ()):
+            del self._items[key]
+
+    def discard(self, key):
+        """항목 하나를 버립니다"""
+        if key in self._items:
+            self._remove(key)
+
+    def clear(self):
+        self._items.clear()
+        self._tags.clear()
+
+    def _remove(self, key):
+        tag, _ = self._items.pop(key)
+        if tag is not None:
+            keys = self._tags[tag]
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
@@ -0,0 +1,305 @@
+import asyncio
+import heapq
+import time
+from collections import deque
+
+
+class Dispatcher:
+    """다음 실행 시각 순으로 스케줄을 관리하는 최소 힙 디스패처"""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._heap = []  # (실행 시각, 키) - 변경/취소된 항목은 꺼낼 때 버림
+        self._entries = {}  # 키 -> (실행 시각, 항목)
+        self._running = {}  # 꺼내진 뒤 아직 완료되지 않은 키 -> 항목
+        self._wakeup = asyncio.Event()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def schedule(self, key, when, item=None):
+        """항목의 실행 시각을 등록하거나 변경합니다 (O(log n))"""
+        self._running.pop(key, None)
+        current = self._entries.get(key)
+        self._entries[key] = (when, item)
+        if current is not None and current[0] == when:
+            return
+
+        heapq.heappush(self._heap, (when, key))
+        if self._heap[0] == (when, key):
+            # 가장 이른 실행 시각이 바뀌었으므로 대기 중인 루프를 깨움
+            self._wakeup.set()
+        self._maybe_compact()
+
+    def load(self, entries):
+        """(키, 실행 시각, 항목) 목록을 한 번에 등록합니다 (O(n))"""
+        for key, when, item in entries:
+            self._entries[key] = (when, item)
+        self._heap = [(when, key) for key, (when, _) in self._entries.items()]
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def cancel(self, key):
+        """항목을 실행 대기열에서 제거합니다"""
+        self._running.pop(key, None)
+        if self._entries.pop(key, None) is not None:
+            self._maybe_compact()
+
+    def clear(self):
+        """모든 항목을 제거합니다"""
+        self._heap.clear()
+        self._entries.clear()
+        self._running.clear()
+        self._wakeup.set()
+
+    def next_time(self):
+        """가장 이른 실행 시각을 반환합니다 (없으면 None)"""
+        self._prune()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """실행 시각이 된 항목들을 (키, 실행 시각, 항목) 목록으로 꺼냅니다"""
+        due = []
+        while True:
+            self._prune()
+            if not self._heap or self._heap[0][0] > now:
+                return due
+            when, key = heapq.heappop(self._heap)
+            _, item = self._entries.pop(key)
+            self._running[key] = item
+            due.append((key, when, item))
+
+    def complete(self, key, when=None, item=None):
+        """꺼낸 항목의 처리를 마치고 필요하면 다음 실행 시각을 등록합니다
+
+        처리 중에 항목이 변경되거나 취소되었다면 아무것도 하지 않습니다.
+        item을 주지 않으면 꺼낼 때의 항목을 그대로 등록합니다.
+        """
+        if key not in self._running:
+            return
+        popped = self._running.pop(key)
+        if when is not None:
+            self.schedule(key, when, popped if item is None else item)
+
+    async def wait_due(self):
+        """가장 이른 항목의 실행 시각까지 대기합니다"""
+        while True:
+            self._wakeup.clear()
+            next_time = self.next_time()
+            if next_time is None:
+                await self._wakeup.wait()
+                continue
+
+            delay = next_time - self.clock()
+            if delay <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _prune(self):
+        """힙 맨 앞의 무효화된 항목을 버립니다"""
+        heap = self._heap
+        while heap:
+            when, key = heap[0]
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == when:
+                return
+            heapq.heappop(heap)
+
+    def _maybe_compact(self):
+        """무효화된 항목이 너무 많이 쌓이면 힙을 다시 만듭니다"""
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [(when, key) for key, (when, _) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+
+class _ChannelQueue:
+    """SendQueue에서 한 채널에 대기 중인 작업과 보내는 중인 작업 수"""
+
+    __slots__ = ('guild_id', 'jobs', 'active', 'ready')
+
+    def __init__(self, guild_id):
+        self.guild_id = guild_id
+        self.jobs = deque()  # (작업, 묶음)
+        self.active = 0  # 보내는 중인 작업 수
+        self.ready = False  # 보낼 수 있는 채널 목록에 들어 있는지 여부
+
+
+class SendQueue:
+    """실행 루프가 넘겨준 (서버, 채널, 작업)을 계속 도는 워커들이 전송하는 대기열
+
+    워커는 concurrency개로 고정되어 있고 채널마다 channel_concurrency개까지만 동시에 보내며,
+    보낼 수 있는 채널을 서버별로, 서버 안에서는 채널별로 번갈아 꺼냅니다. 작업이 많은 서버가 있어도
+    다른 서버의 작업은 서버 수만큼의 순서 안에 처리되고, 느리거나 429로 기다리는 채널은 그 채널의
+    작업만 늦춥니다. 실행 루프는 전송이 끝나기를 기다리지 않고 다음 실행 시각을 기다립니다.
+    """
+
+    def __init__(self, send, concurrency, channel_concurrency=1):
+        self.send = send
+        self.concurrency = concurrency
+        self.channel_concurrency = channel_concurrency
+        self._channels = {}  # 채널 ID -> _ChannelQueue (대기 중이거나 보내는 중인 작업이 있는 채널)
+        self._ready = {}  # 서버 ID -> 지금 보낼 수 있는 채널 ID deque (dict 순서대로 서버를 번갈아 꺼냄)
+        self._pending = 0  # 대기 중이거나 보내는 중인 작업 수
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._workers = []
+
+    def __len__(self):
+        return self._pending
+
+    def submit(self, jobs):
+        """(서버, 채널, 작업) 목록을 대기열에 넣고 모두 처리되면 완료되는 Future를 반환합니다"""
+        done = asyncio.get_running_loop().create_future()
+        if not jobs:
+            done.set_result(None)
+            return done
+        if not self._workers:
+            self._workers = [asyncio.ensure_future(self._work()) for _ in range(self.concurrency)]
+        batch = [len(jobs), done]  # [남은 작업 수, Future]
+        for guild_id, channel_id, job in jobs:
+            channel = self._channels.get(channel_id)
+            if channel is None:
+                channel = self._channels[channel_id] = _ChannelQueue(guild_id)
+            channel.jobs.append((job, batch))
+            self._make_ready(channel_id, channel)
+        self._pending += len(jobs)
+        self._idle.clear()
+        return done
+
+    async def join(self):
+        """대기열의 작업이 모두 처리될 때까지 기다립니다"""
+        await self._idle.wait()
+
+    async def close(self):
+        """아직 시작하지 않은 작업은 버리고 보내는 중인 작업이 끝나면 워커를 멈춥니다"""
+        for channel in self._channels.values():
+            channel.ready = False
+            while channel.jobs:
+                _, batch = channel.jobs.popleft()
+                self._done(batch)
+        self._ready.clear()
+        await self.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _make_ready(self, channel_id, channel):
+        """채널에 보낼 작업이 있고 동시 전송 수에 여유가 있으면 보낼 수 있는 채널 목록 맨 뒤에 넣습니다"""
+        if channel.ready or not channel.jobs or channel.active >= self.channel_concurrency:
+            return
+        channel.ready = True
+        self._ready.setdefault(channel.guild_id, deque()).append(channel_id)
+        self._wakeup.set()
+
+    def _take(self):
+        """다음 서버의 다음 채널에서 작업 하나를 꺼냅니다 (보낼 작업이 없으면 None)"""
+        if not self._ready:
+            return None
+        guild_id = next(iter(self._ready))
+        channels = self._ready.pop(guild_id)
+        channel_id = channels.popleft()
+        if channels:
+            self._ready[guild_id] = channels  # 서버를 맨 뒤로 보냄
+        channel = self._channels[channel_id]
+        channel.ready = False
+        job, batch = channel.jobs.popleft()
+        channel.active += 1
+        self._make_ready(channel_id, channel)  # 남은 작업은 서버 안에서 다른 채널 다음 차례
+        return channel_id, job, batch
+
+    def _finish(self, channel_id, batch):
+        channel = self._channels[channel_id]
+        channel.active -= 1
+        if channel.jobs:
+            self._make_ready(channel_id, channel)
+        elif not channel.active:
+            del self._channels[channel_id]
+        self._done(batch)
+
+    def _done(self, batch):
+        batch[0] -= 1
+        if not batch[0] and not batch[1].done():
+            batch[1].set_result(None)
+        self._pending -= 1
+        if not self._pending:
+            self._idle.set()
+
+    async def _work(self):
+        while True:
+            taken = self._take()
+            if taken is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            channel_id, job, batch = taken
+            try:
+                await self.send(job)
+            except Exception as e:
+                print(f"전송 작업 오류: {e!r}")  # 처리하지 못한 오류로 워커가 줄어들지 않도록
+            finally:
+                self._finish(channel_id, batch)
+
+
+class RateLimiter:
+    """키(서버, 사용자 등)마다 분당 실행 수를 제한하는 토큰 버킷
+
+    버킷은 1분치(rate개)까지 채워지므로 정각의 짧은 몰림은 그대로 보내고, 그 뒤로는 분당 rate개로 제한합니다.
+    """
+
+    def __init__(self, rate, clock=time.time):
+        self.rate = rate  # 분당 실행 수 (0이면 제한하지 않음)
+        self.clock = clock
+        self._buckets = {}  # 키 -> (남은 토큰, 마지막으로 채운 시각)
+        self._compact_at = 1024
+
+    def delay(self, key):
+        """토큰이 생길 때까지 기다려야 할 시간(초)을 반환합니다 (바로 실행할 수 있으면 0)"""
+        if self.rate <= 0:
+            return 0
+        tokens = self._tokens(key, self.clock())
+        return 0 if tokens >= 1 else (1 - tokens) * 60 / self.rate
+
+    def take(self, key):
+        """토큰을 하나 씁니다"""
+        if self.rate <= 0:
+            return
+        now = self.clock()
+        self._buckets[key] = (self._tokens(key, now) - 1, now)
+        if len(self._buckets) > self._compact_at:
+            self._compact(now)
+
+    def _tokens(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.rate, now))
+        return min(self.rate, tokens + (now - updated) * self.rate / 60)
+
+    def _compact(self, now):
+        """다시 가득 찬 버킷은 처음 쓰는 키와 같으므로 버립니다"""
+        self._buckets = {key: (tokens, updated) for key, (tokens, updated) in self._buckets.items()
+                         if now - updated < (self.rate - tokens) * 60 / self.rate}
+        self._compact_at = 2 * len(self._buckets) + 1024
+
+
+def pack_messages(items, text, limit, separator="\n"):
+    """항목들을 separator로 이었을 때 limit자를 넘지 않는 최소한의 묶음으로 나눕니다
+
+    각 항목은 들어갈 자리가 있는 첫 번째 묶음에 넣으며(first-fit), 묶음 안의 순서는 유지합니다.
+    """
+    chunks = []  # [항목 목록, 합친 길이]
+    for item in items:
+        length = len(text(item))
+        for chunk in chunks:
+            if chunk[1] + len(separator) + length <= limit:
+                chunk[0].append(item)
+                chunk[1] += len(separator) + length
+                break
+        else:
+            chunks.append([[item], length])
+    return [chunk_items for chunk_items, _ in chunks]
@@ -0,0 +1,83 @@
+import gzip
+import json
+import tempfile
+
+EXPORT_FIELDS = ('id', 'channel', 'message', 'date', 'interval', 'last', 'disabled', 'rule')
+
+
+def export_row(schedule, include_user=False):
+    """스케줄을 내보내기용 dict로 변환합니다 (민감한 정보 제외)"""
+    row = {field: schedule[field] for field in EXPORT_FIELDS}
+    if include_user:
+        row['user'] = schedule['user']  # 서버 전체 백업은 소유자를 함께 저장
+    return row
+
+
+class ExportWriter:
+    """스케줄을 임시 파일에 조금씩 기록하고 크기 제한에 맞춰 여러 파일로 나누는 작성기
+
+    JSON은 파일마다 {"schedules": [...], "export_info": {...}} 형태이고,
+    NDJSON은 한 줄에 스케줄 하나씩 기록한 뒤 마지막 줄에 export_info를 기록합니다.
+    """
+
+    def __init__(self, info, file_format="json", compress=False, part_size=8 * 1024 * 1024):
+        self.info = info
+        self.file_format = file_format
+        self.compress = compress
+        self.part_size = part_size * 9 // 10  # 압축 버퍼와 꼬리말을 위한 여유
+        self.parts = []  # (임시 파일, 스케줄 수)
+        self.total = 0
+        self._raw = None
+        self._out = None
+        self._count = 0
+
+    def write_rows(self, rows):
+        """스케줄 목록을 현재 파일에 이어서 기록합니다"""
+        for row in rows:
+            if self._out is None:
+                self._open_part()
+            line = json.dumps(row, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            if self.file_format == "json":
+                self._out.write(b"," if self._count else b"")
+                self._out.write(b"\n" + line)
+            else:
+                self._out.write(line + b"\n")
+            self._count += 1
+            self.total += 1
+            if self._raw.tell() >= self.part_size:
+                self._close_part()
+
+    def close(self):
+        """마지막 파일을 닫고 (임시 파일, 스케줄 수) 목록을 반환합니다"""
+        if self._out is not None or not self.parts:
+            if self._out is None:
+                self._open_part()
+            self._close_part()
+        return self.parts
+
+    def filenames(self, basename):
+        """파일마다 붙일 이름 목록을 반환합니다"""
+        extension = self.file_format + (".gz" if self.compress else "")
+        if len(self.parts) == 1:
+            return [f"{basename}.{extension}"]
+        return [f"{basename}_part{i + 1}.{extension}" for i in range(len(self.parts))]
+
+    def _open_part(self):
+        self._raw = tempfile.TemporaryFile()
+        self._out = gzip.GzipFile(fileobj=self._raw, mode='wb') if self.compress else self._raw
+        self._count = 0
+        if self.file_format == "json":
+            self._out.write(b'{"schedules":[')
+
+    def _close_part(self):
+        info = dict(self.info, part=len(self.parts) + 1, schedules_in_part=self._count)
+        info_json = json.dumps(info, ensure_ascii=False).encode('utf-8')
+        if self.file_format == "json":
+            self._out.write(b'\n],"export_info":' + info_json + b'}\n')
+        else:
+            self._out.write(b'{"export_info":' + info_json + b'}\n')
+        if self._out is not self._raw:
+            self._out.close()  # gzip 꼬리말 기록 (임시 파일은 닫지 않음)
+        self._raw.seek(0)
+        self.parts.append((self._raw, self._count))
+        self._raw = self._out = None
@@ -0,0 +1,258 @@
+import gzip
+import io
+import json
+
+from recurrence import compile_rule
+
+REQUIRED_FIELDS = ('channel', 'message', 'date')  # 반복은 interval 또는 rule 중 하나
+MAX_MESSAGE_LENGTH = 2000  # 디스코드 메시지 최대 길이
+
+# 건너뛴 이유
+INVALID_JSON = "잘못된 JSON"
+MISSING_FIELDS = "필수 필드 누락"
+INVALID_VALUE = "잘못된 데이터"
+UNKNOWN_CHANNEL = "채널이 존재하지 않음"
+PAST_DATE = "과거 시간 스케줄"
+QUOTA_EXCEEDED = "스케줄 수 한도 초과"
+
+
+def open_import(data):
+    """업로드된 파일을 텍스트 스트림으로 엽니다 (gzip이면 읽으면서 압축 해제)"""
+    raw = io.BytesIO(data)
+    if data[:2] == b'\x1f\x8b':
+        raw = gzip.GzipFile(fileobj=raw)
+    return io.TextIOWrapper(raw, encoding='utf-8-sig')
+
+
+class _Reader:
+    """스트림에서 필요한 만큼만 읽어가며 JSON 값을 하나씩 해석하는 도구"""
+
+    def __init__(self, stream, chunk_size=1 << 16):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk  # 이미 해석한 부분은 버림
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """공백을 건너뛰고 다음 문자를 반환합니다 (끝이면 빈 문자열)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"올바르지 않은 JSON 구조입니다. ('{char}' 필요)")
+        self.pos += 1
+
+    def line_is_value(self):
+        """현재 줄 전체가 하나의 JSON 값인지 확인합니다 (NDJSON 판별용)"""
+        self.peek()
+        while '\n' not in self.buffer[self.pos:] and self._fill():
+            pass
+        end = self.buffer.find('\n', self.pos)
+        try:
+            json.loads(self.buffer[self.pos:] if end < 0 else self.buffer[self.pos:end])
+        except ValueError:
+            return False
+        return True
+
+    def decode(self):
+        """다음 JSON 값 하나를 해석합니다"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue  # 값이 덜 읽혔으면 더 읽고 다시 시도
+                raise
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue  # 숫자가 청크 경계에서 잘렸을 수 있으므로 다시 확인
+            self.pos = end
+            return value
+
+    def read_line(self):
+        """다음 줄을 읽습니다 (끝이면 None)"""
+        while True:
+            end = self.buffer.find('\n', self.pos)
+            if end >= 0 or not self._fill():
+                break
+        if end < 0:
+            if self.pos >= len(self.buffer):
+                return None
+            end = len(self.buffer)
+        line = self.buffer[self.pos:end]
+        self.pos = end + 1
+        return line
+
+
+def iter_import_rows(stream):
+    """가져올 파일을 조금씩 읽으며 (행 번호, 스케줄 dict 또는 None)을 돌려줍니다
+
+    /export가 만드는 두 형식({"schedules": [...]} JSON, NDJSON)과 이전 형식의 스냅샷과 같은 JSON 배열을 읽습니다.
+    NDJSON에서 해석할 수 없는 줄은 None으로 돌려주고 다음 줄부터 계속 읽습니다.
+    첫 행이 스케줄 필드가 하나도 없는 객체면 스케줄 파일이 아닌 것으로 보고 ValueError를 발생시킵니다.
+    """
+    reader = _Reader(stream)
+    first = reader.peek()
+    if first == '[':
+        yield from _iter_array(reader, 0)
+    elif first == '{' and not reader.line_is_value():
+        yield from _iter_object(reader)
+    elif first:
+        yield from _iter_lines(reader)
+    else:
+        raise ValueError("빈 파일입니다.")
+
+
+def _iter_array(reader, row):
+    reader.expect('[')
+    if reader.peek() == ']':
+        reader.pos += 1
+        return row
+    while True:
+        row += 1
+        yield row, reader.decode()
+        if reader.peek() == ']':
+            reader.pos += 1
+            return row
+        reader.expect(',')
+
+
+def _iter_object(reader):
+    found = False
+    reader.expect('{')
+    while reader.peek() != '}':
+        key = reader.decode()
+        reader.expect(':')
+        if key == "schedules" and reader.peek() == '[':
+            yield from _iter_array(reader, 0)
+            found = True
+        else:
+            reader.decode()  # export_info 등은 읽고 버림
+        if reader.peek() == ',':
+            reader.pos += 1
+    if not found:
+        raise ValueError("올바르지 않은 JSON 구조입니다.")
+
+
+def _iter_lines(reader):
+    row = 0
+    while (line := reader.read_line()) is not None:
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError:
+            value = None
+        if isinstance(value, dict) and "export_info" in value and len(value) == 1:
+            continue  # /export가 마지막 줄에 붙이는 정보
+        if isinstance(value, dict) and isinstance(value.get("schedules"), list):
+            for schedule in value["schedules"]:  # 한 줄로 저장된 JSON
+                row += 1
+                yield row, schedule
+            continue
+        if row == 0 and isinstance(value, dict) and not any(field in value for field in REQUIRED_FIELDS):
+            # 스케줄이 아닌 한 줄짜리 JSON 객체를 NDJSON 한 행으로 보지 않음
+            raise ValueError("올바르지 않은 JSON 구조입니다.")
+        row += 1
+        yield row, value
+
+
+def read_batch(rows, size):
+    """반복자에서 최대 size개를 꺼냅니다"""
+    batch = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) >= size:
+            break
+    return batch
+
+
+class ImportValidator:
+    """가져올 스케줄을 배치 단위로 검사하고 채널은 서로 다른 채널마다 한 번만 확인하는 검사기"""
+
+    def __init__(self, guild_id, get_channel, now, limit=None):
+        self.guild_id = guild_id
+        self.get_channel = get_channel
+        self.now = now
+        self.limit = limit  # 가져올 수 있는 최대 스케줄 수 (None이면 제한하지 않음)
+        self.accepted = 0
+        self._channels = {}  # 채널 ID -> 이 서버의 채널인지 여부
+
+    def check(self, batch):
+        """(행 번호, 값) 목록을 검사해 (가져올 스케줄 목록, (행 번호, 이유) 목록)을 반환합니다"""
+        accepted, skipped = [], []
+        for row, data in batch:
+            reason = self._reason(data)
+            if not reason and self.limit is not None and self.accepted >= self.limit:
+                reason = QUOTA_EXCEEDED
+            if reason:
+                skipped.append((row, reason))
+            else:
+                self.accepted += 1
+                accepted.append({
+                    'channel': data['channel'],
+                    'message': data['message'],
+                    'date': data['date'],
+                    'interval': data.get('interval', 0) if not data.get('rule') else 0,
+                    'last': data.get('last', 0),
+                    'disabled': data.get('disabled', ""),  # 일시 정지 등으로 꺼진 스케줄은 꺼진 채로 가져옴
+                    'rule': " ".join(data['rule'].split()) if data.get('rule') else ""
+                })
+        return accepted, skipped
+
+    def _reason(self, data):
+        if data is None:
+            return INVALID_JSON
+        if not isinstance(data, dict) or not all(field in data for field in REQUIRED_FIELDS) \
+                or not (data.get('rule') or 'interval' in data):
+            return MISSING_FIELDS
+        if not (_is_int(data['channel']) and _is_int(data['date']) and _is_int(data.get('last', 0))
+                and isinstance(data['message'], str) and 0 < len(data['message']) <= MAX_MESSAGE_LENGTH
+                and isinstance(data.get('disabled', ""), str)):
+            return INVALID_VALUE
+        rule = data.get('rule')
+        if rule:
+            if not isinstance(rule, str) or not _is_rule(rule):
+                return INVALID_VALUE
+        elif not (_is_int(data['interval']) and data['interval'] > 0):
+            return INVALID_VALUE
+
+        # 채널 존재 여부 확인
+        channel_id = data['channel']
+        if channel_id not in self._channels:
+            channel = self.get_channel(channel_id)
+            self._channels[channel_id] = channel is not None and channel.guild.id == self.guild_id
+        if not self._channels[channel_id]:
+            return UNKNOWN_CHANNEL
+
+        # 과거 시간 확인 (꺼진 스케줄은 다시 켤 때 밀린 실행을 처리함)
+        if data.get('last', 0) == 0 and data['date'] < self.now and not data.get('disabled'):
+            return PAST_DATE
+        return None
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_rule(value):
+    try:
+        compile_rule(value)
+    except ValueError:
+        return False
+    return True
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import os
+
+LINE_LIMIT = 1 << 24  # 메시지 한 줄의 최대 크기 (바이트)
+
+
+class Link:
+    """게이트웨이 프로세스와 디스패처 워커 사이의 유닉스 소켓 연결
+
+    메시지는 한 줄에 JSON 하나씩 주고받으며, 한쪽이 재시작하면 워커가 다시 연결합니다.
+    연결은 한 번에 하나만 유지하고, 연결되어 있지 않을 때 보낸 메시지는 버립니다
+    (다시 연결되면 게이트웨이가 필요한 상태를 처음부터 다시 보냄).
+    """
+
+    def __init__(self):
+        self._writer = None
+
+    @property
+    def connected(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    def send(self, message):
+        """메시지를 보냅니다 (기다리지 않음)"""
+        if self.connected:
+            self._writer.write(json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                               + b"\n")
+
+    async def drain(self):
+        """보낸 메시지가 소켓 버퍼로 넘어갈 때까지 대기합니다"""
+        if self.connected:
+            try:
+                await self._writer.drain()
+            except ConnectionError:
+                pass
+
+    async def serve(self, path, on_connect, handle):
+        """path에서 워커의 연결을 기다립니다 (게이트웨이)
+
+        새로 연결되면 이전 연결을 닫고 on_connect()를 실행한 뒤 받은 메시지마다 handle(메시지)를 실행합니다.
+        """
+        if os.path.exists(path):
+            os.unlink(path)  # 이전 실행이 남긴 소켓 파일
+
+        async def accept(reader, writer):
+            if self.connected:
+                self._writer.close()
+            self._writer = writer
+            print("디스패처 워커 연결됨")
+            try:
+                await on_connect()
+                await self._read(reader, handle)
+            finally:
+                if self._writer is writer:
+                    self._writer = None
+                    print("디스패처 워커 연결 끊김")
+                writer.close()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return await asyncio.start_unix_server(accept, path, limit=LINE_LIMIT)
+
+    async def connect(self, path, handle, retry_delay=1.0):
+        """path에 연결해 받은 메시지마다 handle(메시지)를 실행하고, 끊기면 다시 연결합니다 (워커)"""
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+            except OSError:
+                await asyncio.sleep(retry_delay)  # 게이트웨이가 아직 시작되지 않음
+                continue
+            self._writer = writer
+            print(f"게이트웨이에 연결됨: {path}")
+            try:
+                await self._read(reader, handle)
+            finally:
+                self._writer = None
+                writer.close()
+            print("게이트웨이 연결 끊김, 다시 연결합니다")
+            await asyncio.sleep(retry_delay)
+
+    @staticmethod
+    async def _read(reader, handle):
+        try:
+            while line := await reader.readline():
+                await handle(json.loads(line))
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+            print(f"IPC 메시지 처리 오류: {e}")
@@ -0,0 +1,147 @@
+import asyncio
+import os
+import socket
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lease (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    token INTEGER NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS claims (
+    schedule_id INTEGER NOT NULL,
+    slot INTEGER NOT NULL,
+    token INTEGER NOT NULL,
+    PRIMARY KEY (schedule_id, slot)
+) WITHOUT ROWID;
+"""
+
+
+class LeaseLost(Exception):
+    """다른 인스턴스가 리스를 가져가 더 이상 실행할 수 없음"""
+
+
+class Lease:
+    """여러 인스턴스 중 하나만 스케줄을 실행하도록 SQLite 파일에 기록하는 리스 (active/standby)
+
+    리스를 가진 인스턴스는 heartbeat마다 만료 시각을 늘리고, 만료된 리스는 다른 인스턴스가 가져갑니다.
+    리스를 가져갈 때마다 fencing 토큰이 1씩 커지며, 전송할 (스케줄, 슬롯)은 토큰과 함께 claim해야 하므로
+    두 인스턴스가 동시에 리스를 가졌다고 믿는 동안에도 같은 슬롯은 한 번만 전송됩니다.
+    """
+
+    def __init__(self, path, name="dispatch", ttl=10.0, clock=time.time):
+        self.path = path
+        self.name = name
+        self.ttl = ttl
+        self.clock = clock
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+        self.token = None  # 리스를 가지고 있으면 fencing 토큰
+        self.expires = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lease")
+        self._conn = None
+
+    @property
+    def held(self):
+        """리스를 가지고 있고 아직 만료되지 않았는지 확인합니다"""
+        return self.token is not None and self.clock() < self.expires
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.ttl, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # 프로세스가 죽어도 커밋한 claim은 남음
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def acquire(self):
+        """리스를 가져오거나 연장하고 리스를 가졌는지 반환합니다"""
+        try:
+            self.token, self.expires = await self._run(self._acquire, self.token)
+        except sqlite3.OperationalError as e:
+            print(f"리스 갱신 실패: {e}")  # 다음 heartbeat에 다시 시도 (그 사이 만료되면 실행을 멈춤)
+            return self.held
+        return self.token is not None
+
+    def _acquire(self, token):
+        conn = self._connection()
+        now = self.clock()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT holder, token, expires FROM lease WHERE name = ?", (self.name,)).fetchone()
+            if row is not None and row[0] == self.holder and row[1] == token:
+                pass  # 연장
+            elif row is None or row[2] <= now:
+                token = row[1] + 1 if row is not None else 1
+            else:
+                conn.execute("ROLLBACK")
+                return None, 0.0  # 다른 인스턴스가 가지고 있음
+            conn.execute("INSERT INTO lease (name, holder, token, expires) VALUES (?, ?, ?, ?) "
+                         "ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, token = excluded.token, "
+                         "expires = excluded.expires", (self.name, self.holder, token, now + self.ttl))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return token, now + self.ttl
+
+    async def release(self):
+        """리스를 바로 만료시켜 대기 인스턴스가 기다리지 않고 가져가게 합니다"""
+        if self.token is not None:
+            token, self.token = self.token, None
+            await self._run(self._release, token)
+
+    def _release(self, token):
+        self._connection().execute("UPDATE lease SET expires = 0 WHERE name = ? AND holder = ? AND token = ?",
+                                   (self.name, self.holder, token))
+
+    async def claim(self, keys):
+        """(스케줄 ID, 슬롯) 목록을 이 토큰으로 claim하고 전송해도 되는 키의 집합을 반환합니다
+
+        이미 다른 토큰으로 claim된 키(이전 리스 보유자가 맡은 슬롯)는 빠지고, 같은 토큰으로 claim한 키는
+        재시도할 수 있도록 다시 돌려줍니다. 리스를 잃었으면 LeaseLost를 던집니다.
+        """
+        if self.token is None:
+            raise LeaseLost()
+        claimed = await self._run(self._claim, self.token, keys)
+        if claimed is None:
+            self.token = None
+            raise LeaseLost()
+        return claimed
+
+    def _claim(self, token, keys):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT token FROM lease WHERE name = ?", (self.name,)).fetchone()
+            if row is None or row[0] != token:
+                conn.execute("ROLLBACK")
+                return None  # fencing: 더 큰 토큰이 발급됨
+            claimed = set()
+            for schedule_id, slot in keys:
+                conn.execute("INSERT OR IGNORE INTO claims (schedule_id, slot, token) VALUES (?, ?, ?)",
+                             (schedule_id, slot, token))
+                owner = conn.execute("SELECT token FROM claims WHERE schedule_id = ? AND slot = ?",
+                                     (schedule_id, slot)).fetchone()
+                if owner[0] == token:
+                    claimed.add((schedule_id, slot))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return claimed
+
+    async def prune(self, before):
+        """슬롯이 before 이전인 claim 기록을 지웁니다"""
+        await self._run(self._prune, before)
+
+    def _prune(self, before):
+        self._connection().execute("DELETE FROM claims WHERE slot < ?", (before,))
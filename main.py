@@ -3,36 +3,305 @@ from discord.ext import commands, tasks
 from dotenv import load_dotenv
 import os
 import datetime
+import functools
 import time
 import json
 import io
+import asyncio
+import hashlib
+import logging
+import math
+import random
+import signal
+
+from cache import LRUCache
+from dispatcher import Dispatcher, RateLimiter, SendQueue, pack_messages
+from export import ExportWriter, export_row
+from importer import MAX_MESSAGE_LENGTH, ImportValidator, iter_import_rows, open_import, read_batch
+from metrics import REGISTRY, Counter, Gauge, Histogram, LogCounter, serve
+from ipc import Link
+from lease import Lease, LeaseLost
+from persistence import ScheduleLog
+from recurrence import compile_rule
+from sharding import ShardRange, ShardedScheduleLog
+from sqlite_store import SqliteScheduleStore
+from store import Schedule, ScheduleStore, get_next_run, plan_run
+from tracing import SamplingProfiler, TracedProxy, Tracer
 
 load_dotenv()
 
-schedules = []
+PROCESS_STARTED = time.monotonic()  # 시작 단계별 시간을 재는 기준
+
+DATA_DIR = os.getenv("DATA_DIR", "data")  # 스냅샷과 로그를 저장할 디렉터리
+COMPACT_INTERVAL = int(os.getenv("COMPACT_INTERVAL", 3600))  # 스냅샷 저장 주기 (초)
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", 0.05))  # 로그를 모아서 기록하는 간격 (초)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "memory")  # memory 또는 sqlite
+DISPATCH_WINDOW = int(os.getenv("DISPATCH_WINDOW", 3600))  # sqlite: 디스패처에 미리 불러올 범위 (초)
+STARTUP_WINDOW = int(os.getenv("STARTUP_WINDOW", 300))  # 시작할 때 먼저 불러와 바로 실행할 범위 (초)
+STARTUP_BATCH_SIZE = 5000  # 나머지 스케줄을 불러올 때 이벤트 루프에 양보하기 전까지 처리할 수
+ON_TIME_LATENESS = 1.0  # 예정 시각부터 이 시간(초) 안에 보낸 실행을 제시간 실행으로 봄
+COMMAND_HASH_PATH = os.path.join(DATA_DIR, "commands.sha256")  # 마지막으로 동기화한 명령어 목록의 해시
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", 0))  # 전체 샤드 수 (0이면 샤딩하지 않음)
+SHARD_IDS = os.getenv("SHARD_IDS")  # 이 프로세스가 맡을 샤드 (예: 0-3 또는 0,2)
+AUTO_SHARD = os.getenv("AUTO_SHARD") == "1"  # 한 프로세스에서 필요한 만큼 자동 샤딩
+DISPATCH_ROLE = os.getenv("DISPATCH_ROLE", "")  # gateway 또는 worker로 나눠 실행 (비우면 한 프로세스)
+DISPATCH_SOCKET = os.getenv("DISPATCH_SOCKET", os.path.join(DATA_DIR, "dispatch.sock"))  # 두 프로세스가 연결할 유닉스 소켓
+FAILOVER = os.getenv("FAILOVER") == "1"  # 리스를 가진 인스턴스 하나만 실행하고 나머지는 대기 (active/standby)
+LEASE_PATH = os.getenv("LEASE_PATH", os.path.join(DATA_DIR, "lease.db"))  # 인스턴스들이 공유하는 리스와 claim 기록
+LEASE_TTL = float(os.getenv("LEASE_TTL", 10))  # 리스 유효 시간 (초, 활성 인스턴스가 죽으면 이만큼 뒤에 넘겨받음)
+LEASE_HEARTBEAT = LEASE_TTL / 3  # 리스를 연장하고 대기 인스턴스가 로그를 따라 읽는 간격 (초)
+CLAIM_RETENTION = 7 * 86400  # 전송한 슬롯의 claim 기록을 보관할 기간 (초)
+
+shards = ShardRange.parse(SHARD_COUNT, SHARD_IDS) if SHARD_COUNT else None
+
+if FAILOVER and DISPATCH_ROLE:
+    raise SystemExit("FAILOVER는 DISPATCH_ROLE 없이 한 프로세스로 실행할 때만 사용할 수 있습니다")
+# 같은 샤드를 맡은 인스턴스끼리만 리스를 두고 경쟁
+lease = Lease(LEASE_PATH, "dispatch" + (":" + ",".join(map(str, shards.ids)) if shards else ""),
+              LEASE_TTL) if FAILOVER else None
+
+if DISPATCH_ROLE == "worker" and STORAGE_BACKEND != "sqlite":
+    schedule_log = None
+    store = ScheduleStore(shard_count=SHARD_COUNT or 1)  # 게이트웨이가 보내주는 스케줄 사본
+    dispatch_until = None
+elif STORAGE_BACKEND == "sqlite":
+    schedule_log = None
+    store = SqliteScheduleStore(os.path.join(DATA_DIR, "schedules.db"), shards)
+    dispatch_until = 0  # 디스패처에 불러온 실행 시각 상한
+else:
+    # 샤딩할 때는 샤드별 디렉터리에 나눠 저장하므로 프로세스끼리 파일을 공유하지 않음
+    if shards:
+        schedule_log = ShardedScheduleLog(DATA_DIR, shards, LOG_FLUSH_INTERVAL, Schedule.from_rows)
+    else:
+        schedule_log = ScheduleLog(DATA_DIR, LOG_FLUSH_INTERVAL, Schedule.from_rows)
+    store = ScheduleStore(log=schedule_log, shard_count=SHARD_COUNT or 1)
+    dispatch_until = None  # 메모리 저장소는 전체를 디스패처에 등록
+
+TRACE = os.getenv("TRACE") == "1"  # 명령어와 실행 루프를 span으로 나눠 시간 기록
+SLOW_OPERATION_THRESHOLD = float(os.getenv("SLOW_OPERATION_THRESHOLD", 1.0))  # 이 시간(초)보다 느린 작업은 구간별 시간을 로그로 남김
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(DATA_DIR, "profiles"))  # SIGUSR1로 켠 프로파일 결과를 저장할 디렉터리
+PROFILE_SECONDS = int(os.getenv("PROFILE_SECONDS", 30))  # 프로파일링할 시간 (초)
+
+tracer = Tracer(TRACE, SLOW_OPERATION_THRESHOLD)
+profiler = SamplingProfiler(PROFILE_DIR)
+if tracer.enabled:
+    store = TracedProxy(store, tracer, "store")  # 저장소 호출마다 span 기록
+
+LIST_PAGE_SIZE = 10  # /list 한 페이지에 보여줄 스케줄 수
+LIST_CACHE_SIZE = int(os.getenv("LIST_CACHE_SIZE", 1024))  # 미리 만들어 둘 /list 페이지 수
+
+list_page_cache = LRUCache(LIST_CACHE_SIZE)
+# 사용자의 스케줄이 바뀌면 그 사용자의 페이지를 모두 버림
+store.listeners.append(lambda schedule: list_page_cache.invalidate((schedule['server'], schedule['user'])))
+
+FIELD_CACHE_SIZE = int(os.getenv("FIELD_CACHE_SIZE", 10000))  # 만들어 둘 /info, /list 스케줄 표시 내용 수
+# (종류, 스케줄 ID, 스케줄 버전, 채널 이름 버전) -> 표시 내용
+# 스케줄이 수정/실행되면 버전이 올라가므로 이전 내용은 다시 쓰이지 않고 LRU에서 밀려남
+field_cache = LRUCache(FIELD_CACHE_SIZE)
+channel_generations = {}  # 채널 ID -> 이름이 바뀐 횟수 (캐시된 채널 이름을 버리기 위함)
+
+EXPORT_PART_SIZE = int(os.getenv("EXPORT_PART_SIZE", 8 * 1024 * 1024))  # /export 파일 하나의 최대 크기 (바이트)
+EXPORT_BATCH_SIZE = 500  # /export 저장소에서 한 번에 읽어올 스케줄 수
+
+IMPORT_BATCH_SIZE = 1000  # /import 한 번에 해석하고 검사할 행 수
+IMPORT_REPORT_PREVIEW = 10  # /import 결과에 바로 보여줄 건너뛴 행 수
+
+RETRY_DELAY = 60  # 전송 실패시 첫 재시도 대기 시간 (초)
+RETRY_MAX_DELAY = int(os.getenv("RETRY_MAX_DELAY", 3600))  # 재시도 대기 시간 상한 (초)
+RETRY_LIMIT = int(os.getenv("RETRY_LIMIT", 10))  # 이 횟수만큼 연달아 실패하면 비활성화
+DISABLED_REASON_LENGTH = 200  # 저장할 비활성화 이유의 최대 길이
+SEND_CONCURRENCY = int(os.getenv("SEND_CONCURRENCY", 25))  # 봇 전체 동시 전송 수
+CHANNEL_SEND_CONCURRENCY = int(os.getenv("CHANNEL_SEND_CONCURRENCY", 1))  # 채널별 동시 전송 수
+CATCHUP_POLICY = os.getenv("CATCHUP_POLICY", "coalesce")  # 밀린 실행 처리: skip, coalesce, replay
+CATCHUP_LIMIT = int(os.getenv("CATCHUP_LIMIT", 5))  # replay: 다시 보낼 최대 실행 수
+CATCHUP_GRACE = int(os.getenv("CATCHUP_GRACE", 60))  # 이 시간(초) 이상 늦은 실행을 밀린 것으로 봄
+CATCHUP_SPACING = int(os.getenv("CATCHUP_SPACING", 10))  # 밀린 실행 사이의 간격 (초)
+COALESCE_GUILDS = os.getenv("COALESCE_GUILDS", "")  # 같은 채널 메시지를 합쳐 보낼 서버 ID 목록 (*이면 모든 서버)
+COALESCE_CHANNELS = {int(channel_id) for channel_id in os.getenv("COALESCE_CHANNELS", "").split(",")
+                     if channel_id.strip()}  # 같은 채널 메시지를 합쳐 보낼 채널 ID 목록
+COALESCE_WINDOW = int(os.getenv("COALESCE_WINDOW", 5))  # 이 시간(초) 안에 실행될 같은 채널 메시지를 함께 보냄
+COALESCE_SEPARATOR = "\n"  # 합쳐 보낼 때 메시지 사이에 넣는 문자열
+coalesce_guilds = {int(guild_id) for guild_id in COALESCE_GUILDS.split(",")
+                   if guild_id.strip() and guild_id.strip() != "*"}
+GUILD_SCHEDULE_LIMIT = int(os.getenv("GUILD_SCHEDULE_LIMIT", 0))  # 서버당 최대 스케줄 수 (0이면 제한하지 않음)
+USER_SCHEDULE_LIMIT = int(os.getenv("USER_SCHEDULE_LIMIT", 0))  # 서버 안 사용자당 최대 스케줄 수 (0이면 제한하지 않음)
+GUILD_FIRING_RATE = int(os.getenv("GUILD_FIRING_RATE", 0))  # 서버당 분당 최대 실행 수 (0이면 제한하지 않음)
+USER_FIRING_RATE = int(os.getenv("USER_FIRING_RATE", 0))  # 서버 안 사용자당 분당 최대 실행 수 (0이면 제한하지 않음)
+GUILD_REMOVE_ACTION = os.getenv("GUILD_REMOVE_ACTION", "delete")  # 봇이 서버에서 나가면 스케줄을 delete 또는 disable
+ORPHAN_NOTIFY = os.getenv("ORPHAN_NOTIFY", "1") == "1"  # 채널/서버 정리로 바뀐 스케줄을 소유자에게 DM으로 알림
+ORPHAN_SWEEP_INTERVAL = int(os.getenv("ORPHAN_SWEEP_INTERVAL", 3600))  # 놓친 이벤트를 맞추는 정리 주기 (초)
+ORPHAN_REPORT_PREVIEW = 20  # 소유자 알림과 일괄 명령어 결과에 나열할 최대 스케줄 ID 수
+BULK_ID_LIMIT = 10000  # 일괄 명령어의 ID 목록에 쓸 수 있는 최대 ID 수
+PAUSED = "일시 정지됨"  # /pause로 멈춘 스케줄의 비활성화 이유
+# 채널/서버 정리로 비활성화한 이유 (권한을 되찾거나 봇이 다시 들어오면 자동으로 다시 켬)
+CHANNEL_DELETED = "채널이 삭제되었습니다"
+NO_SEND_PERMISSION = "채널에 메시지를 보낼 권한이 없습니다"
+GUILD_LEFT = "봇이 서버에서 나갔습니다"
+AUTO_RESUMED = (NO_SEND_PERMISSION, GUILD_LEFT)
+ORPHAN_LABELS = {CHANNEL_DELETED: "channel_deleted", NO_SEND_PERMISSION: "permission_lost",
+                 GUILD_LEFT: "guild_removed", "": "restored"}  # 지표 레이블
+
+dispatcher = Dispatcher()
+guild_rate = RateLimiter(GUILD_FIRING_RATE, clock=lambda: dispatcher.clock())
+user_rate = RateLimiter(USER_FIRING_RATE, clock=lambda: dispatcher.clock())
+retry_attempts = {}  # 스케줄 ID -> 연달아 실패한 횟수 (재시도 대기 중인 스케줄)
+edit_versions = {}  # 스케줄 ID -> 게이트웨이에서 수정한 횟수 (워커는 받은 번호를 전송 결과와 함께 돌려보냄)
+dispatch_link = Link()  # 게이트웨이와 디스패처 워커 사이의 연결 (DISPATCH_ROLE)
+SNAPSHOT_BATCH_SIZE = 500  # 워커에 스케줄 사본을 보낼 때 한 메시지에 담을 수
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))  # Prometheus 지표를 내보낼 포트 (0이면 사용하지 않음)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+TICK_SECONDS = Histogram("scheduler_tick_seconds", "실행 루프가 실행할 스케줄을 꺼내 전송 대기열에 넣는 데 걸린 시간 (초)")
+TICK_DUE = Histogram("scheduler_tick_due_schedules", "실행 루프 한 번에 꺼낸 작업 수",
+                     buckets=(1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000))
+BURST_SECONDS = Histogram("scheduler_burst_seconds", "실행 루프 한 번에 꺼낸 작업을 모두 전송하는 데 걸린 시간 (초)",
+                          buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 3600))
+FIRING_LATENESS = Histogram("scheduler_firing_lateness_seconds", "예정 시각부터 실제 전송까지 늦어진 시간 (초)",
+                            buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 300, 3600))
+SEND_SECONDS = Histogram("scheduler_send_seconds", "channel.send 응답 시간 (초)")
+SEND_ERRORS = Counter("scheduler_send_errors_total", "channel.send 오류 수", ["error"])
+SEND_RETRIES = Counter("scheduler_send_retries_total", "전송 실패 후 재시도 대기열에 넣은 수")
+SCHEDULES_DISABLED = Counter("scheduler_schedules_disabled_total", "전송 실패로 비활성화한 스케줄 수", ["error"])
+ORPHANED = Counter("scheduler_orphaned_schedules_total", "채널/서버가 사라지거나 권한이 바뀌어 정리한 스케줄 수",
+                   ["reason", "action"])
+RATE_LIMITED = Counter("scheduler_rate_limited_total", "분당 실행 수 한도를 넘어 미룬 실행 수", ["scope"])
+RATE_LIMIT_RETRIES = Counter("scheduler_rate_limit_retries_total", "429 응답을 받고 다시 시도한 수")
+COALESCED_MESSAGES = Counter("scheduler_coalesced_messages_total", "다른 메시지와 합쳐 보낸 스케줄 메시지 수")
+COMMAND_SECONDS = Histogram("scheduler_command_seconds", "명령어 처리 시간 (초)", ["command"])
+STARTUP_SECONDS = Gauge("scheduler_startup_seconds", "프로세스 시작부터 각 시작 단계까지 걸린 시간 (초)", ["stage"])
+Gauge("scheduler_schedules", "서버별 스케줄 수", ["guild"], collector=store.server_counts)
+Gauge("scheduler_dispatcher_pending", "디스패처에 등록된 스케줄 수",
+      collector=lambda: {(): len(dispatcher)})
+Gauge("scheduler_dispatcher_overdue_seconds", "가장 이른 실행 시각이 지난 시간 (초, 밀리고 있으면 커짐)",
+      collector=lambda: {(): max(0, dispatcher.clock() - (dispatcher.next_time() or float("inf")))})
+
+schedules_loaded = asyncio.Event()  # 시작할 때 저장된 스케줄을 모두 불러오는 동안에는 명령어가 기다림
+schedules_loaded.set()
+
+
+def instrumented(command):
+    """명령어 처리 시간을 지표와 span으로 기록하는 데코레이터를 반환합니다"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if lease is not None and not lease.held:
+                return  # 대기 인스턴스는 응답하지 않음 (같은 명령어를 받은 활성 인스턴스가 응답)
+            if not schedules_loaded.is_set():
+                await schedules_loaded.wait()  # 불러오기 전에는 스케줄을 찾지 못하고 ID가 겹칠 수 있음
+            return await func(*args, **kwargs)
+        return COMMAND_SECONDS.timed(command=command)(tracer.traced(f"command.{command}")(wrapper))
+    return decorator
+
+
+def mark_startup(stage):
+    """프로세스 시작부터 stage까지 걸린 시간을 처음 한 번만 기록합니다"""
+    if (stage,) in STARTUP_SECONDS.values:
+        return
+    elapsed = time.monotonic() - PROCESS_STARTED
+    STARTUP_SECONDS.set(round(elapsed, 3), stage=stage)
+    print(f"시작 단계 {stage}: {elapsed:.2f}초")
+
 
-next_id = 1  # 다음 스케줄 ID
+# discord.py는 429 응답을 받으면 내부에서 기다렸다가 다시 보내므로 그 경고 로그를 셈
+logging.getLogger("discord.http").addHandler(LogCounter(RATE_LIMIT_RETRIES, (
+    "We are being rate limited. %s %s responded with 429. Retrying",
+    "Global rate limit has been hit. Retrying"
+)))
 
 intents = discord.Intents.default()
 intents.message_content = True
 
-bot = commands.Bot(command_prefix=".", intents=intents)
+if shards:
+    bot = commands.AutoShardedBot(command_prefix=".", intents=intents,
+                                  shard_count=shards.count, shard_ids=shards.ids)
+elif AUTO_SHARD:
+    bot = commands.AutoShardedBot(command_prefix=".", intents=intents)
+else:
+    bot = commands.Bot(command_prefix=".", intents=intents)
 
 
-def get_user_schedules(guild_id, user_id):
-    """사용자의 스케줄 목록을 가져옵니다"""
-    return [schedule for schedule in schedules
-            if schedule['server'] == guild_id and schedule['user'] == user_id]
+async def find_schedule_by_id(schedule_id, guild_id, user_id):
+    """ID로 스케줄을 찾습니다 (본인 것만)"""
+    return await store.find(schedule_id, guild_id, user_id)
+
+
+async def schedule_capacity(guild_id, user_id, replace=False):
+    """서버와 사용자의 스케줄 수 한도까지 더 만들 수 있는 수를 반환합니다 (제한이 없으면 None)
+
+    replace면 사용자의 기존 스케줄이 함께 삭제되는 것으로 계산합니다 (/import overwrite).
+    """
+    if GUILD_SCHEDULE_LIMIT <= 0 and USER_SCHEDULE_LIMIT <= 0:
+        return None
+    owned = await store.user_count(guild_id, user_id)
+    replaced = owned if replace else 0
+    remaining = []
+    if GUILD_SCHEDULE_LIMIT > 0:
+        remaining.append(GUILD_SCHEDULE_LIMIT - await store.server_count(guild_id) + replaced)
+    if USER_SCHEDULE_LIMIT > 0:
+        remaining.append(USER_SCHEDULE_LIMIT - owned + replaced)
+    return max(0, min(remaining))
+
+
+def quota_embed():
+    """스케줄 수 한도에 도달했을 때 보여줄 embed를 만듭니다"""
+    limits = []
+    if GUILD_SCHEDULE_LIMIT > 0:
+        limits.append(f"• 서버당 최대 {GUILD_SCHEDULE_LIMIT}개")
+    if USER_SCHEDULE_LIMIT > 0:
+        limits.append(f"• 사용자당 최대 {USER_SCHEDULE_LIMIT}개")
+    return discord.Embed(
+        title="❌ 스케줄 수 한도 초과",
+        description="더 이상 스케줄을 만들 수 없습니다. 사용하지 않는 스케줄을 삭제한 뒤 다시 시도해주세요.\n"
+                    + "\n".join(limits),
+        color=0xff0000
+    )
 
 
-def find_schedule_by_id(schedule_id, guild_id, user_id):
-    """ID로 스케줄을 찾습니다 (본인 것만)"""
-    for schedule in schedules:
-        if (schedule['id'] == schedule_id and
-                schedule['server'] == guild_id and
-                schedule['user'] == user_id):
-            return schedule
-    return None
+def in_dispatch_window(next_run):
+    """실행 시각이 디스패처에 불러온 범위 안인지 확인합니다"""
+    return dispatch_until is None or next_run <= dispatch_until
+
+
+def dispatch_item(schedule):
+    """디스패처에 스케줄과 함께 등록할 (서버, 사용자, 채널)을 반환합니다"""
+    return schedule['server'], schedule['user'], schedule['channel']
+
+
+def reschedule(schedule):
+    """스케줄의 다음 실행 시각을 디스패처에 반영합니다"""
+    if DISPATCH_ROLE == "gateway":
+        version = edit_versions[schedule['id']] = edit_versions.get(schedule['id'], 0) + 1
+        dispatch_link.send({'op': 'put', 'schedule': schedule.copy(), 'version': version})  # 실행은 워커가 맡음
+        return
+    retry_attempts.pop(schedule['id'], None)
+    next_run = get_next_run(schedule)
+    if schedule['disabled']:
+        dispatcher.cancel(schedule['id'])
+    elif in_dispatch_window(next_run):
+        dispatcher.schedule(schedule['id'], next_run, dispatch_item(schedule))
+    else:
+        dispatcher.cancel(schedule['id'])  # 범위에 들어오면 fill_dispatcher가 다시 불러옴
+
+
+def unschedule(schedule_id):
+    """삭제된 스케줄을 디스패처에서 뺍니다"""
+    if DISPATCH_ROLE == "gateway":
+        edit_versions.pop(schedule_id, None)
+        dispatch_link.send({'op': 'delete', 'id': schedule_id})
+    else:
+        dispatcher.cancel(schedule_id)
+
+
+def get_send_channel(channel_id, guild_id=None):
+    """메시지를 보낼 채널을 찾습니다 (디스패처 워커는 채널 캐시 없이 REST로 보냄)"""
+    if DISPATCH_ROLE == "worker":
+        return bot.get_partial_messageable(channel_id, guild_id=guild_id)
+    channel = bot.get_channel(channel_id)
+    if channel is None and bot.user is not None and not bot.is_ready():
+        # 게이트웨이 연결 전에 시작한 실행은 채널 캐시가 채워지기를 기다리지 않고 REST로 보냄
+        return bot.get_partial_messageable(channel_id, guild_id=guild_id)
+    return channel
 
 
 def format_timestamp(timestamp):
@@ -52,40 +321,184 @@ def format_interval(seconds):
         return f"{seconds // 86400}일"
 
 
-@bot.tree.command(name="list", description="스케줄 목록을 가져옵니다")
-async def list_schedules(interaction: discord.Interaction):
-    user_schedules = get_user_schedules(interaction.guild_id, interaction.user.id)
+def format_recurrence(schedule):
+    """스케줄의 반복 방식을 읽기 좋은 형태로 변환합니다"""
+    if schedule['rule']:
+        try:
+            return compile_rule(schedule['rule']).describe()
+        except ValueError:
+            return f"cron `{schedule['rule']}`"
+    return format_interval(schedule['interval'])
+
+
+def parse_recurrence(value):
+    """분 단위 간격 또는 cron 규칙을 (간격(초), 규칙)으로 해석합니다"""
+    value = " ".join(value.split())
+    if value.isdigit():
+        if int(value) <= 0:
+            raise ValueError("간격은 0보다 커야 합니다")
+        return int(value) * 60, ""  # 분을 초로 변환
+    compile_rule(value)  # 잘못된 규칙이면 ValueError
+    return 0, value
+
+
+def cached_fields(kind, schedule, render):
+    """스케줄 표시 내용을 캐시에서 꺼내거나 render(스케줄)로 만들어 저장합니다"""
+    key = (kind, schedule['id'], schedule['version'], channel_generations.get(schedule['channel'], 0))
+    fields = field_cache.get(key)
+    if fields is None:
+        fields = render(schedule)
+        field_cache.put(key, fields)
+    return fields
+
+
+def channel_label(channel_id):
+    """채널 이름을 표시용으로 가져옵니다"""
+    with tracer.span("get_channel"):
+        channel = bot.get_channel(channel_id)
+    return f"#{channel.name}" if channel else f"#채널 ID: {channel_id}"
+
+
+def render_list_field(schedule):
+    """/list에 보여줄 스케줄 한 개의 (이름, 내용)을 만듭니다"""
+    message = schedule['message']
+    if schedule['disabled'] == PAUSED:
+        name, next_run_text = f"⏸️ 스케줄 #{schedule['id']}", "일시 정지됨 (/resume)"
+    elif schedule['disabled']:
+        name, next_run_text = f"⛔ 스케줄 #{schedule['id']}", "비활성화됨 (/enable)"
+    else:
+        name, next_run_text = f"🔸 스케줄 #{schedule['id']}", format_timestamp(get_next_run(schedule))
+    return name, (f"**메시지:** {message[:100] + ('...' if len(message) > 100 else '')}\n"
+                  f"**채널:** {channel_label(schedule['channel'])}\n"
+                  f"**다음 실행:** {next_run_text}\n"
+                  f"**반복:** {format_recurrence(schedule)}")
+
+
+def render_info_fields(schedule):
+    """/info에 보여줄 (이름, 내용, inline) 목록을 만듭니다"""
+    fields = [
+        ("💬 메시지", schedule['message'], False),
+        ("📺 채널", channel_label(schedule['channel']), True),
+        ("🕐 다음 실행", format_timestamp(get_next_run(schedule)), True),
+        ("🔄 반복", format_recurrence(schedule), True),
+    ]
+    if schedule['rule']:
+        fields.append(("🗓️ cron 규칙", f"`{schedule['rule']}`", True))
+    fields.append(("📅 생성일", format_timestamp(schedule['date']), True))
+    if schedule['last'] > 0:
+        fields.append(("⏰ 마지막 실행", format_timestamp(schedule['last']), True))
+    else:
+        fields.append(("⏰ 마지막 실행", "아직 실행되지 않음", True))
+    if schedule['disabled'] == PAUSED:
+        fields.append(("⏸️ 일시 정지됨", f"`/resume schedule_ids:{schedule['id']}`로 다시 켤 수 있습니다.", False))
+    elif schedule['disabled']:
+        fields.append(("⛔ 비활성화됨",
+                       f"{schedule['disabled']}\n`/enable {schedule['id']}`로 다시 켤 수 있습니다.", False))
+    return fields
+
+
+async def render_list_page(user, guild_id, after_id, page):
+    """/list의 한 페이지를 만들어 (임베드, 마지막 스케줄 ID, 다음 페이지 여부)를 반환합니다"""
+    key = (guild_id, user.id, after_id)
+    cached = list_page_cache.get(key)
+    if cached:
+        return cached
+
+    # 다음 페이지가 있는지 알기 위해 한 개 더 가져옴
+    page_schedules = await store.user_page(guild_id, user.id, after_id, LIST_PAGE_SIZE + 1)
+    has_next = len(page_schedules) > LIST_PAGE_SIZE
+    page_schedules = page_schedules[:LIST_PAGE_SIZE]
+    total = await store.user_count(guild_id, user.id)
+
+    with tracer.span("render"):
+        embed = discord.Embed(
+            title="📅 내 스케줄 목록",
+            color=0x00ff00,
+            timestamp=datetime.datetime.now()
+        )
+        embed.set_author(name=user.display_name, icon_url=user.avatar)
 
-    embed = discord.Embed(
-        title="📅 내 스케줄 목록",
-        color=0x00ff00,
-        timestamp=datetime.datetime.now()
-    )
-    embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.avatar)
+        if not page_schedules:
+            embed.description = "등록된 스케줄이 없습니다."
+            embed.color = 0x808080
+        else:
+            for schedule in page_schedules:
+                name, value = cached_fields("list", schedule, render_list_field)
+                embed.add_field(name=name, value=value, inline=True)
+
+    pages = max(1, -(-total // LIST_PAGE_SIZE))
+    embed.set_footer(text=f"총 {total}개의 스케줄 · {page + 1}/{pages} 페이지")
+
+    last_id = page_schedules[-1]['id'] if page_schedules else after_id
+    rendered = (embed, last_id, has_next)
+    list_page_cache.put(key, rendered, tag=(guild_id, user.id))
+    return rendered
+
+
+class ScheduleListView(discord.ui.View):
+    """/list 페이지를 이전/다음 버튼으로 넘기는 뷰"""
+
+    def __init__(self, user, guild_id):
+        super().__init__(timeout=300)
+        self.user = user
+        self.guild_id = guild_id
+        self.cursors = [0]  # 페이지별 시작 커서 (이전 페이지의 마지막 스케줄 ID)
+        self.page = 0
+        self.interaction = None  # 목록을 보낸 인터랙션 (시간 초과 시 메시지 수정용)
+
+    async def render(self):
+        """현재 페이지의 임베드를 만들고 버튼 상태를 맞춥니다"""
+        embed, last_id, has_next = await render_list_page(self.user, self.guild_id,
+                                                          self.cursors[self.page], self.page)
+        del self.cursors[self.page + 1:]
+        if has_next:
+            self.cursors.append(last_id)
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = not has_next
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id == self.user.id:
+            return True
+        embed = discord.Embed(title="❌ 오류", description="본인의 목록만 넘길 수 있습니다.", color=0xff0000)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return False
 
-    if not user_schedules:
-        embed.description = "등록된 스케줄이 없습니다."
-        embed.color = 0x808080
-    else:
-        for i, schedule in enumerate(user_schedules):
-            channel = bot.get_channel(schedule['channel'])
-            channel_name = channel.name if channel else f"채널 ID: {schedule['channel']}"
-
-            next_run = schedule['date']
-            if schedule['last'] > 0:
-                next_run = schedule['last'] + schedule['interval']
-
-            embed.add_field(
-                name=f"🔸 스케줄 #{schedule['id']}",
-                value=f"**메시지:** {schedule['message']}\n"
-                      f"**채널:** #{channel_name}\n"
-                      f"**다음 실행:** {format_timestamp(next_run)}\n"
-                      f"**반복 간격:** {format_interval(schedule['interval'])}",
-                inline=True
-            )
+    async def on_timeout(self):
+        """시간이 지나면 버튼을 비활성화해 더 이상 누를 수 없게 합니다"""
+        for item in self.children:
+            item.disabled = True
+        if self.interaction is None:
+            return
+        try:
+            await self.interaction.edit_original_response(view=self)
+        except discord.HTTPException:
+            pass  # 메시지가 삭제된 경우 무시
 
-    embed.set_footer(text=f"총 {len(user_schedules)}개의 스케줄")
-    await interaction.response.send_message(embed=embed)
+    @discord.ui.button(label="◀ 이전", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(0, self.page - 1)
+        await interaction.response.edit_message(embed=await self.render(), view=self)
+
+    @discord.ui.button(label="다음 ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.page + 1 < len(self.cursors):
+            self.page += 1
+        await interaction.response.edit_message(embed=await self.render(), view=self)
+
+
+@bot.tree.command(name="list", description="스케줄 목록을 가져옵니다")
+@instrumented("list")
+async def list_schedules(interaction: discord.Interaction):
+    view = ScheduleListView(interaction.user, interaction.guild_id)
+    embed = await view.render()
+
+    with tracer.span("discord.respond"):
+        if view.next_page.disabled:
+            await interaction.response.send_message(embed=embed)  # 한 페이지면 버튼 없이 보냄
+        else:
+            await interaction.response.send_message(embed=embed, view=view)
+            view.interaction = interaction
 
 
 class ScheduleCreateModal(discord.ui.Modal, title="📅 새 스케줄 생성"):
@@ -115,15 +528,14 @@ class ScheduleCreateModal(discord.ui.Modal, title="📅 새 스케줄 생성"):
     )
 
     interval = discord.ui.TextInput(
-        label="반복 간격 (분)",
-        placeholder="분 단위로 입력 (예: 60)",
-        max_length=4,
+        label="반복 (분 또는 cron 규칙)",
+        placeholder="분 단위 (예: 60) 또는 cron 규칙 (예: 0 9 * * 1-5)",
+        max_length=100,
         default="60"
     )
 
+    @instrumented("create_modal")
     async def on_submit(self, interaction: discord.Interaction):
-        global next_id
-
         try:
             # 날짜 파싱
             date_parts = self.date.value.split('-')
@@ -139,10 +551,8 @@ class ScheduleCreateModal(discord.ui.Modal, title="📅 새 스케줄 생성"):
 
             hour, minute = map(int, time_parts)
 
-            # 간격 파싱
-            interval_minutes = int(self.interval.value)
-            if interval_minutes <= 0:
-                raise ValueError("간격은 0보다 커야 합니다")
+            # 반복 파싱 (cron 규칙이면 날짜/시간은 규칙을 적용하기 시작하는 기준 시각)
+            interval, rule = parse_recurrence(self.interval.value)
 
             # 날짜 유효성 검사
             target_date = datetime.datetime(year, month, day, hour, minute)
@@ -157,19 +567,21 @@ class ScheduleCreateModal(discord.ui.Modal, title="📅 새 스케줄 생성"):
                 await interaction.response.send_message(embed=embed, ephemeral=True)
                 return
 
-            new_schedule = {
-                'id': next_id,
-                'server': interaction.guild_id,
-                'channel': self.channel.id,
-                'message': self.message.value,
-                'user': interaction.user.id,
-                'date': timestamp,
-                'interval': interval_minutes * 60,  # 분을 초로 변환
-                'last': 0
-            }
+            if await schedule_capacity(interaction.guild_id, interaction.user.id) == 0:
+                await interaction.response.send_message(embed=quota_embed(), ephemeral=True)
+                return
 
-            schedules.append(new_schedule)
-            next_id += 1
+            new_schedule = await store.add(
+                server=interaction.guild_id,
+                channel=self.channel.id,
+                message=self.message.value,
+                user=interaction.user.id,
+                date=timestamp,
+                interval=interval,
+                rule=rule
+            )
+            reschedule(new_schedule)
+            await store.commit()
 
             embed = discord.Embed(
                 title="✅ 스케줄 생성 완료",
@@ -181,8 +593,8 @@ class ScheduleCreateModal(discord.ui.Modal, title="📅 새 스케줄 생성"):
                             value=self.message.value[:100] + ("..." if len(self.message.value) > 100 else ""),
                             inline=False)
             embed.add_field(name="📺 채널", value=self.channel.mention, inline=True)
-            embed.add_field(name="🕐 첫 실행", value=format_timestamp(timestamp), inline=True)
-            embed.add_field(name="🔄 반복 간격", value=format_interval(new_schedule['interval']), inline=True)
+            embed.add_field(name="🕐 첫 실행", value=format_timestamp(get_next_run(new_schedule)), inline=True)
+            embed.add_field(name="🔄 반복", value=format_recurrence(new_schedule), inline=True)
             embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.avatar)
             embed.set_footer(text="스케줄이 성공적으로 생성되었습니다!")
 
@@ -194,7 +606,7 @@ class ScheduleCreateModal(discord.ui.Modal, title="📅 새 스케줄 생성"):
                 description="올바른 형식으로 입력해주세요:\n"
                             "• **날짜**: YYYY-MM-DD (예: 2025-12-25)\n"
                             "• **시간**: HH:MM (예: 14:30)\n"
-                            "• **간격**: 양수 (분 단위)",
+                            "• **반복**: 양수 (분 단위) 또는 cron 규칙 (예: 0 9 * * 1-5)",
                 color=0xff0000
             )
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -216,12 +628,18 @@ class ScheduleCreateModal(discord.ui.Modal, title="📅 새 스케줄 생성"):
 
 
 @bot.tree.command(name="create", description="새 스케줄을 생성합니다")
+@instrumented("create")
 async def create_schedule(interaction: discord.Interaction, channel: discord.TextChannel):
+    if await schedule_capacity(interaction.guild_id, interaction.user.id) == 0:
+        await interaction.response.send_message(embed=quota_embed(), ephemeral=True)
+        return
+
     modal = ScheduleCreateModal(channel)
     await interaction.response.send_modal(modal)
 
 
 @bot.tree.command(name="update", description="스케줄을 수정합니다")
+@instrumented("update")
 async def update_schedule(
         interaction: discord.Interaction,
         schedule_id: int,
@@ -232,9 +650,10 @@ async def update_schedule(
         day: int = None,
         hour: int = None,
         minute: int = None,
-        interval_minutes: int = None
+        interval_minutes: int = None,
+        rule: str = None
 ):
-    schedule = find_schedule_by_id(schedule_id, interaction.guild_id, interaction.user.id)
+    schedule = await find_schedule_by_id(schedule_id, interaction.guild_id, interaction.user.id)
 
     if not schedule:
         embed = discord.Embed(
@@ -245,15 +664,16 @@ async def update_schedule(
         await interaction.response.send_message(embed=embed)
         return
 
-    # 수정할 내용들
+    # 수정할 내용들 (모두 검사한 뒤 한 번에 반영)
+    changes = {}
     updates = []
 
     if message:
-        schedule['message'] = message
+        changes['message'] = message
         updates.append(f"메시지: {message}")
 
     if channel:
-        schedule['channel'] = channel.id
+        changes['channel'] = channel.id
         updates.append(f"채널: {channel.mention}")
 
     if all(v is not None for v in [year, month, day, hour]):
@@ -271,8 +691,7 @@ async def update_schedule(
                 await interaction.response.send_message(embed=embed)
                 return
 
-            schedule['date'] = timestamp
-            schedule['last'] = 0  # 시간 변경시 last 초기화
+            changes.update(date=timestamp, last=0)  # 시간 변경시 last 초기화
             updates.append(f"실행 시간: {format_timestamp(timestamp)}")
 
         except ValueError:
@@ -285,10 +704,23 @@ async def update_schedule(
             return
 
     if interval_minutes:
-        schedule['interval'] = interval_minutes * 60
-        updates.append(f"반복 간격: {format_interval(schedule['interval'])}")
+        changes.update(interval=interval_minutes * 60, rule="")  # 간격을 정하면 규칙은 해제
+        updates.append(f"반복 간격: {format_interval(changes['interval'])}")
+    elif rule:
+        try:
+            compile_rule(rule)
+        except ValueError as e:
+            embed = discord.Embed(
+                title="❌ 오류",
+                description=f"올바르지 않은 cron 규칙입니다: {e}",
+                color=0xff0000
+            )
+            await interaction.response.send_message(embed=embed)
+            return
+        changes.update(interval=0, rule=" ".join(rule.split()))
+        updates.append(f"반복 규칙: {format_recurrence(changes)}")
 
-    if not updates:
+    if not changes:
         embed = discord.Embed(
             title="❌ 오류",
             description="수정할 내용을 입력해주세요.",
@@ -297,6 +729,10 @@ async def update_schedule(
         await interaction.response.send_message(embed=embed)
         return
 
+    await store.update(schedule, **changes)
+    reschedule(schedule)
+    await store.commit()
+
     embed = discord.Embed(
         title="✅ 스케줄 수정 완료",
         color=0x00ff00,
@@ -310,8 +746,9 @@ async def update_schedule(
 
 
 @bot.tree.command(name="delete", description="스케줄을 삭제합니다")
+@instrumented("delete")
 async def delete_schedule(interaction: discord.Interaction, schedule_id: int):
-    schedule = find_schedule_by_id(schedule_id, interaction.guild_id, interaction.user.id)
+    schedule = await find_schedule_by_id(schedule_id, interaction.guild_id, interaction.user.id)
 
     if not schedule:
         embed = discord.Embed(
@@ -322,7 +759,9 @@ async def delete_schedule(interaction: discord.Interaction, schedule_id: int):
         await interaction.response.send_message(embed=embed)
         return
 
-    schedules.remove(schedule)
+    await store.remove(schedule)
+    unschedule(schedule['id'])
+    await store.commit()
 
     embed = discord.Embed(
         title="🗑️ 스케줄 삭제 완료",
@@ -335,9 +774,10 @@ async def delete_schedule(interaction: discord.Interaction, schedule_id: int):
     await interaction.response.send_message(embed=embed)
 
 
-@bot.tree.command(name="info", description="특정 스케줄의 상세 정보를 봅니다")
-async def schedule_info(interaction: discord.Interaction, schedule_id: int):
-    schedule = find_schedule_by_id(schedule_id, interaction.guild_id, interaction.user.id)
+@bot.tree.command(name="enable", description="전송 실패로 비활성화된 스케줄을 다시 켭니다")
+@instrumented("enable")
+async def enable_schedule(interaction: discord.Interaction, schedule_id: int):
+    schedule = await find_schedule_by_id(schedule_id, interaction.guild_id, interaction.user.id)
 
     if not schedule:
         embed = discord.Embed(
@@ -348,28 +788,230 @@ async def schedule_info(interaction: discord.Interaction, schedule_id: int):
         await interaction.response.send_message(embed=embed)
         return
 
-    channel = bot.get_channel(schedule['channel'])
-    channel_name = channel.name if channel else f"채널 ID: {schedule['channel']}"
+    if not schedule['disabled']:
+        embed = discord.Embed(
+            title="❌ 오류",
+            description=f"스케줄 #{schedule_id}는 이미 활성 상태입니다.",
+            color=0xff0000
+        )
+        await interaction.response.send_message(embed=embed)
+        return
 
-    next_run = schedule['date']
-    if schedule['last'] > 0:
-        next_run = schedule['last'] + schedule['interval']
+    reason = schedule['disabled']
+    await store.update(schedule, disabled="")
+    reschedule(schedule)
+    await store.commit()
 
     embed = discord.Embed(
-        title=f"📋 스케줄 #{schedule['id']} 정보",
-        color=0x3498db,
+        title="✅ 스케줄 다시 켜기 완료",
+        color=0x00ff00,
         timestamp=datetime.datetime.now()
     )
-    embed.add_field(name="💬 메시지", value=schedule['message'], inline=False)
-    embed.add_field(name="📺 채널", value=f"#{channel_name}", inline=True)
-    embed.add_field(name="🕐 다음 실행", value=format_timestamp(next_run), inline=True)
-    embed.add_field(name="🔄 반복 간격", value=format_interval(schedule['interval']), inline=True)
-    embed.add_field(name="📅 생성일", value=format_timestamp(schedule['date']), inline=True)
+    embed.add_field(name="스케줄 ID", value=f"#{schedule_id}", inline=True)
+    embed.add_field(name="🕐 다음 실행", value=format_timestamp(get_next_run(schedule)), inline=True)
+    embed.add_field(name="비활성화되었던 이유", value=reason, inline=False)
+    embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.avatar)
 
-    if schedule['last'] > 0:
-        embed.add_field(name="⏰ 마지막 실행", value=format_timestamp(schedule['last']), inline=True)
+    await interaction.response.send_message(embed=embed)
+
+
+def parse_id_list(text):
+    """"1, 3, 10-20" 형식의 스케줄 ID 목록을 해석합니다"""
+    ids = set()
+    for part in text.replace(" ", "").split(","):
+        if not part:
+            continue
+        start, _, end = part.lstrip("#").partition("-")
+        if not start.isdigit() or (end and not end.isdigit()):
+            raise ValueError(f"잘못된 스케줄 ID입니다: {part}")
+        first, last = int(start), int(end or start)
+        if last < first:
+            raise ValueError(f"잘못된 범위입니다: {part}")
+        if len(ids) + last - first + 1 > BULK_ID_LIMIT:
+            raise ValueError(f"한 번에 최대 {BULK_ID_LIMIT}개의 ID까지 지정할 수 있습니다.")
+        ids.update(range(first, last + 1))
+    return ids
+
+
+async def select_schedules(guild_id, user_id, schedule_ids, channel, contains):
+    """ID 목록, 채널, 메시지 내용으로 사용자의 스케줄을 고릅니다 (주어진 조건을 모두 만족해야 함)"""
+    if schedule_ids is None and channel is None and contains is None:
+        raise ValueError("schedule_ids, channel, contains 중 하나 이상을 입력해주세요.")
+    if schedule_ids is not None:
+        # ID 목록이 있으면 그 ID만 읽고 나머지 조건은 그 안에서 확인 (사용자의 스케줄 수와 무관)
+        candidates = await store.find_many(parse_id_list(schedule_ids), guild_id, user_id)
+    else:
+        candidates = await store.user_schedules(guild_id, user_id)
+    return [schedule for schedule in candidates
+            if (channel is None or schedule['channel'] == channel.id)
+            and (contains is None or contains in schedule['message'])]
+
+
+def format_schedule_ids(schedule_ids):
+    """스케줄 ID 목록을 앞에서부터 ORPHAN_REPORT_PREVIEW개까지 나열합니다"""
+    listed = ", ".join(f"#{schedule_id}" for schedule_id in schedule_ids[:ORPHAN_REPORT_PREVIEW])
+    if len(schedule_ids) > ORPHAN_REPORT_PREVIEW:
+        listed += f" 외 {len(schedule_ids) - ORPHAN_REPORT_PREVIEW}개"
+    return listed
+
+
+async def run_bulk(interaction, title, selectors, apply):
+    """조건에 맞는 스케줄에 apply를 한 번에 적용하고 결과를 알립니다
+
+    apply(스케줄 목록)는 저장소에 한 번에 반영한 뒤 (바뀐 스케줄 목록, {건너뛴 이유: 스케줄 목록})을 반환합니다.
+    """
+    # 스케줄이 많으면 응답 시간이 지날 수 있으므로 먼저 응답을 미룸
+    await interaction.response.defer(thinking=True)
+    try:
+        selected = await select_schedules(interaction.guild_id, interaction.user.id, *selectors)
+    except ValueError as e:
+        selected, error = [], str(e)
     else:
-        embed.add_field(name="⏰ 마지막 실행", value="아직 실행되지 않음", inline=True)
+        error = "조건에 맞는 스케줄이 없습니다."
+    if not selected:
+        embed = discord.Embed(title="❌ 오류", description=error, color=0xff0000)
+        await interaction.followup.send(embed=embed)
+        return
+
+    changed, skipped = await apply(selected)
+    await store.commit()
+
+    embed = discord.Embed(title=title, color=0x00ff00, timestamp=datetime.datetime.now())
+    embed.add_field(name=f"✅ 처리한 스케줄 {len(changed)}개",
+                    value=format_schedule_ids([schedule['id'] for schedule in changed]) or "없음", inline=False)
+    for reason, schedules in skipped.items():
+        if schedules:
+            embed.add_field(name=f"⚠️ 건너뛴 스케줄 {len(schedules)}개 ({reason})",
+                            value=format_schedule_ids([schedule['id'] for schedule in schedules]), inline=False)
+    embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.avatar)
+    await interaction.followup.send(embed=embed)
+
+
+async def delete_many(schedules):
+    """스케줄들을 한 번에 삭제합니다"""
+    await store.remove_many(schedules)
+    for schedule in schedules:
+        unschedule(schedule['id'])
+    return schedules, {}
+
+
+async def pause_many(schedules):
+    """활성 스케줄들을 한 번에 일시 정지하고 디스패처에서 뺍니다"""
+    active = [schedule for schedule in schedules if not schedule['disabled']]
+    disabled = [schedule for schedule in schedules if schedule['disabled']]
+    await store.update_many([(schedule, {'disabled': PAUSED}) for schedule in active])
+    for schedule in active:
+        reschedule(schedule)
+    return active, {"이미 꺼져 있음": disabled}
+
+
+async def resume_many(schedules):
+    """꺼진 스케줄들을 한 번에 다시 켭니다 (멈춘 동안 지나간 실행은 건너뛰고 다음 실행부터)"""
+    now = int(time.time())
+    active = [schedule for schedule in schedules if not schedule['disabled']]
+    updates = []
+    for schedule in schedules:
+        if not schedule['disabled']:
+            continue
+        changes = {'disabled': ""}
+        if get_next_run(schedule) <= now:
+            changes['last'] = plan_run(schedule, now)[1]  # 지나간 마지막 슬롯을 실행한 것으로 기록
+        updates.append((schedule, changes))
+    await store.update_many(updates)
+    for schedule, _ in updates:
+        reschedule(schedule)
+    return [schedule for schedule, _ in updates], {"이미 켜져 있음": active}
+
+
+def shift_many(minutes):
+    """스케줄들의 실행 시각을 minutes분 옮기는 apply 함수를 만듭니다"""
+    async def apply(schedules):
+        delta, now = minutes * 60, time.time()
+        updates, rules, past = [], [], []
+        for schedule in schedules:
+            if schedule['rule']:
+                rules.append(schedule)  # cron 규칙은 규칙 자체를 고쳐야 함 (/update)
+            elif get_next_run(schedule) + delta < now:
+                past.append(schedule)
+            else:
+                changes = {'date': schedule['date'] + delta}
+                if schedule['last'] > 0:
+                    changes['last'] = schedule['last'] + delta  # 이후 실행 시각도 같은 만큼 옮김
+                updates.append((schedule, changes))
+        await store.update_many(updates)
+        for schedule, _ in updates:
+            reschedule(schedule)
+        return [schedule for schedule, _ in updates], {"cron 규칙 스케줄": rules, "과거 시간이 됨": past}
+    return apply
+
+
+@bot.tree.command(name="bulk_delete", description="여러 스케줄을 한 번에 삭제합니다 (ID 목록, 채널, 메시지 내용으로 선택)")
+@instrumented("bulk_delete")
+async def bulk_delete_schedules(
+        interaction: discord.Interaction,
+        schedule_ids: str = None,
+        channel: discord.TextChannel = None,
+        contains: str = None
+):
+    await run_bulk(interaction, "🗑️ 스케줄 일괄 삭제 완료", (schedule_ids, channel, contains), delete_many)
+
+
+@bot.tree.command(name="pause", description="스케줄을 일시 정지합니다 (ID 목록, 채널, 메시지 내용으로 선택)")
+@instrumented("pause")
+async def pause_schedules(
+        interaction: discord.Interaction,
+        schedule_ids: str = None,
+        channel: discord.TextChannel = None,
+        contains: str = None
+):
+    await run_bulk(interaction, "⏸️ 스케줄 일시 정지 완료", (schedule_ids, channel, contains), pause_many)
+
+
+@bot.tree.command(name="resume", description="일시 정지하거나 비활성화된 스케줄을 다시 켭니다 (ID 목록, 채널, 메시지 내용으로 선택)")
+@instrumented("resume")
+async def resume_schedules(
+        interaction: discord.Interaction,
+        schedule_ids: str = None,
+        channel: discord.TextChannel = None,
+        contains: str = None
+):
+    await run_bulk(interaction, "▶️ 스케줄 다시 켜기 완료", (schedule_ids, channel, contains), resume_many)
+
+
+@bot.tree.command(name="shift", description="여러 스케줄의 실행 시각을 한 번에 옮깁니다 (분 단위, 음수면 앞당김)")
+@instrumented("shift")
+async def shift_schedules(
+        interaction: discord.Interaction,
+        minutes: int,
+        schedule_ids: str = None,
+        channel: discord.TextChannel = None,
+        contains: str = None
+):
+    await run_bulk(interaction, "🕐 스케줄 시각 이동 완료", (schedule_ids, channel, contains), shift_many(minutes))
+
+
+@bot.tree.command(name="info", description="특정 스케줄의 상세 정보를 봅니다")
+@instrumented("info")
+async def schedule_info(interaction: discord.Interaction, schedule_id: int):
+    schedule = await find_schedule_by_id(schedule_id, interaction.guild_id, interaction.user.id)
+
+    if not schedule:
+        embed = discord.Embed(
+            title="❌ 오류",
+            description=f"스케줄 #{schedule_id}를 찾을 수 없습니다.",
+            color=0xff0000
+        )
+        await interaction.response.send_message(embed=embed)
+        return
+
+    embed = discord.Embed(
+        title=f"📋 스케줄 #{schedule['id']} 정보",
+        color=0x808080 if schedule['disabled'] else 0x3498db,
+        timestamp=datetime.datetime.now()
+    )
+    with tracer.span("render"):
+        for name, value, inline in cached_fields("info", schedule, render_info_fields):
+            embed.add_field(name=name, value=value, inline=inline)
 
     embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.avatar)
     embed.set_footer(text=f"스케줄 ID: {schedule['id']}")
@@ -378,10 +1020,30 @@ async def schedule_info(interaction: discord.Interaction, schedule_id: int):
 
 
 @bot.tree.command(name="export", description="내 스케줄 목록을 JSON 파일로 내보냅니다")
-async def export_schedules(interaction: discord.Interaction):
-    user_schedules = get_user_schedules(interaction.guild_id, interaction.user.id)
+@instrumented("export")
+async def export_schedules(
+        interaction: discord.Interaction,
+        ndjson: bool = False,
+        compress: bool = False,
+        guild_wide: bool = False
+):
+    # 서버 전체 내보내기는 서버 관리 권한이 있는 관리자만 가능
+    if guild_wide and not interaction.user.guild_permissions.manage_guild:
+        embed = discord.Embed(
+            title="❌ 오류",
+            description="서버 전체 스케줄을 내보내려면 서버 관리 권한이 필요합니다.",
+            color=0xff0000
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
 
-    if not user_schedules:
+    user_id = None if guild_wide else interaction.user.id
+    if guild_wide:
+        total = await store.server_count(interaction.guild_id)
+    else:
+        total = await store.user_count(interaction.guild_id, user_id)
+
+    if not total:
         embed = discord.Embed(
             title="❌ 오류",
             description="내보낼 스케줄이 없습니다.",
@@ -390,49 +1052,56 @@ async def export_schedules(interaction: discord.Interaction):
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
 
-    # 사용자 스케줄을 export용 형태로 변환 (민감한 정보 제외)
-    export_data = {
-        "export_info": {
+    # 파일 작성에 시간이 걸릴 수 있으므로 먼저 응답을 미룸
+    await interaction.response.defer(ephemeral=True, thinking=True)
+
+    now = datetime.datetime.now()
+    writer = ExportWriter(
+        {
             "user_id": interaction.user.id,
             "username": interaction.user.display_name,
             "guild_id": interaction.guild_id,
-            "export_date": datetime.datetime.now().isoformat(),
-            "total_schedules": len(user_schedules)
+            "export_date": now.isoformat(),
+            "total_schedules": total,
+            "guild_wide": guild_wide
         },
-        "schedules": []
-    }
-
-    for schedule in user_schedules:
-        export_schedule = {
-            "id": schedule['id'],
-            "channel": schedule['channel'],
-            "message": schedule['message'],
-            "date": schedule['date'],
-            "interval": schedule['interval'],
-            "last": schedule['last']
-        }
-        export_data["schedules"].append(export_schedule)
-
-    # JSON 파일 생성
-    json_content = json.dumps(export_data, indent=2, ensure_ascii=False)
-
-    # 파일 생성 및 전송
-    file = discord.File(
-        io.BytesIO(json_content.encode('utf-8')),
-        filename=f"schedules_{interaction.user.display_name}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        file_format="ndjson" if ndjson else "json",
+        compress=compress,
+        part_size=min(EXPORT_PART_SIZE, interaction.guild.filesize_limit if interaction.guild else EXPORT_PART_SIZE)
     )
 
+    # 사용자 스케줄을 export용 형태로 변환 (민감한 정보 제외) 하면서 배치 단위로 임시 파일에 기록
+    async for batch in store.iter_schedules(interaction.guild_id, user_id, EXPORT_BATCH_SIZE):
+        rows = [export_row(schedule, include_user=guild_wide) for schedule in batch]
+        await asyncio.to_thread(writer.write_rows, rows)
+    parts = await asyncio.to_thread(writer.close)
+
+    basename = f"schedules_{'guild' if guild_wide else interaction.user.display_name}_{now.strftime('%Y%m%d_%H%M%S')}"
+    files = [discord.File(part, filename=filename)
+             for (part, _), filename in zip(parts, writer.filenames(basename))]
+
     embed = discord.Embed(
         title="📤 스케줄 내보내기 완료",
         color=0x00ff00,
-        timestamp=datetime.datetime.now()
+        timestamp=now
     )
-    embed.add_field(name="📊 내보낸 스케줄 수", value=f"{len(user_schedules)}개", inline=True)
-    embed.add_field(name="📅 내보내기 날짜", value=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), inline=True)
+    embed.add_field(name="📊 내보낸 스케줄 수", value=f"{writer.total}개", inline=True)
+    embed.add_field(name="📅 내보내기 날짜", value=now.strftime("%Y-%m-%d %H:%M:%S"), inline=True)
+    if len(files) > 1:
+        embed.add_field(name="🗂️ 파일 수", value=f"{len(files)}개", inline=True)
     embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.avatar)
     embed.set_footer(text="JSON 파일을 다운로드하여 백업하세요!")
 
-    await interaction.response.send_message(embed=embed, file=file, ephemeral=True)
+    try:
+        # 메시지 하나에 첨부할 수 있는 파일은 최대 10개
+        for start in range(0, len(files), 10):
+            if start == 0:
+                await interaction.followup.send(embed=embed, files=files[:10], ephemeral=True)
+            else:
+                await interaction.followup.send(files=files[start:start + 10], ephemeral=True)
+    finally:
+        for part, _ in parts:
+            part.close()
 
 
 class ImportScheduleModal(discord.ui.Modal, title="📥 스케줄 가져오기 옵션"):
@@ -454,83 +1123,14 @@ class ImportScheduleModal(discord.ui.Modal, title="📥 스케줄 가져오기 
         required=False
     )
 
+    @instrumented("import_modal")
     async def on_submit(self, interaction: discord.Interaction):
-        global next_id
-
         try:
-            import_data = json.loads(self.json_content.value)
-
-            # JSON 구조 검증
-            if "schedules" not in import_data or not isinstance(import_data["schedules"], list):
-                raise ValueError("올바르지 않은 JSON 구조입니다.")
-
-            # 기존 스케줄 처리
-            if self.overwrite.value.lower() == "overwrite":
-                # 사용자의 기존 스케줄 모두 삭제
-                global schedules
-                schedules = [s for s in schedules
-                             if not (s['server'] == interaction.guild_id and s['user'] == interaction.user.id)]
-
-            imported_count = 0
-            skipped_count = 0
-
-            for schedule_data in import_data["schedules"]:
-                try:
-                    # 필수 필드 검증
-                    required_fields = ['channel', 'message', 'date', 'interval']
-                    if not all(field in schedule_data for field in required_fields):
-                        skipped_count += 1
-                        continue
-
-                    # 채널 존재 여부 확인
-                    channel = bot.get_channel(schedule_data['channel'])
-                    if not channel or channel.guild.id != interaction.guild_id:
-                        skipped_count += 1
-                        continue
-
-                    # 과거 시간 확인
-                    schedule_time = schedule_data['date']
-                    if schedule_data.get('last', 0) == 0:  # 아직 실행되지 않은 스케줄
-                        if schedule_time < time.time():
-                            skipped_count += 1
-                            continue
-
-                    new_schedule = {
-                        'id': next_id,
-                        'server': interaction.guild_id,
-                        'channel': schedule_data['channel'],
-                        'message': schedule_data['message'],
-                        'user': interaction.user.id,
-                        'date': schedule_data['date'],
-                        'interval': schedule_data['interval'],
-                        'last': schedule_data.get('last', 0)
-                    }
-
-                    schedules.append(new_schedule)
-                    next_id += 1
-                    imported_count += 1
-
-                except Exception as e:
-                    skipped_count += 1
-                    continue
-
-            embed = discord.Embed(
-                title="📥 스케줄 가져오기 완료",
-                color=0x00ff00,
-                timestamp=datetime.datetime.now()
-            )
-            embed.add_field(name="✅ 가져온 스케줄", value=f"{imported_count}개", inline=True)
-
-            if skipped_count > 0:
-                embed.add_field(name="⚠️ 건너뛴 스케줄", value=f"{skipped_count}개", inline=True)
-                embed.add_field(name="건너뛴 이유",
-                                value="• 채널이 존재하지 않음\n• 과거 시간 스케줄\n• 잘못된 데이터",
-                                inline=False)
-
-            embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.avatar)
-            embed.set_footer(text="가져오기가 완료되었습니다!")
-
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            overwrite = self.overwrite.value.lower() == "overwrite"
+            limit = await schedule_capacity(interaction.guild_id, interaction.user.id, overwrite)
+            accepted, skipped = await read_import(interaction.guild_id, io.StringIO(self.json_content.value), limit)
+            embed, files = await apply_import(interaction, accepted, skipped, overwrite)
+            await interaction.response.send_message(embed=embed, files=files, ephemeral=True)
 
         except json.JSONDecodeError:
             embed = discord.Embed(
@@ -555,8 +1155,106 @@ class ImportScheduleModal(discord.ui.Modal, title="📥 스케줄 가져오기 
             await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
+async def read_import(guild_id, stream, limit=None):
+    """가져올 내용을 배치 단위로 해석하고 검사해 (가져올 스케줄 목록, 건너뛴 행 목록)을 반환합니다
+
+    limit개를 넘는 스케줄은 스케줄 수 한도 초과로 건너뜁니다.
+    """
+    rows = iter_import_rows(stream)
+    validator = ImportValidator(guild_id, bot.get_channel, time.time(), limit)
+    accepted, skipped = [], []
+    # 압축 해제와 JSON 해석은 스레드에서, 채널 확인은 배치마다 이벤트 루프에서 처리
+    while batch := await asyncio.to_thread(read_batch, rows, IMPORT_BATCH_SIZE):
+        batch_accepted, batch_skipped = validator.check(batch)
+        accepted.extend(batch_accepted)
+        skipped.extend(batch_skipped)
+    return accepted, skipped
+
+
+async def apply_import(interaction, accepted, skipped, overwrite):
+    """검사를 통과한 스케줄을 한 번에 추가하고 결과 embed와 첨부 파일을 반환합니다"""
+    # 기존 스케줄 삭제와 가져온 스케줄 추가를 한 번에 기록
+    added, removed = await store.add_many(interaction.guild_id, interaction.user.id, accepted, replace=overwrite)
+    for schedule in removed:
+        unschedule(schedule['id'])
+    for start in range(0, len(added), IMPORT_BATCH_SIZE):
+        for schedule in added[start:start + IMPORT_BATCH_SIZE]:
+            reschedule(schedule)
+        await asyncio.sleep(0)
+    await store.commit()
+
+    embed = discord.Embed(
+        title="📥 스케줄 가져오기 완료",
+        color=0x00ff00,
+        timestamp=datetime.datetime.now()
+    )
+    embed.add_field(name="✅ 가져온 스케줄", value=f"{len(added)}개", inline=True)
+
+    files = []
+    if skipped:
+        reasons = {}
+        for _, reason in skipped:
+            reasons[reason] = reasons.get(reason, 0) + 1
+        embed.add_field(name="⚠️ 건너뛴 스케줄", value=f"{len(skipped)}개", inline=True)
+        embed.add_field(name="건너뛴 이유",
+                        value="\n".join(f"• {reason}: {count}개" for reason, count in reasons.items()),
+                        inline=False)
+        preview = "\n".join(f"{row}번째: {reason}" for row, reason in skipped[:IMPORT_REPORT_PREVIEW])
+        if len(skipped) > IMPORT_REPORT_PREVIEW:
+            # 전체 목록은 첨부 파일로 전달
+            preview += f"\n... 외 {len(skipped) - IMPORT_REPORT_PREVIEW}개 (첨부 파일 참고)"
+            report = "\n".join(f"{row}\t{reason}" for row, reason in skipped)
+            files.append(discord.File(io.BytesIO(report.encode('utf-8')), filename="import_skipped.tsv"))
+        embed.add_field(name="건너뛴 행", value=preview, inline=False)
+
+    embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.avatar)
+    embed.set_footer(text="가져오기가 완료되었습니다!")
+    return embed, files
+
+
+async def import_attachment(interaction, attachment, overwrite):
+    """업로드된 파일(JSON, NDJSON, gzip)에서 스케줄을 가져옵니다"""
+    # 파일을 읽는 동안 응답 시간이 지나지 않도록 먼저 응답을 미룸
+    await interaction.response.defer(ephemeral=True, thinking=True)
+
+    try:
+        data = await attachment.read()
+        limit = await schedule_capacity(interaction.guild_id, interaction.user.id, overwrite)
+        accepted, skipped = await read_import(interaction.guild_id, await asyncio.to_thread(open_import, data), limit)
+    except (ValueError, EOFError, OSError) as e:  # JSON, UTF-8, gzip 오류
+        embed = discord.Embed(
+            title="❌ 데이터 오류",
+            description=f"파일을 읽을 수 없습니다: {e}",
+            color=0xff0000
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        return
+
+    try:
+        embed, files = await apply_import(interaction, accepted, skipped, overwrite)
+    except Exception as e:  # 저장소 오류 등 (응답을 미뤘으므로 알리지 않으면 계속 생각 중으로 남음)
+        embed = discord.Embed(
+            title="❌ 오류",
+            description=f"가져오기 중 오류가 발생했습니다: {str(e)}",
+            color=0xff0000
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        return
+    await interaction.followup.send(embed=embed, files=files, ephemeral=True)
+
+
 @bot.tree.command(name="import", description="JSON 파일에서 스케줄을 가져옵니다")
-async def import_schedules(interaction: discord.Interaction):
+@instrumented("import")
+async def import_schedules(
+        interaction: discord.Interaction,
+        file: discord.Attachment = None,
+        overwrite: bool = False
+):
+    # 파일을 올리면 JSON, NDJSON, gzip 파일을 바로 가져옴
+    if file is not None:
+        await import_attachment(interaction, file, overwrite)
+        return
+
     embed = discord.Embed(
         title="📥 스케줄 가져오기",
         description="**사용법:**\n"
@@ -575,38 +1273,862 @@ async def import_schedules(interaction: discord.Interaction):
     await interaction.response.send_modal(modal)
 
 
+async def run_schedule(schedule_id, current_time):
+    """스케줄 메시지를 전송하고 다음 실행 시각을 등록합니다"""
+    schedule = await store.get(schedule_id)  # 메시지 본문은 전송 시점에 불러옴
+    if not schedule or schedule['disabled']:
+        retry_attempts.pop(schedule_id, None)
+        dispatcher.complete(schedule_id)
+        return
+
+    next_run = get_next_run(schedule)
+    if next_run > current_time:
+        complete_run(schedule, next_run)
+        return
+
+    send, slot = plan_run(schedule, current_time, CATCHUP_POLICY, CATCHUP_LIMIT, CATCHUP_GRACE)
+    with tracer.span("get_channel"):
+        channel = get_send_channel(schedule['channel'], schedule['server'])
+    error = None
+    if not send:
+        await store.update(schedule, last=slot)
+        print(f"스케줄 #{schedule['id']} 밀린 실행 건너뜀")
+    elif channel:
+        error = (await send_messages(channel, [(schedule, slot)])).get(schedule_id)
+    else:
+        SEND_ERRORS.inc(error="ChannelNotFound")
+        error = channel_missing_error(schedule)
+    await finish_run(schedule, slot, error, current_time)
+
+
+async def run_channel_batch(channel_id, schedule_ids, current_time):
+    """같은 채널에 실행할 스케줄 메시지를 2000자 이내로 합쳐 가능한 적은 횟수로 전송합니다
+
+    COALESCE_WINDOW 안에 실행될 메시지는 조금 일찍 함께 보내며, last와 실패 처리는 스케줄마다 따로 합니다.
+    """
+    runs = []  # (스케줄, 기록할 슬롯)
+    for schedule_id in schedule_ids:
+        schedule = await store.get(schedule_id)
+        if not schedule or schedule['disabled'] or schedule['channel'] != channel_id:
+            await run_schedule(schedule_id, current_time)  # 도중에 바뀐 스케줄은 따로 처리
+            continue
+        next_run = get_next_run(schedule)
+        if next_run > current_time + COALESCE_WINDOW:
+            complete_run(schedule, next_run)
+            continue
+        send, slot = plan_run(schedule, max(current_time, next_run), CATCHUP_POLICY, CATCHUP_LIMIT, CATCHUP_GRACE)
+        if send:
+            runs.append((schedule, slot))
+        else:
+            await store.update(schedule, last=slot)
+            print(f"스케줄 #{schedule['id']} 밀린 실행 건너뜀")
+            await finish_run(schedule, slot, None, current_time)
+    if not runs:
+        return
+
+    with tracer.span("get_channel"):
+        channel = get_send_channel(channel_id, runs[0][0]['server'])
+    errors = {}
+    if channel:
+        for chunk in pack_messages(runs, lambda run: run[0]['message'], MAX_MESSAGE_LENGTH, COALESCE_SEPARATOR):
+            errors.update(await send_messages(channel, chunk))
+    else:
+        SEND_ERRORS.inc(error="ChannelNotFound")
+        error = channel_missing_error(runs[0][0])
+        errors = {schedule['id']: error for schedule, _ in runs}
+    for schedule, slot in runs:
+        await finish_run(schedule, slot, errors.get(schedule['id']), current_time)
+
+
+async def send_messages(channel, runs):
+    """(스케줄, 슬롯) 목록의 메시지를 한 번에 보내고 실패한 스케줄의 {ID: 오류}를 반환합니다"""
+    if lease is not None:
+        runs = await claim_runs(runs)
+        if not runs:
+            return {}
+    await commit_runs()  # 앞서 기록한 실행이 전송을 기다리는 동안 쓰기 잠금을 잡고 있지 않도록
+    content = COALESCE_SEPARATOR.join(schedule['message'] for schedule, _ in runs)
+    try:
+        with SEND_SECONDS.time(), tracer.span("discord.send", messages=len(runs)):
+            await channel.send(content)
+    except Exception as e:
+        SEND_ERRORS.inc(error=type(e).__name__)
+        if len(runs) > 1 and isinstance(e, discord.HTTPException) and e.status == 400:
+            # 합친 메시지 중 어느 것 때문에 거부되었는지 알 수 없으므로 하나씩 다시 보냄
+            errors = {}
+            for run in runs:
+                errors.update(await send_messages(channel, [run]))
+            return errors
+        for schedule, _ in runs:
+            print(f"스케줄 #{schedule['id']} 실행 오류: {e}")
+        return {schedule['id']: e for schedule, _ in runs}
+
+    if len(runs) > 1:
+        COALESCED_MESSAGES.inc(len(runs))
+    for schedule, slot in runs:
+        lateness = max(0, dispatcher.clock() - slot)
+        FIRING_LATENESS.observe(lateness)
+        if lateness <= ON_TIME_LATENESS:
+            mark_startup("first_on_time_firing")
+        await store.update(schedule, last=slot)
+        print(f"스케줄 #{schedule['id']} 실행됨")
+    return {}
+
+
+async def commit_runs():
+    """sqlite 저장소에 기록한 실행 결과를 바로 커밋합니다
+
+    커밋하지 않은 쓰기 트랜잭션은 DB 쓰기 잠금을 잡고 있으므로, 전송을 기다리는 동안 같은 DB를 쓰는
+    다른 프로세스(게이트웨이/워커, 샤드)가 database is locked로 실패하지 않도록 작업마다 커밋합니다.
+    메모리 저장소의 로그는 group commit이 따로 기록하므로 기다리지 않습니다.
+    """
+    if STORAGE_BACKEND == "sqlite":
+        await store.commit()
+
+
+async def claim_runs(runs):
+    """fencing 토큰으로 슬롯을 claim하고 이 인스턴스가 보내야 할 실행만 돌려줍니다 (FAILOVER)"""
+    claimed = await lease.claim([(schedule['id'], slot) for schedule, slot in runs])
+    for schedule, slot in runs:
+        if (schedule['id'], slot) not in claimed:
+            # 이전 활성 인스턴스가 맡은 슬롯은 보냈는지 알 수 없으므로 다시 보내지 않음 (최대 한 번)
+            await store.update(schedule, last=slot)
+            print(f"스케줄 #{schedule['id']} 다른 인스턴스가 이미 실행함")
+    return [(schedule, slot) for schedule, slot in runs if (schedule['id'], slot) in claimed]
+
+
+async def finish_run(schedule, slot, error, current_time):
+    """실행 결과에 따라 다음 실행 시각이나 재시도 시각을 등록합니다"""
+    schedule_id = schedule['id']
+    if schedule['last'] != slot:
+        # 실행하지 못한 스케줄은 재시도 대기열로 보내거나 비활성화
+        retry_at = await handle_send_failure(schedule, error, current_time)
+        dispatcher.complete(schedule_id, retry_at, dispatch_item(schedule))
+        return
+    retry_attempts.pop(schedule_id, None)
+    # 아직 밀린 실행이 남았다면 몰아서 보내지 않도록 간격을 둠
+    complete_run(schedule, max(get_next_run(schedule), current_time + CATCHUP_SPACING))
+
+
+def complete_run(schedule, next_run):
+    """처리를 마친 스케줄의 다음 실행 시각을 디스패처에 등록합니다"""
+    if in_dispatch_window(next_run):
+        dispatcher.complete(schedule['id'], next_run, dispatch_item(schedule))
+    else:
+        dispatcher.complete(schedule['id'])
+
+
+class PermanentSendError(Exception):
+    """다시 시도해도 성공할 수 없는 전송 오류"""
+
+
+def channel_missing_error(schedule):
+    """채널을 찾지 못한 원인을 반환합니다 (서버가 일시적으로 보이지 않으면 None)"""
+    guild = bot.get_guild(schedule['server'])
+    if guild is None or guild.unavailable:
+        return None  # 서버 장애나 연결 직후에는 채널 캐시가 비어 있을 수 있음
+    return PermanentSendError("채널을 찾을 수 없습니다")
+
+
+def backoff_delay(attempt):
+    """attempt번째 재시도까지 기다릴 시간을 지수적으로 늘리고 지터를 더해 계산합니다"""
+    delay = min(RETRY_MAX_DELAY, RETRY_DELAY * 2 ** (attempt - 1))
+    return random.uniform(delay / 2, delay)  # 한꺼번에 실패한 스케줄이 동시에 재시도하지 않도록 분산
+
+
+async def handle_send_failure(schedule, error, current_time):
+    """전송 실패를 처리하고 다음 재시도 시각을 반환합니다 (비활성화하면 None)"""
+    schedule_id = schedule['id']
+    attempt = retry_attempts.get(schedule_id, 0) + 1
+    if isinstance(error, PermanentSendError):
+        reason = str(error)
+    elif isinstance(error, (discord.Forbidden, discord.NotFound)):
+        reason = f"{type(error).__name__}: {error}"
+    elif attempt > RETRY_LIMIT:
+        reason = f"{RETRY_LIMIT}번 재시도 실패: {error or '채널을 찾을 수 없습니다'}"
+    else:
+        retry_attempts[schedule_id] = attempt
+        SEND_RETRIES.inc()
+        return current_time + int(backoff_delay(attempt))
+
+    # 영구적인 오류는 더 이상 실행하지 않고 소유자가 /enable로 다시 켤 때까지 보관
+    retry_attempts.pop(schedule_id, None)
+    await store.update(schedule, disabled=reason[:DISABLED_REASON_LENGTH])
+    SCHEDULES_DISABLED.inc(error=type(error).__name__ if error else "ChannelUnavailable")
+    print(f"스케줄 #{schedule_id} 비활성화: {reason}")
+    return None
+
+
+def coalesce_enabled(guild_id, channel_id):
+    """채널에 실행할 메시지를 합쳐 보내도록 설정되었는지 확인합니다 (채널 캐시 없이 디스패처 항목의 서버 ID로)"""
+    return channel_id in COALESCE_CHANNELS or COALESCE_GUILDS.strip() == "*" or guild_id in coalesce_guilds
+
+
+def collect_due(current_time):
+    """실행할 (서버, 채널, 작업) 목록을 만듭니다
+
+    메시지를 합쳐 보내는 채널은 COALESCE_WINDOW 안에 실행될 스케줄까지 꺼내 채널마다 작업 하나로 묶습니다.
+    서버나 사용자의 분당 실행 수 한도를 넘은 스케줄은 토큰이 생기는 시각에 맞춰 나눠서 미룹니다.
+    """
+    coalescing = COALESCE_WINDOW > 0 and (COALESCE_GUILDS.strip() or COALESCE_CHANNELS)
+    popped = dispatcher.pop_due(current_time + COALESCE_WINDOW if coalescing else current_time)
+    due, batches, enabled = [], {}, {}
+    deferred = {}  # 한도 키 -> 이번에 미룬 수 (미룬 스케줄이 다음에 한꺼번에 꺼내지지 않도록 간격을 둠)
+
+    def admit(schedule_id, item):
+        """한도 안이면 토큰을 쓰고 True를, 넘으면 스케줄을 미루고 False를 반환합니다"""
+        guild_key, user_key = item[0], item[:2]
+        guild_wait, user_wait = guild_rate.delay(guild_key), user_rate.delay(user_key)
+        if not guild_wait and not user_wait:
+            guild_rate.take(guild_key)
+            user_rate.take(user_key)
+            return True
+        scope, limiter, key = ("guild", guild_rate, guild_key) if guild_wait >= user_wait \
+            else ("user", user_rate, user_key)
+        backlog = deferred[key] = deferred.get(key, 0) + 1
+        wait = max(guild_wait, user_wait) + (backlog - 1) * 60 / limiter.rate
+        dispatcher.schedule(schedule_id, current_time + math.ceil(wait), item)
+        RATE_LIMITED.inc(scope=scope)
+        return False
+
+    for schedule_id, when, item in popped:
+        guild_id, _, channel_id = item
+        if channel_id not in enabled:
+            enabled[channel_id] = bool(coalescing) and coalesce_enabled(guild_id, channel_id)
+        if enabled[channel_id]:
+            batches.setdefault(channel_id, []).append((when, schedule_id, item))
+        elif when > current_time:
+            dispatcher.schedule(schedule_id, when, item)  # 아직 실행 시각이 아님
+        elif admit(schedule_id, item):
+            due.append((guild_id, channel_id, schedule_id))
+
+    for channel_id, entries in batches.items():
+        entries.sort()
+        if entries[0][0] > current_time:  # 이 채널에는 아직 실행할 메시지가 없음
+            for when, schedule_id, item in entries:
+                dispatcher.schedule(schedule_id, when, item)
+            continue
+        guild_id = entries[0][2][0]
+        schedule_ids = [schedule_id for _, schedule_id, item in entries if admit(schedule_id, item)]
+        if len(schedule_ids) == 1:
+            due.append((guild_id, channel_id, schedule_ids[0]))
+        elif schedule_ids:
+            due.append((guild_id, channel_id, (channel_id, schedule_ids)))
+    return due
+
+
+async def run_job(entry):
+    """전송 대기열에서 꺼낸 (꺼낸 시각, 작업)을 처리합니다"""
+    current_time, job = entry
+    try:
+        if isinstance(job, tuple):
+            await run_channel_batch(*job, current_time)
+        else:
+            await run_schedule(job, current_time)
+        await commit_runs()
+    except LeaseLost:
+        pass  # 다른 인스턴스가 넘겨받았으므로 보내지 않고 그대로 둠
+    except Exception as e:
+        # 저장소 오류(database is locked 등)로 처리하지 못한 스케줄은 디스패처에서 빠지지 않도록 다시 등록
+        schedule_ids = job[1] if isinstance(job, tuple) else (job,)
+        print(f"스케줄 {format_schedule_ids(schedule_ids)} 처리 오류, {RETRY_DELAY}초 뒤 다시 시도합니다: {e!r}")
+        for schedule_id in schedule_ids:
+            dispatcher.complete(schedule_id, current_time + RETRY_DELAY)
+
+
+send_queue = SendQueue(tracer.traced("run_schedule")(run_job), SEND_CONCURRENCY, CHANNEL_SEND_CONCURRENCY)
+Gauge("scheduler_send_queue_pending", "전송 대기열에서 기다리거나 보내는 중인 작업 수",
+      collector=lambda: {(): len(send_queue)})
+
+
+def burst_sent(count, started):
+    """한 번에 꺼낸 작업이 모두 처리되기까지 걸린 시간을 기록합니다"""
+    elapsed = time.perf_counter() - started
+    BURST_SECONDS.observe(elapsed)
+    print(f"스케줄 {count}개 처리 완료 ({elapsed:.2f}초)")
+
+
+async def dispatch_due(current_time):
+    """실행 시각이 된 스케줄을 전송 대기열에 넣고 넣은 작업 수를 반환합니다
+
+    전송이 끝나기를 기다리지 않으므로 느리거나 429로 기다리는 채널이 다음 실행 시각의 스케줄을 막지 않습니다.
+    """
+    if lease is not None and not lease.held:
+        return 0  # 리스가 만료됨 (renew_lease가 다시 연장하거나 종료함)
+    started = time.perf_counter()
+    with tracer.span("tick"):
+        due = collect_due(current_time)
+    if not due:
+        return 0
+    # 워커는 처음 넣을 때 만들어지므로 tick span 밖에서 넣어 전송 span이 첫 tick에 묶이지 않도록 함
+    done = send_queue.submit([(guild_id, channel_id, (current_time, job)) for guild_id, channel_id, job in due])
+    TICK_SECONDS.observe(time.perf_counter() - started)
+    TICK_DUE.observe(len(due))
+    done.add_done_callback(lambda _: burst_sent(len(due), started))
+    return len(due)
+
+
 # 스케줄 실행 루프
-@tasks.loop(seconds=60)  # 1분마다 확인
+@tasks.loop()  # 가장 이른 스케줄의 실행 시각까지 대기
 async def check_schedules():
-    current_time = int(time.time())
+    await dispatcher.wait_due()
+    await dispatch_due(int(dispatcher.clock()))
+
+
+@check_schedules.error
+async def restart_check_schedules(error):
+    """실행 루프가 예상하지 못한 오류로 멈추면 잠시 뒤 다시 시작합니다"""
+    print(f"스케줄 실행 루프 오류, 다시 시작합니다: {error!r}")
+    await asyncio.sleep(1)  # 같은 오류가 반복될 때 루프가 쉬지 않고 돌지 않도록
+    check_schedules.restart()
+
+
+async def extend_dispatch_window(window=DISPATCH_WINDOW):
+    """실행 시각이 window 안으로 들어온 스케줄을 디스패처에 불러옵니다 (sqlite)"""
+    global dispatch_until
+    start, dispatch_until = dispatch_until, int(dispatcher.clock()) + window
+    for schedule_id, guild_id, user_id, channel_id, next_run in await store.fire_times(start, dispatch_until):
+        if schedule_id not in dispatcher:
+            dispatcher.schedule(schedule_id, next_run, (guild_id, user_id, channel_id))
+
+
+# 디스패처 범위 확장 루프 (sqlite)
+@tasks.loop(seconds=max(1, DISPATCH_WINDOW // 2))
+async def fill_dispatcher():
+    await extend_dispatch_window()
+
+
+# 스냅샷 저장 루프
+@tasks.loop(seconds=COMPACT_INTERVAL)
+async def compact_schedules():
+    if not schedule_log.records or (lease is not None and not lease.held):
+        return  # 리스가 만료되었으면 넘겨받은 인스턴스의 스냅샷을 덮어쓰지 않음
+    started = time.perf_counter()
+    # 로그를 교체하기 직전에 리스를 다시 확인 (그 사이 넘겨주었으면 저장하지 않음)
+    if await schedule_log.compact(store, lease.acquire if lease is not None else None):
+        print(f"스케줄 스냅샷 저장 완료 ({len(store)}개, {time.perf_counter() - started:.2f}초)")
+
+
+# 리스 연장 루프 (FAILOVER)
+@tasks.loop(seconds=LEASE_HEARTBEAT)
+async def renew_lease():
+    if not await lease.acquire():
+        # 멈춰 있는 동안 다른 인스턴스가 넘겨받음: 다시 시작하면 대기 인스턴스로 돌아감
+        print("리스를 잃어 실행을 멈추고 종료합니다")
+        check_schedules.cancel()
+        compact_schedules.cancel()
+        await bot.close()
+
+
+# claim 기록 정리 루프 (FAILOVER)
+@tasks.loop(hours=1)
+async def prune_claims():
+    await lease.prune(int(time.time()) - CLAIM_RETENTION)
+
+
+async def shutdown():
+    """실행을 멈추고 로그를 기록한 뒤 리스를 넘겨주고 종료합니다 (FAILOVER)"""
+    if lease.held:
+        check_schedules.cancel()
+        renew_lease.cancel()
+        compact_schedules.cancel()
+        await send_queue.close()  # 보내는 중인 메시지까지 기록한 뒤 넘겨줌
+        await store.commit()
+        await lease.release()  # 대기 인스턴스가 LEASE_TTL을 기다리지 않고 바로 넘겨받음
+        print("리스를 넘겨주고 종료합니다")
+    await bot.close()
+
+
+def start_profiler():
+    """PROFILE_SECONDS 동안 샘플링 프로파일러를 실행합니다"""
+    path = profiler.start(PROFILE_SECONDS)
+    if path:
+        print(f"프로파일링 시작 ({PROFILE_SECONDS}초): {path}")
+    else:
+        print("프로파일링이 이미 실행 중입니다")
+
+
+async def send_snapshot():
+    """새로 연결된 워커에 스케줄 사본을 처음부터 보냅니다 (게이트웨이)"""
+    dispatch_link.send({'op': 'reset'})
+    if not schedule_log:
+        return  # sqlite 저장소는 워커가 같은 DB 파일을 직접 읽음
+    ids = [schedule['id'] for schedule in store]
+    for start in range(0, len(ids), SNAPSHOT_BATCH_SIZE):
+        # 보내는 도중 삭제된 스케줄은 빼고, 수정된 스케줄은 최신 내용을 보냄
+        batch = [await store.get(schedule_id) for schedule_id in ids[start:start + SNAPSHOT_BATCH_SIZE]]
+        batch = [schedule for schedule in batch if schedule]
+        dispatch_link.send({'op': 'put_many', 'schedules': [schedule.copy() for schedule in batch],
+                            'versions': [[schedule['id'], edit_versions[schedule['id']]] for schedule in batch
+                                         if schedule['id'] in edit_versions]})
+        await dispatch_link.drain()
+    dispatch_link.send({'op': 'loaded'})
+    print(f"디스패처 워커에 스케줄 {len(ids)}개 전송")
+
+
+async def handle_worker_message(message):
+    """워커가 전송 결과로 바꾼 필드(last, disabled)를 저장소에 반영합니다 (게이트웨이)"""
+    if message['op'] != 'update':
+        return
+    if message['version'] < edit_versions.get(message['id'], 0):
+        return  # 워커가 게이트웨이의 수정을 받기 전에 실행한 결과 (수정된 last/disabled를 덮어쓰지 않음)
+    schedule = await store.get(message['id'])
+    if schedule is None:
+        return  # 그 사이 삭제된 스케줄
+    changes = {key: value for key, value in message['changes'].items() if schedule[key] != value}
+    if changes:
+        await store.update(schedule, **changes)
+    else:
+        # sqlite 저장소는 워커가 이미 기록했으므로 캐시만 버림
+        list_page_cache.invalidate((schedule['server'], schedule['user']))
+
+
+def forward_change(schedule):
+    """워커에서 바뀐 last와 disabled를 게이트웨이에 알립니다 (워커)"""
+    if not applying_gateway_change:
+        dispatch_link.send({'op': 'update', 'id': schedule['id'], 'version': edit_versions.get(schedule['id'], 0),
+                            'changes': {'last': schedule['last'], 'disabled': schedule['disabled']}})
+
+
+applying_gateway_change = False  # 게이트웨이가 보낸 변경을 반영하는 중이면 되돌려 보내지 않음
+
+
+async def handle_gateway_message(message):
+    """게이트웨이가 보낸 스케줄 변경을 디스패처에 반영합니다 (워커)"""
+    global applying_gateway_change, dispatch_until
+    op = message['op']
+    # 게이트웨이의 수정 번호를 기억해 두었다가 전송 결과와 함께 돌려보냄
+    if op == 'reset':
+        edit_versions.clear()
+    elif op == 'put':
+        edit_versions[message['schedule']['id']] = message['version']
+    elif op == 'put_many':
+        edit_versions.update(message['versions'])
+    elif op == 'delete':
+        edit_versions.pop(message['id'], None)
+    if STORAGE_BACKEND == "sqlite":
+        # 같은 DB를 직접 읽으므로 실행 시각만 갱신
+        if op == 'reset':
+            dispatch_until = 0  # 연결이 끊긴 동안 바뀐 스케줄을 다시 불러옴
+            await extend_dispatch_window()
+        elif op == 'put':
+            reschedule(message['schedule'])
+        elif op == 'delete':
+            dispatcher.cancel(message['id'])
+        return
+
+    applying_gateway_change = True
+    try:
+        if op == 'reset':
+            store.clear()
+            dispatcher.clear()
+            retry_attempts.clear()
+        elif op == 'put_many':
+            store.restore(message['schedules'])
+        elif op == 'loaded':
+            dispatcher.load(fire_time_entries(await store.fire_times()))
+            print(f"스케줄 {len(store)}개 받음")
+            mark_startup("schedules_loaded")
+        elif op == 'put':
+            data = message['schedule']
+            schedule = await store.get(data['id'])
+            if schedule is None:
+                store.restore([data])
+            else:
+                await store.update(schedule, **{key: value for key, value in data.items() if key != 'id'})
+            reschedule(await store.get(data['id']))
+        elif op == 'delete':
+            schedule = await store.get(message['id'])
+            if schedule is not None:
+                await store.remove(schedule)
+            dispatcher.cancel(message['id'])
+    finally:
+        applying_gateway_change = False
+
+
+async def run_worker():
+    """게이트웨이에 연결하지 않고 REST로만 메시지를 보내는 디스패처 워커를 실행합니다"""
+    store.listeners.append(forward_change)
+    await bot.login(os.getenv("TOKEN"))  # setup_hook에서 지표 서버와 실행 루프를 시작
+    try:
+        await dispatch_link.connect(DISPATCH_SOCKET, handle_gateway_message)
+    finally:
+        await bot.close()
+
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    """채널 이름이 바뀌면 그 채널을 표시하는 캐시를 버리고, 권한이 바뀌면 스케줄 상태를 맞춥니다"""
+    if before.name != after.name:
+        channel_generations[after.id] = channel_generations.get(after.id, 0) + 1
+        for schedule in await store.channel_schedules(after.id):
+            list_page_cache.invalidate((schedule['server'], schedule['user']))
+    if before.overwrites != after.overwrites and await cleanup_allowed():
+        await reconcile_guild(after.guild, await store.channel_schedules(after.id))
+
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    """삭제된 채널의 스케줄을 비활성화합니다"""
+    if await cleanup_allowed():
+        await set_disabled(orphan_targets(await store.channel_schedules(channel.id), CHANNEL_DELETED),
+                           CHANNEL_DELETED, channel.guild.name, f"채널 **#{channel.name}**이 삭제되어")
+
+
+@bot.event
+async def on_guild_remove(guild):
+    """봇이 나간 서버의 스케줄을 삭제하거나 비활성화합니다 (GUILD_REMOVE_ACTION)"""
+    if await cleanup_allowed():
+        await remove_guild_schedules(guild.id, guild.name)
+
+
+@bot.event
+async def on_guild_join(guild):
+    """봇이 다시 들어온 서버의 스케줄을 채널 상태에 맞게 다시 켭니다"""
+    if await cleanup_allowed():
+        await reconcile_guild(guild, await store.server_schedules(guild.id))
+
+
+@bot.event
+async def on_guild_role_update(before, after):
+    """봇에 적용되는 역할의 권한이 바뀌면 서버의 스케줄 상태를 맞춥니다"""
+    me = after.guild.me
+    if before.permissions != after.permissions and (after.is_default() or me is None or after in me.roles) \
+            and await cleanup_allowed():
+        await reconcile_guild(after.guild, await store.server_schedules(after.guild.id))
+
+
+async def cleanup_allowed():
+    """채널/서버 이벤트로 스케줄을 정리해도 되는지 확인합니다 (워커와 대기 인스턴스는 정리하지 않음)"""
+    if DISPATCH_ROLE == "worker" or (lease is not None and not lease.held):
+        return False
+    await schedules_loaded.wait()
+    return True
+
+
+def channel_problem(guild, channel_id):
+    """채널에 메시지를 보낼 수 없는 이유를 반환합니다 (보낼 수 있으면 빈 문자열)"""
+    channel = guild.get_channel_or_thread(channel_id)
+    if channel is None:
+        return CHANNEL_DELETED
+    if guild.me is not None:
+        permissions = channel.permissions_for(guild.me)
+        if not (permissions.view_channel and permissions.send_messages):
+            return NO_SEND_PERMISSION
+    return ""
+
+
+def orphan_targets(schedules, reason):
+    """비활성화 이유를 reason으로 바꿔야 하는 스케줄을 고릅니다
+
+    사용자나 전송 실패로 비활성화한 스케줄은 그대로 두고, 활성 스케줄과 정리로 비활성화한 스케줄만 바꿉니다.
+    """
+    return [schedule for schedule in schedules if schedule['disabled'] != reason
+            and (not schedule['disabled'] or schedule['disabled'] in AUTO_RESUMED)]
+
+
+async def reconcile_guild(guild, schedules):
+    """서버의 채널 상태에 맞게 스케줄을 비활성화하거나 다시 켭니다 (스케줄 수에 비례)"""
+    if guild.unavailable:
+        return  # 장애 중에는 채널 캐시를 믿을 수 없음
+    problems = {}  # 채널 ID -> 보낼 수 없는 이유
+    changes = {}  # 채널 상태에 맞는 비활성화 이유 -> 스케줄 목록
     for schedule in schedules:
-        should_run = False
+        channel_id = schedule['channel']
+        if channel_id not in problems:
+            problems[channel_id] = channel_problem(guild, channel_id)
+        changes.setdefault(problems[channel_id], []).append(schedule)
+    for reason, affected in changes.items():
+        affected = orphan_targets(affected, reason)
+        await set_disabled(affected, reason, guild.name,
+                           "채널에 다시 메시지를 보낼 수 있게 되어" if not reason else
+                           "채널이 삭제되어" if reason == CHANNEL_DELETED else "채널에 메시지를 보낼 권한이 없어")
+
+
+async def remove_guild_schedules(guild_id, guild_name):
+    """봇이 나간 서버의 스케줄을 GUILD_REMOVE_ACTION에 따라 삭제하거나 비활성화합니다"""
+    schedules = await store.server_schedules(guild_id)
+    if GUILD_REMOVE_ACTION != "delete":
+        await set_disabled(orphan_targets(schedules, GUILD_LEFT), GUILD_LEFT, guild_name, "봇이 서버에서 나가")
+        return
+    if not schedules:
+        return
+    await store.remove_many(schedules)
+    for schedule in schedules:
+        unschedule(schedule['id'])
+    await store.commit()
+    ORPHANED.inc(len(schedules), reason="guild_removed", action="deleted")
+    print(f"서버 {guild_id}에서 나가 스케줄 {len(schedules)}개 삭제")
+    await report_to_owners(schedules, "🗑️ 스케줄 삭제됨",
+                           f"봇이 서버 **{guild_name}**에서 나가 아래 스케줄을 삭제했습니다.", 0xff0000)
+
+
+async def set_disabled(schedules, reason, guild_name, cause):
+    """스케줄들의 비활성화 이유를 한 번에 바꾸고 (빈 문자열이면 다시 켬) 소유자에게 알립니다"""
+    if not schedules:
+        return
+    await store.update_many([(schedule, {'disabled': reason}) for schedule in schedules])
+    for schedule in schedules:
+        reschedule(schedule)
+    await store.commit()
+    ORPHANED.inc(len(schedules), reason=ORPHAN_LABELS[reason], action="disabled" if reason else "enabled")
+    print(f"스케줄 {len(schedules)}개 {'비활성화: ' + reason if reason else '다시 켬'}")
+    if not reason:
+        title, hint, color = "✅ 스케줄 다시 켜짐", "다시 켰습니다.", 0x00ff00
+    else:
+        title, color = "⛔ 스케줄 비활성화됨", 0xff0000
+        hint = "비활성화했습니다. " + ("`/update`로 채널을 바꾼 뒤 `/enable`로 다시 켤 수 있습니다."
+                                   if reason == CHANNEL_DELETED else "다시 보낼 수 있게 되면 자동으로 다시 켜집니다.")
+    await report_to_owners(schedules, title, f"서버 **{guild_name}**에서 {cause} 아래 스케줄을 {hint}", color)
+
+
+async def report_to_owners(schedules, title, description, color):
+    """정리한 스케줄을 소유자별로 묶어 DM으로 알립니다 (ORPHAN_NOTIFY)"""
+    if not ORPHAN_NOTIFY:
+        return
+    owned = {}
+    for schedule in schedules:
+        owned.setdefault(schedule['user'], []).append(schedule['id'])
+    for user_id, schedule_ids in owned.items():
+        embed = discord.Embed(title=title, description=description, color=color, timestamp=datetime.datetime.now())
+        embed.add_field(name=f"스케줄 {len(schedule_ids)}개", value=format_schedule_ids(schedule_ids), inline=False)
+        try:
+            user = bot.get_user(user_id) or await bot.fetch_user(user_id)
+            await user.send(embed=embed)
+        except discord.HTTPException as e:
+            print(f"사용자 {user_id}에게 알리지 못함: {e}")
+
+
+# 채널/서버 정리 루프 (꺼져 있는 동안 놓친 이벤트를 맞춤)
+@tasks.loop(seconds=ORPHAN_SWEEP_INTERVAL)
+async def sweep_orphans():
+    if lease is not None and not lease.held:
+        return
+    started = time.perf_counter()
+    # 같은 DB를 쓰는 다른 샤드 프로세스의 서버는 이 프로세스의 캐시에 없으므로 건너뜀
+    guild_ids = [guild_id for guild_id in await store.server_counts() if not shards or shards.owns(guild_id)]
+    for guild_id in guild_ids:
+        guild = bot.get_guild(guild_id)
+        if guild is None:
+            # 캐시에 없다는 것만으로는 나갔는지 확신할 수 없으므로 삭제하지 않고 비활성화 (다시 보이면 켜짐)
+            schedules = await store.server_schedules(guild_id)
+            await set_disabled(orphan_targets(schedules, GUILD_LEFT), GUILD_LEFT, str(guild_id), "봇이 서버에서 나가")
+        else:
+            await reconcile_guild(guild, await store.server_schedules(guild_id))
+        await asyncio.sleep(0)  # 실행 루프와 명령어가 밀리지 않도록 서버마다 양보
+    print(f"채널/서버 정리 완료 (서버 {len(guild_ids)}개, {time.perf_counter() - started:.2f}초)")
+
+
+@sweep_orphans.before_loop
+async def before_sweep_orphans():
+    await bot.wait_until_ready()  # 서버와 채널 캐시가 채워진 뒤에 확인
+    await schedules_loaded.wait()
+
 
-        if schedule['last'] == 0:
-            # 처음 실행
-            if current_time >= schedule['date']:
-                should_run = True
+def read_saved_schedules(horizon):
+    """스냅샷과 로그를 읽어 (실행 시각이 horizon 이전인 스케줄, 나머지, 마지막 ID)로 나눕니다"""
+    soon, rest = [], []
+    schedules, last_id = schedule_log.load()
+    for data in schedules:
+        if not data.get('disabled') and get_next_run(data) <= horizon:
+            soon.append(data)
         else:
-            # 반복 실행
-            if current_time >= schedule['last'] + schedule['interval']:
-                should_run = True
+            rest.append(data)
+    return soon, rest, last_id
+
+
+def fire_entries(schedules):
+    """스케줄 목록을 디스패처에 등록할 (ID, 실행 시각, 항목) 목록으로 바꿉니다"""
+    return [(data['id'], get_next_run(data), dispatch_item(data)) for data in schedules if not data.get('disabled')]
+
+
+def fire_time_entries(fire_times):
+    """저장소의 fire_times 결과를 디스패처에 등록할 (ID, 실행 시각, 항목) 목록으로 바꿉니다"""
+    return [(schedule_id, next_run, (guild_id, user_id, channel_id))
+            for schedule_id, guild_id, user_id, channel_id, next_run in fire_times]
+
+
+def start_dispatch_loop():
+    """스케줄 확인 루프를 시작합니다"""
+    check_schedules.start()
+    mark_startup("dispatcher_started")
+
+
+async def load_schedules():
+    """실행 시각이 가까운 스케줄부터 불러와 바로 실행을 시작하고 나머지는 이어서 불러옵니다 (메모리 저장소)"""
+    started = time.perf_counter()
+    # 파일을 읽고 해석하는 동안에도 게이트웨이 연결과 하트비트가 멈추지 않도록 스레드에서 읽음
+    soon, rest, last_id = await asyncio.to_thread(read_saved_schedules, int(time.time()) + STARTUP_WINDOW)
+    store.restore(soon, last_id)  # 나머지를 불러오기 전에도 새 ID가 겹치지 않도록 마지막 ID를 함께 반영
+    schedule_log.start()  # 로그 기록 작업 시작
+    if DISPATCH_ROLE != "gateway":
+        dispatcher.load(fire_entries(soon))
+        start_dispatch_loop()
+
+    for start in range(0, len(rest), STARTUP_BATCH_SIZE):
+        store.restore(rest[start:start + STARTUP_BATCH_SIZE])
+        await asyncio.sleep(0)  # 불러오는 동안 실행 루프가 밀리지 않도록 양보
+    if DISPATCH_ROLE != "gateway":
+        dispatcher.load(fire_entries(rest))
+    schedules_loaded.set()
+    compact_schedules.start()  # 스냅샷 저장 루프 시작 (전부 불러온 뒤에만 저장해야 함)
+    print(f"스케줄 {len(store)}개 불러옴 ({time.perf_counter() - started:.2f}초, "
+          f"먼저 실행할 스케줄 {len(soon)}개)")
+    mark_startup("schedules_loaded")
+
+
+async def follow_log(followers):
+    """활성 인스턴스가 새로 기록한 로그를 저장소와 디스패처에 반영합니다 (대기 인스턴스)"""
+    for follower in followers:
+        for record in await asyncio.to_thread(follower.read):
+            for schedule in store.apply(record):
+                if schedule['id'] in store:
+                    reschedule(schedule)
+                else:
+                    dispatcher.cancel(schedule['id'])
+
+
+async def run_standby():
+    """리스를 얻을 때까지 대기 인스턴스로 실행하며 스케줄과 디스패처를 최신 상태로 유지합니다
+
+    메모리 저장소는 활성 인스턴스가 기록하는 로그를 따라 읽으므로 넘겨받을 때 다시 불러오지 않습니다.
+    """
+    global dispatch_until
+    followers = []
+    if schedule_log:
+        followers = schedule_log.followers()  # 불러오는 사이에 기록된 레코드를 놓치지 않도록 먼저 엶
+        schedules, last_id = await asyncio.to_thread(schedule_log.load, False)
+        store.restore(schedules, last_id)
+        await follow_log(followers)
+        dispatcher.load(fire_time_entries(await store.fire_times()))
+    else:
+        await extend_dispatch_window()  # DB를 미리 읽어 둠
+    print(f"대기 인스턴스로 실행 (스케줄 {len(dispatcher)}개 대기, 리스를 얻으면 넘겨받음)")
+    mark_startup("standby_ready")
+
+    while not await lease.acquire():
+        await asyncio.sleep(LEASE_HEARTBEAT)
+        await follow_log(followers)
+    await follow_log(followers)  # 이전 활성 인스턴스가 마지막으로 기록한 변경
+    for follower in followers:
+        follower.close()
+    if not schedule_log:
+        # 대기하는 동안 활성 인스턴스가 바꾼 실행 시각을 DB에서 다시 불러옴
+        dispatch_until = 0
+        dispatcher.clear()
+
+
+async def start_dispatch():
+    """저장된 스케줄을 불러와 실행 루프를 시작합니다 (다시 연결되어도 한 번만 실행)"""
+    if lease is not None:
+        standby = not await lease.acquire()
+        if standby:
+            await run_standby()
+        print(f"리스 획득 (토큰 {lease.token}), 스케줄 실행을 맡습니다")
+        mark_startup("lease_acquired")
+        renew_lease.start()
+        prune_claims.start()
+        if standby and schedule_log:
+            schedule_log.start()  # 로그 기록 작업 시작
+            start_dispatch_loop()
+            compact_schedules.start()  # 스냅샷 저장 루프 시작
+            schedules_loaded.set()
+            mark_startup("schedules_loaded")
+            return
+
+    if schedule_log:
+        await load_schedules()
+    elif DISPATCH_ROLE == "gateway":
+        mark_startup("schedules_loaded")  # sqlite 저장소는 워커가 같은 DB 파일을 직접 읽음
+    elif dispatch_until is not None:
+        # sqlite 저장소는 가까운 범위만 먼저 불러와 실행을 시작하고 fill_dispatcher가 범위를 넓힘
+        await extend_dispatch_window(min(STARTUP_WINDOW, DISPATCH_WINDOW))
+        start_dispatch_loop()
+        await extend_dispatch_window()
+        fill_dispatcher.start()  # 디스패처 범위 확장 루프 시작
+        mark_startup("schedules_loaded")
+    else:
+        start_dispatch_loop()  # 메모리 사본 워커는 게이트웨이가 보내주는 스케줄을 실행
+
+    if DISPATCH_ROLE == "gateway":
+        # 워커에는 전부 불러온 뒤의 스케줄 사본을 보냄
+        await dispatch_link.serve(DISPATCH_SOCKET, send_snapshot, handle_worker_message)
+        print(f"디스패처 워커 연결 대기: {DISPATCH_SOCKET}")
+
+
+def command_tree_hash():
+    """디스코드에 등록할 명령어 목록의 해시를 계산합니다"""
+    tree = sorted((command.to_dict(bot.tree) for command in bot.tree.get_commands()),
+                  key=lambda command: command['name'])
+    payload = json.dumps({'application_id': bot.application_id, 'commands': tree},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+async def sync_commands():
+    """명령어 목록이 마지막으로 동기화한 뒤 바뀐 경우에만 디스코드에 동기화합니다"""
+    digest = command_tree_hash()
+    try:
+        with open(COMMAND_HASH_PATH, encoding='utf-8') as f:
+            if f.read().strip() == digest:
+                print("명령어 목록이 바뀌지 않아 동기화를 건너뜀")
+                return
+    except FileNotFoundError:
+        pass
+    await bot.tree.sync()
+    os.makedirs(os.path.dirname(COMMAND_HASH_PATH) or ".", exist_ok=True)
+    with open(COMMAND_HASH_PATH, 'w', encoding='utf-8') as f:
+        f.write(digest + "\n")
+    print("명령어 목록 동기화 완료")
+    mark_startup("commands_synced")
+
+
+startup_tasks = []  # 시작할 때 백그라운드에서 실행하는 작업 (참조를 유지해야 중간에 사라지지 않음)
 
-        if should_run:
-            channel = bot.get_channel(schedule['channel'])
-            if channel:
-                try:
-                    await channel.send(schedule['message'])
-                    schedule['last'] = current_time
-                    print(f"스케줄 #{schedule['id']} 실행됨")
-                except Exception as e:
-                    print(f"스케줄 #{schedule['id']} 실행 오류: {e}")
+
+@bot.event
+async def setup_hook():
+    """지표 서버를 시작하고 스케줄 불러오기와 명령어 동기화를 백그라운드에서 시작합니다
+
+    로그인 직후 한 번만 실행되므로 게이트웨이에 다시 연결되어도 실행 루프가 다시 시작되지 않고,
+    스케줄을 불러오는 동안 게이트웨이 연결이 기다리지 않습니다.
+    """
+    if METRICS_PORT:
+        await serve(REGISTRY, METRICS_HOST, METRICS_PORT)
+        print(f"지표 서버 시작: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    if hasattr(signal, "SIGUSR1"):
+        # 재시작하지 않고 kill -USR1 <pid>로 프로파일링을 켬
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, start_profiler)
+        if lease is not None:
+            # 배포 등으로 종료할 때 리스를 바로 넘겨줌
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                asyncio.get_running_loop().add_signal_handler(
+                    signum, lambda: startup_tasks.append(asyncio.ensure_future(shutdown())))
+
+    if schedule_log:
+        schedules_loaded.clear()  # 명령어는 load_schedules가 전부 불러올 때까지 기다림
+    startup_tasks.append(asyncio.get_running_loop().create_task(start_dispatch()))
+    if DISPATCH_ROLE != "worker":
+        startup_tasks.append(asyncio.get_running_loop().create_task(sync_commands()))
+        sweep_orphans.start()  # 채널/서버 정리 루프 시작 (준비된 뒤 첫 정리)
+    for task in startup_tasks:
+        task.add_done_callback(report_startup_error)
+
+
+def report_startup_error(task):
+    """백그라운드 시작 작업이 실패하면 로그를 남깁니다"""
+    if not task.cancelled() and task.exception() is not None:
+        print(f"시작 작업 오류: {task.exception()!r}")
 
 
 @bot.event
 async def on_ready():
-    await bot.tree.sync()
     print(f"Logged in as {bot.user.name}")
-    check_schedules.start()  # 스케줄 확인 루프 시작
+    mark_startup("ready")
 
 
-bot.run(os.getenv("TOKEN"))
\ No newline at end of file
+if __name__ == "__main__":
+    if DISPATCH_ROLE == "worker":
+        asyncio.run(run_worker())
+    else:
+        bot.run(os.getenv("TOKEN"))
@@ -0,0 +1,213 @@
+import asyncio
+import functools
+import inspect
+import logging
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Registry:
+    """지표를 모아 Prometheus 텍스트 형식으로 내보내는 저장소"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    async def render(self):
+        """모든 지표를 Prometheus 텍스트 형식으로 변환합니다"""
+        lines = []
+        for metric in self.metrics:
+            await metric.collect()
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key, extra=""):
+        pairs = [f"{name}={_quote(value)}" for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    async def collect(self):
+        """내보내기 직전에 값을 갱신합니다"""
+
+
+class Counter(Metric):
+    """계속 증가하기만 하는 값"""
+
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values = defaultdict(float)
+
+    def inc(self, amount=1, **labels):
+        self.values[self._key(labels)] += amount
+
+    def get(self, **labels):
+        return self.values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        return [f"{self.name}{self._labels(key)} {_number(value)}" for key, value in self.values.items()]
+
+
+class Gauge(Metric):
+    """올라가거나 내려갈 수 있는 값 (collector를 주면 내보낼 때마다 다시 계산)"""
+
+    type = "gauge"
+
+    def __init__(self, *args, collector=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values = {}
+        self.collector = collector  # {라벨 값 튜플: 값}을 반환하는 함수 (비동기 함수도 가능)
+
+    def set(self, value, **labels):
+        self.values[self._key(labels)] = value
+
+    async def collect(self):
+        if self.collector is not None:
+            try:
+                values = self.collector()
+                if inspect.isawaitable(values):
+                    values = await values
+                self.values = {tuple(map(str, key if isinstance(key, tuple) else (key,))): value
+                               for key, value in values.items()}
+            except Exception as e:
+                print(f"지표 {self.name} 수집 오류: {e}")
+
+    def samples(self):
+        return [f"{self.name}{self._labels(key)} {_number(value)}" for key, value in self.values.items()]
+
+
+class Histogram(Metric):
+    """값의 분포를 구간별 개수로 기록합니다"""
+
+    type = "histogram"
+
+    def __init__(self, *args, buckets=DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = {}  # 라벨 -> 구간별 개수 (마지막은 +Inf)
+        self.sums = defaultdict(float)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        counts = self.counts.get(key)
+        if counts is None:
+            counts = self.counts[key] = [0] * (len(self.buckets) + 1)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        self.sums[key] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """with 블록이 걸린 시간을 기록합니다"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def timed(self, **labels):
+        """비동기 함수가 걸린 시간을 기록하는 데코레이터를 반환합니다"""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.time(**labels):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, **labels):
+        return sum(self.counts.get(self._key(labels), ()))
+
+    def samples(self):
+        lines = []
+        for key, counts in self.counts.items():
+            total = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                total += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{self.name}_bucket{self._labels(key, 'le=%s' % _quote(le))} {total}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_number(self.sums[key])}")
+            lines.append(f"{self.name}_count{self._labels(key)} {total}")
+        return lines
+
+
+class LogCounter(logging.Handler):
+    """특정 문구로 시작하는 로그를 세는 핸들러 (라이브러리 내부 재시도 횟수 집계용)"""
+
+    def __init__(self, counter, prefixes):
+        super().__init__()
+        self.counter = counter
+        self.prefixes = tuple(prefixes)
+
+    def emit(self, record):
+        if isinstance(record.msg, str) and record.msg.startswith(self.prefixes):
+            self.counter.inc()
+
+
+async def serve(registry, host, port):
+    """/metrics 요청에 지표를 응답하는 HTTP 서버를 시작합니다"""
+
+    async def handle(reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5)
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+                pass  # 헤더는 사용하지 않음
+            parts = request.split()
+            if len(parts) >= 2 and parts[0] == b"GET" and parts[1].split(b"?")[0] == b"/metrics":
+                status, body = "200 OK", (await registry.render()).encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(f"HTTP/1.1 {status}\r\n"
+                         f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\n"
+                         f"Connection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+def _quote(value):
+    return '"' + _escape(value) + '"'
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
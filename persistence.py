@@ -0,0 +1,298 @@
+import asyncio
+import json
+import os
+
+
+class ScheduleLog:
+    """스케줄 변경 사항을 기록하는 추가 전용 로그(WAL)와 스냅샷
+
+    변경 사항은 메모리에 모았다가 flush_interval마다 한 번에 기록하고 fsync하므로
+    (group commit) 한꺼번에 많은 변경이 생겨도 fsync는 한 번만 일어납니다.
+    스냅샷은 필드 이름 목록과 스케줄마다 값 목록만 담는 JSON 객체이며({"fields": [...], "rows": [[...], ...]}),
+    스케줄마다 키를 반복하지 않으므로 README 형식의 배열보다 작고 빠르게 해석됩니다 (이전 배열 형식도 읽음).
+    지금까지 쓴 가장 큰 ID(last_id)도 함께 저장해 삭제된 스케줄의 ID를 재시작 후 다시 쓰지 않습니다.
+    """
+
+    def __init__(self, directory, flush_interval=0.05, decode_rows=None):
+        self.directory = directory
+        self.decode_rows = decode_rows  # (필드 이름 목록, 값 목록들)을 스케줄 목록으로 바꿀 함수 (None이면 dict)
+        self.snapshot_path = os.path.join(directory, "schedules.json")
+        self.log_path = os.path.join(directory, "schedules.log")
+        self.rotated_path = self.log_path + ".1"
+        self.flush_interval = flush_interval
+        self.records = 0  # 마지막 스냅샷 이후 기록된 변경 수
+        self.last_id = 0  # 불러오거나 기록한 가장 큰 스케줄 ID (삭제되어도 다시 쓰지 않도록 스냅샷에 남김)
+
+        self._pending = []  # 아직 기록되지 않은 로그 레코드
+        self._batch = None  # 대기 중인 변경이 기록되면 완료되는 Future
+        self._inflight = None  # 기록 중인 변경이 fsync되면 완료되는 Future
+        self._dirty = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._file = None
+        self._task = None
+
+    # 기록
+
+    def put(self, schedule):
+        """스케줄 생성/수정/가져오기를 기록합니다"""
+        self._append({'op': 'put', 'schedule': schedule.copy()})
+        self.last_id = max(self.last_id, schedule['id'])
+
+    def delete(self, schedule):
+        """스케줄 삭제를 기록합니다"""
+        self._append({'op': 'del', 'id': schedule['id']})
+
+    def advance(self, schedule):
+        """스케줄 실행에 따른 last 갱신을 기록합니다"""
+        self._append({'op': 'last', 'id': schedule['id'], 'last': schedule['last']})
+
+    def put_many(self, schedules, deleted=()):
+        """여러 스케줄의 삭제와 생성을 한 줄에 기록합니다 (복구할 때 전부 반영되거나 전부 버려짐)"""
+        self._append({'op': 'batch',
+                      'del': [schedule['id'] for schedule in deleted],
+                      'put': [schedule.copy() for schedule in schedules]})
+        self.last_id = max(self.last_id, max((schedule['id'] for schedule in schedules), default=0))
+
+    def _append(self, record):
+        self._pending.append(record)  # 직렬화는 기록 스레드에서
+        self.records += 1
+        self._dirty.set()
+
+    async def commit(self):
+        """지금까지의 변경 사항이 디스크에 기록될 때까지 대기합니다"""
+        if self._pending:
+            if self._batch is None:
+                self._batch = asyncio.get_running_loop().create_future()
+            await asyncio.shield(self._batch)
+        elif self._inflight is not None:
+            await asyncio.shield(self._inflight)
+
+    def start(self):
+        """group commit 백그라운드 작업을 시작합니다"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self._dirty.wait()
+            await asyncio.sleep(self.flush_interval)  # 잠시 기다리며 변경 사항을 모음
+            await self.flush()
+
+    async def flush(self):
+        """대기 중인 변경 사항을 기록하고 fsync합니다"""
+        async with self._lock:
+            self._dirty.clear()
+            if not self._pending:
+                return
+            lines, self._pending = self._pending, []
+            done = self._batch or asyncio.get_running_loop().create_future()
+            self._batch = None
+            self._inflight = done
+            try:
+                await asyncio.to_thread(self._write, lines)
+            except Exception as e:
+                print(f"스케줄 로그 기록 오류: {e}")
+                done.set_exception(e)
+                done.exception()  # 대기자가 없어도 경고가 남지 않도록 확인 처리
+            else:
+                done.set_result(None)
+            finally:
+                self._inflight = None
+
+    def _write(self, records):
+        lines = [json.dumps(record, ensure_ascii=False, separators=(',', ':')) for record in records]
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._file = open(self.log_path, 'a', encoding='utf-8')
+        self._file.write('\n'.join(lines) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    # 스냅샷
+
+    async def compact(self, schedules, allowed=None):
+        """현재 스케줄 전체를 스냅샷으로 저장하고 로그를 비운 뒤 저장했는지 반환합니다
+
+        allowed는 로그를 교체하기 직전에 기다리는 함수로, False를 돌려주면 저장하지 않습니다
+        (리스를 잃은 인스턴스가 넘겨받은 인스턴스의 스냅샷과 로그를 덮어쓰지 않도록).
+        """
+        await self.flush()
+        async with self._lock:
+            if allowed is not None and not await allowed():
+                return False
+            # 복사와 로그 교체 사이에 다른 변경이 끼어들지 않도록 await 없이 처리
+            rows = [list(schedule.values()) for schedule in schedules]
+            fields = list(next(iter(schedules)).keys()) if rows else []
+            if rows:
+                key = fields.index('id')
+                self.last_id = max(self.last_id, max(row[key] for row in rows))
+            last_id = self.last_id
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._rotate()
+            self.records = len(self._pending)
+            await asyncio.to_thread(self._write_snapshot, fields, rows, last_id)
+        return True
+
+    def _rotate(self):
+        if not os.path.exists(self.log_path):
+            return
+        if not os.path.exists(self.rotated_path):
+            os.replace(self.log_path, self.rotated_path)
+            return
+        # 이전 스냅샷이 실패해 교체된 로그가 남아 있으면 이어 붙임
+        with open(self.rotated_path, 'a', encoding='utf-8') as rotated, \
+                open(self.log_path, encoding='utf-8') as log:
+            rotated.write(log.read())
+            rotated.flush()
+            os.fsync(rotated.fileno())
+        os.remove(self.log_path)
+
+    def _write_snapshot(self, fields, rows, last_id):
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = self.snapshot_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'last_id': last_id, 'fields': fields, 'rows': rows},
+                               ensure_ascii=False, separators=(',', ':')))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+    # 복구
+
+    def load(self, repair=True):
+        """스냅샷과 로그를 재생해 스케줄 목록과 마지막 ID를 반환합니다
+
+        repair가 False면 잘린 마지막 줄을 잘라내지 않고 거기서 멈춥니다 (다른 프로세스가 기록 중인 로그).
+        해석할 수 없는 줄 뒤에 올바른 기록이 남아 있으면 잘라내지 않고 ValueError를 발생시킵니다.
+        """
+        rows = {}
+        last_id = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if isinstance(snapshot, list):
+                rows = {schedule['id']: schedule for schedule in snapshot}  # 이전 배열 형식
+            else:
+                rows = {schedule['id']: schedule for schedule in self._decode(snapshot['fields'], snapshot['rows'])}
+                last_id = snapshot.get('last_id', 0)  # 가장 큰 ID의 스케줄이 삭제되었어도 유지
+            del snapshot
+            last_id = max(last_id, max(rows, default=0))
+
+        # 스냅샷 도중 중단되었다면 교체된 로그도 함께 재생 (모든 변경은 멱등)
+        for path in (self.rotated_path, self.log_path):
+            if not os.path.exists(path):
+                continue
+            offset = 0
+            with open(path, 'rb') as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError("잘린 로그 줄")
+                        record = json.loads(line)
+                    except ValueError:
+                        if any(_is_record(later) for later in f):
+                            # 중간 줄이 손상됨: 잘라내면 뒤에 기록된 변경을 잃으므로 멈춤
+                            raise ValueError(f"스케줄 로그가 손상되었습니다: {path} ({offset}바이트 위치)")
+                        # 마지막 줄이 기록 도중 잘린 경우 이후 기록이 이어지도록 잘라냄
+                        if repair:
+                            os.truncate(path, offset)
+                        break
+                    offset += len(line)
+                    last_id = max(last_id, self._replay(rows, record))
+                    self.records += 1
+        self.last_id = max(self.last_id, last_id)
+        return list(rows.values()), last_id
+
+    def _decode(self, fields, rows):
+        if self.decode_rows is not None:
+            return self.decode_rows(fields, rows)
+        return [dict(zip(fields, row)) for row in rows]
+
+    def followers(self):
+        """다른 프로세스가 기록하는 로그를 따라 읽을 LogFollower 목록을 반환합니다"""
+        return [LogFollower(self.log_path)]
+
+    @staticmethod
+    def _replay(rows, record):
+        op = record['op']
+        if op == 'put':
+            schedule = record['schedule']
+            rows[schedule['id']] = schedule
+            return schedule['id']
+        if op == 'del':
+            rows.pop(record['id'], None)
+        elif op == 'last' and record['id'] in rows:
+            rows[record['id']]['last'] = record['last']
+        elif op == 'batch':
+            for schedule_id in record['del']:
+                rows.pop(schedule_id, None)
+            for schedule in record['put']:
+                rows[schedule['id']] = schedule
+            return max(max(record['del'], default=0), max((schedule['id'] for schedule in record['put']), default=0))
+        return record['id']
+
+
+def _is_record(line):
+    """로그 줄이 해석할 수 있는 레코드인지 확인합니다"""
+    try:
+        json.loads(line)
+    except ValueError:
+        return False
+    return True
+
+
+class LogFollower:
+    """다른 프로세스가 기록하는 로그를 따라 읽으며 새 레코드를 돌려주는 도구 (대기 인스턴스)
+
+    스냅샷 저장으로 로그 파일이 교체되면 열어 둔 이전 파일을 끝까지 읽은 뒤 새 파일로 넘어갑니다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._partial = b""  # 아직 끝까지 기록되지 않은 마지막 줄
+        self._open()
+
+    def _open(self):
+        try:
+            self._file = open(self.path, 'rb')
+        except FileNotFoundError:
+            self._file = None
+        self._partial = b""
+
+    def read(self):
+        """마지막으로 읽은 뒤 기록된 레코드 목록을 반환합니다"""
+        records = []
+        while True:
+            self._read_available(records)
+            try:
+                inode = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                return records  # 로그 교체 직후 아직 새 로그가 없음
+            if self._file is not None and os.fstat(self._file.fileno()).st_ino == inode:
+                return records
+            if self._file is not None:
+                self._read_available(records)  # 교체 직전에 기록된 줄
+                self._file.close()
+            self._open()
+
+    def _read_available(self, records):
+        if self._file is None:
+            return
+        lines = (self._partial + self._file.read()).split(b"\n")
+        self._partial = lines.pop()
+        records.extend(json.loads(line) for line in lines if line)
+
+    def close(self):
+        """따라 읽기를 마칩니다 (이전 기록자가 쓰다 만 마지막 줄은 이어 쓰지 않도록 잘라냄)"""
+        if self._file is None:
+            return
+        if self._partial and os.path.exists(self.path) \
+                and os.stat(self.path).st_ino == os.fstat(self._file.fileno()).st_ino:
+            os.truncate(self.path, os.fstat(self._file.fileno()).st_size - len(self._partial))
+        self._file.close()
+        self._file = None
@@ -0,0 +1,180 @@
+import calendar
+import datetime
+import functools
+
+NEVER = 2 ** 62  # 규칙에 맞는 시각이 없을 때의 실행 시각
+SEARCH_YEARS = 10  # 다음 실행 시각을 찾을 최대 범위 (년)
+
+PRESETS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@hourly": "0 * * * *",
+    "@weekdays": "0 9 * * 1-5",
+}
+MONTH_NAMES = {name: i for i, name in enumerate(
+    ("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"), start=1)}
+WEEKDAY_NAMES = {name: i for i, name in enumerate(("SUN", "MON", "TUE", "WED", "THU", "FRI", "SAT"))}
+WEEKDAY_LABELS = ("일", "월", "화", "수", "목", "금", "토")
+
+
+class Rule:
+    """cron 형식(분 시 일 월 요일)의 반복 규칙
+
+    표준 cron 문법(*, 목록, 범위, /간격, 요일/월 이름)에 더해 달력 규칙을 지원합니다.
+    - 일 필드의 L: 그 달의 마지막 날
+    - 요일 필드의 MON#1: 그 달의 첫 번째 월요일, FRIL (또는 5L): 그 달의 마지막 금요일
+    일과 요일을 모두 지정하면 cron처럼 둘 중 하나만 맞아도 실행합니다.
+    """
+
+    __slots__ = ('text', 'minutes', 'hours', 'days', 'months', 'weekdays', 'nth', 'last_day',
+                 'day_any', 'weekday_any')
+
+    def __init__(self, text):
+        text = " ".join(text.split())
+        fields = PRESETS.get(text.lower(), text).split()
+        if len(fields) != 5:
+            raise ValueError("cron 규칙은 '분 시 일 월 요일' 다섯 칸이어야 합니다")
+        self.text = text
+        self.minutes = sorted(_parse_field(fields[0], 0, 59))
+        self.hours = set(_parse_field(fields[1], 0, 23))
+        self.last_day = False
+        day_parts = []
+        for part in fields[2].split(','):
+            if part.upper() == "L":
+                self.last_day = True
+            else:
+                day_parts.append(part)
+        self.days = _parse_field(",".join(day_parts), 1, 31) if day_parts else set()
+        self.months = set(_parse_field(fields[3], 1, 12, MONTH_NAMES))
+        self.nth = {}  # 요일 -> {n번째 (-1은 마지막)}
+        weekday_parts = []
+        for part in fields[4].upper().split(','):
+            if '#' in part:
+                weekday, n = part.split('#', 1)
+                if not n.isdigit() or not 1 <= int(n) <= 5:
+                    raise ValueError(f"잘못된 n번째 요일입니다: {part}")
+                self.nth.setdefault(_parse_weekday(weekday), set()).add(int(n))
+            elif part.endswith('L') and len(part) > 1:
+                self.nth.setdefault(_parse_weekday(part[:-1]), set()).add(-1)
+            else:
+                weekday_parts.append(part)
+        self.weekdays = {day % 7 for day in _parse_field(",".join(weekday_parts), 0, 7, WEEKDAY_NAMES)} \
+            if weekday_parts else set()
+        self.day_any = fields[2].startswith("*")  # cron처럼 *로 시작하면 제한하지 않은 것으로 봄
+        self.weekday_any = fields[4].startswith("*")
+        if not self.minutes or not self.hours or not self.months:
+            raise ValueError("cron 규칙에 실행할 시각이 없습니다")
+
+    def __repr__(self):
+        return f"Rule({self.text!r})"
+
+    def matches_day(self, day):
+        """날짜가 일/요일 조건에 맞는지 확인합니다"""
+        month_days = calendar.monthrange(day.year, day.month)[1]
+        day_ok = day.day in self.days or (self.last_day and day.day == month_days)
+        weekday = (day.weekday() + 1) % 7  # cron은 일요일이 0
+        nth = self.nth.get(weekday, ())
+        weekday_ok = weekday in self.weekdays or (day.day - 1) // 7 + 1 in nth \
+            or (-1 in nth and day.day + 7 > month_days)
+        if not self.day_any and not self.weekday_any:
+            return day_ok or weekday_ok
+        if not self.day_any:
+            return day_ok
+        if not self.weekday_any:
+            return weekday_ok
+        return True
+
+    def next_after(self, timestamp):
+        """timestamp 이후(미포함) 규칙에 맞는 첫 시각을 반환합니다 (없으면 NEVER)
+
+        분 단위로 하나씩 넘기지 않고 맞지 않는 월/일/시는 통째로 건너뜁니다.
+        """
+        t = datetime.datetime.fromtimestamp(timestamp).replace(second=0, microsecond=0)
+        t += datetime.timedelta(minutes=1)
+        limit = t.year + SEARCH_YEARS
+        while t.year <= limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+                continue
+            if not self.matches_day(t.date()):
+                t = t.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+                continue
+            if t.hour not in self.hours:
+                t = t.replace(minute=0) + datetime.timedelta(hours=1)
+                continue
+            minute = next((m for m in self.minutes if m >= t.minute), None)
+            if minute is None:
+                t = t.replace(minute=0) + datetime.timedelta(hours=1)
+                continue
+            return int(t.replace(minute=minute).timestamp())
+        return NEVER
+
+    def describe(self):
+        """규칙을 읽기 좋은 형태로 설명합니다"""
+        if len(self.minutes) == 1 and len(self.hours) == 1:
+            at = f"{min(self.hours):02d}:{self.minutes[0]:02d}"
+            if self.day_any and self.weekday_any and len(self.months) == 12:
+                return f"매일 {at}"
+            if self.day_any and not self.nth and len(self.months) == 12 and not self.weekday_any:
+                if self.weekdays == {1, 2, 3, 4, 5}:
+                    return f"평일 {at}"
+                return f"매주 {','.join(WEEKDAY_LABELS[d] for d in sorted(self.weekdays))}요일 {at}"
+        return f"cron `{self.text}`"
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_rule(text):
+    """규칙 문자열을 해석합니다 (같은 규칙은 한 번만 해석)"""
+    rule = Rule(text)
+    if rule.next_after(int(datetime.datetime.now().timestamp())) == NEVER:
+        raise ValueError("cron 규칙에 맞는 날짜가 없습니다")
+    return rule
+
+
+@functools.lru_cache(maxsize=65536)
+def next_fire(text, after):
+    """규칙에 맞는 after 이후 첫 실행 시각을 반환합니다
+
+    같은 규칙과 같은 직전 실행 시각을 가진 스케줄이 많으므로 결과를 캐시해
+    실행할 때마다 규칙을 다시 계산하지 않습니다.
+    """
+    return compile_rule(text).next_after(after)
+
+
+def _parse_weekday(value):
+    day = _parse_value(value, WEEKDAY_NAMES)
+    if not 0 <= day <= 7:
+        raise ValueError(f"잘못된 요일입니다: {value}")
+    return day % 7
+
+
+def _parse_field(field, low, high, names=None):
+    values = set()
+    for part in field.split(','):
+        base, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if step <= 0:
+            raise ValueError(f"잘못된 간격입니다: {part}")
+        if base == '*':
+            start, end = low, high
+        elif '-' in base:
+            start, end = (_parse_value(v, names) for v in base.split('-', 1))
+        else:
+            start = _parse_value(base, names)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"범위를 벗어난 값입니다: {part} ({low}-{high})")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def _parse_value(value, names):
+    value = value.upper()
+    if names and value in names:
+        return names[value]
+    if not value.isdigit():
+        raise ValueError(f"잘못된 값입니다: {value}")
+    return int(value)
@@ -0,0 +1,171 @@
+import asyncio
+import os
+import time
+
+from persistence import ScheduleLog
+
+
+def shard_for_guild(guild_id, shard_count):
+    """디스코드와 같은 방식으로 서버가 속한 샤드를 계산합니다"""
+    return (guild_id >> 22) % shard_count
+
+
+class ShardRange:
+    """이 프로세스가 맡은 샤드 범위"""
+
+    def __init__(self, shard_count, shard_ids=None):
+        self.count = shard_count
+        self.ids = sorted(shard_ids) if shard_ids is not None else list(range(shard_count))
+        self._owned = set(self.ids)
+
+    @classmethod
+    def parse(cls, shard_count, shard_ids=None):
+        """"0,1" 또는 "0-3" 형식의 샤드 목록을 읽습니다"""
+        if not shard_ids:
+            return cls(shard_count)
+        ids = set()
+        for part in shard_ids.split(','):
+            start, _, end = part.partition('-')
+            ids.update(range(int(start), int(end or start) + 1))
+        if any(shard_id >= shard_count for shard_id in ids):
+            raise ValueError("샤드 ID는 샤드 수보다 작아야 합니다")
+        return cls(shard_count, ids)
+
+    def owns(self, guild_id):
+        """서버가 이 프로세스의 샤드에 속하는지 확인합니다"""
+        return shard_for_guild(guild_id, self.count) in self._owned
+
+
+class ShardedScheduleLog:
+    """샤드마다 따로 ScheduleLog를 두고 서버 기준으로 기록을 나누는 로그
+
+    샤드별 디렉터리(shard-N) 단위로 저장되므로 프로세스에 맡기는 샤드를 바꿔도
+    디렉터리만 옮기면 됩니다.
+    """
+
+    def __init__(self, directory, shards, flush_interval=0.05, decode_rows=None):
+        self.shards = shards
+        self.logs = {shard_id: ScheduleLog(os.path.join(directory, f"shard-{shard_id}"), flush_interval, decode_rows)
+                     for shard_id in shards.ids}
+
+    def _log(self, schedule):
+        return self.logs[shard_for_guild(schedule['server'], self.shards.count)]
+
+    @property
+    def records(self):
+        return sum(log.records for log in self.logs.values())
+
+    def put(self, schedule):
+        """스케줄 생성/수정/가져오기를 기록합니다"""
+        self._log(schedule).put(schedule)
+
+    def delete(self, schedule):
+        """스케줄 삭제를 기록합니다"""
+        self._log(schedule).delete(schedule)
+
+    def advance(self, schedule):
+        """스케줄 실행에 따른 last 갱신을 기록합니다"""
+        self._log(schedule).advance(schedule)
+
+    def put_many(self, schedules, deleted=()):
+        """여러 스케줄의 삭제와 생성을 샤드마다 한 줄에 기록합니다"""
+        by_shard = {}
+        for index, group in ((0, deleted), (1, schedules)):
+            for schedule in group:
+                shard_id = shard_for_guild(schedule['server'], self.shards.count)
+                by_shard.setdefault(shard_id, ([], []))[index].append(schedule)
+        for shard_id, (shard_deleted, shard_schedules) in by_shard.items():
+            self.logs[shard_id].put_many(shard_schedules, shard_deleted)
+
+    async def commit(self):
+        """지금까지의 변경 사항이 디스크에 기록될 때까지 대기합니다"""
+        await asyncio.gather(*(log.commit() for log in self.logs.values()))
+
+    def start(self):
+        """group commit 백그라운드 작업을 시작합니다"""
+        for log in self.logs.values():
+            log.start()
+
+    async def compact(self, schedules, allowed=None):
+        """샤드별로 스냅샷을 저장하고 모두 저장했는지 반환합니다 (allowed가 False를 돌려주면 멈춤)"""
+        by_shard = {shard_id: [] for shard_id in self.logs}
+        for schedule in schedules:
+            by_shard[shard_for_guild(schedule['server'], self.shards.count)].append(schedule)
+        for shard_id, log in self.logs.items():
+            if log.records and not await log.compact(by_shard[shard_id], allowed):
+                return False
+        return True
+
+    def load(self, repair=True):
+        """모든 샤드의 스냅샷과 로그를 재생합니다"""
+        rows, last_id = [], 0
+        for log in self.logs.values():
+            shard_rows, shard_last_id = log.load(repair)
+            rows.extend(shard_rows)
+            last_id = max(last_id, shard_last_id)
+        return rows, last_id
+
+    def followers(self):
+        """모든 샤드의 로그를 따라 읽을 LogFollower 목록을 반환합니다"""
+        return [follower for log in self.logs.values() for follower in log.followers()]
+
+
+def simulate(shard_count, processes, schedules, guilds):
+    """게이트웨이 없이 샤드를 여러 프로세스에 나눠 디스패치 처리량을 측정합니다"""
+    import multiprocessing
+
+    ranges = [ShardRange(shard_count, range(p, shard_count, processes)) for p in range(processes)]
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.starmap(_simulate_process, [(r.count, r.ids, schedules, guilds) for r in ranges])
+
+    total = sum(owned for owned, _, _ in results)
+    assert total == schedules, "모든 스케줄은 정확히 한 프로세스에 속해야 합니다"
+    for (owned, elapsed, rss), shard_range in zip(results, ranges):
+        print(f"샤드 {shard_range.ids}: 스케줄 {owned}개, 디스패치 {elapsed:.2f}초, 최대 RSS {rss / 1024:.0f}MB")
+    slowest = max(elapsed for _, elapsed, _ in results)
+    print(f"전체 처리량: {schedules / slowest:.0f}개/초")
+
+
+def _simulate_process(shard_count, shard_ids, schedules, guilds):
+    import resource
+
+    from dispatcher import Dispatcher, SendQueue
+    from store import ScheduleStore
+
+    shards = ShardRange(shard_count, shard_ids)
+
+    async def run():
+        store = ScheduleStore(shard_count=shard_count)
+        dispatcher = Dispatcher()
+        now = int(time.time())
+        for i in range(schedules):
+            guild_id = (i % guilds + 1) << 22  # 샤드가 고르게 나뉘도록 서버 ID 생성
+            if not shards.owns(guild_id):
+                continue
+            schedule = await store.add(server=guild_id, channel=guild_id + i % 7, message="알림",
+                                       user=i % 1000, date=now - 1, interval=3600)
+            dispatcher.schedule(schedule['id'], schedule['date'], (guild_id, schedule['channel']))
+
+        async def send(schedule_id):
+            await asyncio.sleep(0)
+
+        started = time.perf_counter()
+        due = [(guild_id, channel_id, schedule_id)
+               for schedule_id, _, (guild_id, channel_id) in dispatcher.pop_due(now)]
+        await SendQueue(send, 50).submit(due)
+        return len(store), time.perf_counter() - started
+
+    owned, elapsed = asyncio.run(run())
+    return owned, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="샤드를 로컬 프로세스에 나눠 디스패처를 시험합니다")
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--schedules", type=int, default=100_000)
+    parser.add_argument("--guilds", type=int, default=1000)
+    args = parser.parse_args()
+    simulate(args.shards, args.processes, args.schedules, args.guilds)
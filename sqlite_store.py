@@ -0,0 +1,282 @@
+import asyncio
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from store import FIELDS, get_next_run
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    server INTEGER NOT NULL,
+    channel INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    user INTEGER NOT NULL,
+    date INTEGER NOT NULL,
+    interval INTEGER NOT NULL,
+    last INTEGER NOT NULL DEFAULT 0,
+    next_run INTEGER NOT NULL,
+    disabled TEXT NOT NULL DEFAULT '',
+    rule TEXT NOT NULL DEFAULT '',
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS schedules_next_run ON schedules (next_run);
+CREATE INDEX IF NOT EXISTS schedules_user ON schedules (server, user);
+CREATE INDEX IF NOT EXISTS schedules_channel ON schedules (channel);
+"""
+
+ID_BATCH_SIZE = 500  # 한 쿼리의 IN 목록에 넣을 최대 ID 수 (SQLite 변수 수 제한)
+SELECT = f"SELECT {', '.join(FIELDS)}, version FROM schedules"
+# 이전 버전에서 만든 DB에 추가할 열
+MIGRATIONS = {
+    'disabled': "TEXT NOT NULL DEFAULT ''",
+    'rule': "TEXT NOT NULL DEFAULT ''",
+    'version': "INTEGER NOT NULL DEFAULT 0",
+}
+
+
+class SqliteScheduleStore:
+    """스케줄을 SQLite 파일에 보관하는 디스크 기반 저장소
+
+    메시지 본문을 포함한 스케줄은 필요할 때만 읽어오므로 메모리 사용량이 스케줄 수에
+    비례해 늘지 않습니다. 모든 DB 작업은 전용 스레드 하나에서 순서대로 실행됩니다.
+    """
+
+    def __init__(self, path, shards=None):
+        self.path = path
+        self.shards = shards  # 이 프로세스가 맡은 ShardRange (None이면 전체)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-store")
+        self._conn = None
+        self.listeners = []  # 스케줄이 추가/수정/삭제될 때 호출할 콜백
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)  # 여러 프로세스가 같은 파일을 공유
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.executescript(SCHEMA)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(schedules)")}
+            for column, definition in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE schedules ADD COLUMN {column} {definition}")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _query(self, sql, params=()):
+        return [dict(row) for row in self._connection().execute(sql, params)]
+
+    def _execute(self, sql, params=()):
+        return self._connection().execute(sql, params)
+
+    def _execute_all(self, statements):
+        conn = self._connection()
+        conn.execute("SAVEPOINT execute_all")
+        try:
+            for sql, params in statements:
+                conn.execute(sql, params)
+        except Exception:
+            conn.execute("ROLLBACK TO execute_all")
+            raise
+        finally:
+            conn.execute("RELEASE execute_all")
+
+    async def get(self, schedule_id):
+        """ID로 스케줄을 찾습니다"""
+        rows = await self._run(self._query, f"{SELECT} WHERE id = ?", (schedule_id,))
+        return rows[0] if rows else None
+
+    async def find(self, schedule_id, guild_id, user_id):
+        """ID로 스케줄을 찾습니다 (본인 것만)"""
+        rows = await self._run(self._query, f"{SELECT} WHERE id = ? AND server = ? AND user = ?",
+                               (schedule_id, guild_id, user_id))
+        return rows[0] if rows else None
+
+    async def find_many(self, schedule_ids, guild_id, user_id):
+        """ID 목록 중 사용자의 스케줄만 ID 순으로 찾습니다 (ID 수에 비례)"""
+        return await self._run(self._find_many, sorted(schedule_ids), guild_id, user_id)
+
+    def _find_many(self, schedule_ids, guild_id, user_id):
+        rows = []
+        for start in range(0, len(schedule_ids), ID_BATCH_SIZE):
+            batch = schedule_ids[start:start + ID_BATCH_SIZE]
+            rows += self._query(f"{SELECT} WHERE id IN ({', '.join('?' * len(batch))}) AND server = ? AND user = ? "
+                                "ORDER BY id", (*batch, guild_id, user_id))
+        return rows
+
+    async def user_schedules(self, guild_id, user_id):
+        """사용자의 스케줄 목록을 가져옵니다"""
+        return await self._run(self._query, f"{SELECT} WHERE server = ? AND user = ? ORDER BY id",
+                               (guild_id, user_id))
+
+    async def user_page(self, guild_id, user_id, after_id=0, limit=10):
+        """ID가 after_id보다 큰 사용자의 스케줄을 ID 순으로 limit개까지 가져옵니다"""
+        return await self._run(self._query,
+                               f"{SELECT} WHERE server = ? AND user = ? AND id > ? ORDER BY id LIMIT ?",
+                               (guild_id, user_id, after_id, limit))
+
+    async def user_count(self, guild_id, user_id):
+        """사용자의 스케줄 수를 반환합니다"""
+        rows = await self._run(self._query,
+                               "SELECT COUNT(*) AS count FROM schedules WHERE server = ? AND user = ?",
+                               (guild_id, user_id))
+        return rows[0]['count']
+
+    async def server_count(self, guild_id):
+        """서버의 스케줄 수를 반환합니다"""
+        rows = await self._run(self._query, "SELECT COUNT(*) AS count FROM schedules WHERE server = ?",
+                               (guild_id,))
+        return rows[0]['count']
+
+    async def server_counts(self):
+        """서버별 스케줄 수를 반환합니다"""
+        rows = await self._run(self._query, "SELECT server, COUNT(*) AS count FROM schedules GROUP BY server")
+        return {row['server']: row['count'] for row in rows}
+
+    async def iter_schedules(self, guild_id, user_id=None, batch_size=500):
+        """서버(또는 서버 안 사용자)의 스케줄을 ID 순으로 batch_size개씩 나눠 돌려줍니다"""
+        sql, params = f"{SELECT} WHERE server = ?", (guild_id,)
+        if user_id is not None:
+            sql, params = sql + " AND user = ?", params + (user_id,)
+        after_id = 0
+        while True:
+            batch = await self._run(self._query, sql + " AND id > ? ORDER BY id LIMIT ?",
+                                    params + (after_id, batch_size))
+            if not batch:
+                return
+            yield batch
+            after_id = batch[-1]['id']
+
+    async def channel_schedules(self, channel_id):
+        """채널의 스케줄 목록을 가져옵니다"""
+        return await self._run(self._query, f"{SELECT} WHERE channel = ? ORDER BY id", (channel_id,))
+
+    async def server_schedules(self, guild_id):
+        """서버의 스케줄 목록을 가져옵니다"""
+        return await self._run(self._query, f"{SELECT} WHERE server = ? ORDER BY id", (guild_id,))
+
+    async def add(self, server, channel, message, user, date, interval, last=0, rule=""):
+        """새 스케줄을 추가하고 반환합니다"""
+        schedule = {
+            'server': server,
+            'channel': channel,
+            'message': message,
+            'user': user,
+            'date': date,
+            'interval': interval,
+            'last': last,
+            'rule': rule
+        }
+        cursor = await self._run(
+            self._execute,
+            "INSERT INTO schedules (server, channel, message, user, date, interval, last, rule, next_run) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (server, channel, message, user, date, interval, last, rule, get_next_run(schedule))
+        )
+        schedule = {'id': cursor.lastrowid, **schedule, 'disabled': "", 'version': 0}
+        self._notify(schedule)
+        return schedule
+
+    async def add_many(self, server, user, rows, replace=False):
+        """사용자의 스케줄을 한꺼번에 추가하고 (추가된 목록, 삭제된 목록)을 반환합니다
+
+        replace면 사용자의 기존 스케줄을 먼저 삭제합니다. 삭제와 추가는 하나의 savepoint 안에서 실행됩니다.
+        """
+        added, removed = await self._run(self._add_many, server, user, rows, replace)
+        if added or removed:
+            self._notify((added or removed)[0])  # 모두 같은 사용자의 스케줄
+        return added, removed
+
+    def _add_many(self, server, user, rows, replace):
+        conn = self._connection()
+        conn.execute("SAVEPOINT add_many")
+        try:
+            removed = []
+            if replace:
+                removed = self._query(f"{SELECT} WHERE server = ? AND user = ? ORDER BY id", (server, user))
+                conn.execute("DELETE FROM schedules WHERE server = ? AND user = ?", (server, user))
+            added = []
+            for row in rows:
+                schedule = {'server': server, 'channel': row['channel'], 'message': row['message'], 'user': user,
+                            'date': row['date'], 'interval': row['interval'], 'last': row.get('last', 0),
+                            'disabled': row.get('disabled', ""), 'rule': row.get('rule', "")}
+                cursor = conn.execute(
+                    "INSERT INTO schedules (server, channel, message, user, date, interval, last, disabled, rule, "
+                    "next_run) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (*schedule.values(), get_next_run(schedule))
+                )
+                added.append({'id': cursor.lastrowid, **schedule, 'version': 0})
+        except Exception:
+            conn.execute("ROLLBACK TO add_many")
+            raise
+        finally:
+            conn.execute("RELEASE add_many")
+        return added, removed
+
+    async def update(self, schedule, **changes):
+        """스케줄 필드를 수정합니다"""
+        schedule.update(changes)
+        schedule['version'] = schedule.get('version', 0) + 1
+        assignments = ', '.join(f"{key} = ?" for key in changes)
+        await self._run(self._execute,
+                        f"UPDATE schedules SET {assignments}, next_run = ?, version = version + 1 WHERE id = ?",
+                        (*changes.values(), get_next_run(schedule), schedule['id']))
+        self._notify(schedule)
+
+    async def update_many(self, updates):
+        """(스케줄, 바꿀 필드 dict) 목록을 한꺼번에 수정합니다 (같은 트랜잭션 안에서 실행)"""
+        statements = []
+        for schedule, changes in updates:
+            schedule.update(changes)
+            schedule['version'] = schedule.get('version', 0) + 1
+            assignments = ', '.join(f"{key} = ?" for key in changes)
+            statements.append((f"UPDATE schedules SET {assignments}, next_run = ?, version = version + 1 WHERE id = ?",
+                               (*changes.values(), get_next_run(schedule), schedule['id'])))
+        await self._run(self._execute_all, statements)
+        for schedule, _ in updates:
+            self._notify(schedule)
+
+    async def remove(self, schedule):
+        """스케줄을 삭제합니다"""
+        await self._run(self._execute, "DELETE FROM schedules WHERE id = ?", (schedule['id'],))
+        self._notify(schedule)
+
+    async def remove_many(self, schedules):
+        """여러 스케줄을 한꺼번에 삭제합니다"""
+        await self._run(self._execute_all, [("DELETE FROM schedules WHERE id = ?", (schedule['id'],))
+                                            for schedule in schedules])
+        for schedule in schedules:
+            self._notify(schedule)
+
+    async def count(self):
+        """전체 스케줄 수를 반환합니다"""
+        rows = await self._run(self._query, "SELECT COUNT(*) AS count FROM schedules")
+        return rows[0]['count']
+
+    async def fire_times(self, start=None, end=None):
+        """실행 시각이 (start, end] 범위인 활성 스케줄의 (ID, 서버, 사용자, 채널, 실행 시각) 목록을 반환합니다"""
+        sql = ("SELECT id, server, user, channel, next_run FROM schedules "
+               "WHERE next_run > ? AND next_run <= ? AND disabled = ''")
+        params = (-1 if start is None else start, 2 ** 62 if end is None else end)
+        if self.shards:
+            sql += f" AND (server >> 22) % ? IN ({', '.join('?' * len(self.shards.ids))})"
+            params += (self.shards.count, *self.shards.ids)
+        rows = await self._run(self._query, sql, params)
+        return [(row['id'], row['server'], row['user'], row['channel'], row['next_run']) for row in rows]
+
+    def _notify(self, schedule):
+        for listener in self.listeners:
+            listener(schedule)
+
+    async def commit(self):
+        """변경 사항을 커밋합니다"""
+        await self._run(self._commit)
+
+    def _commit(self):
+        if self._conn is not None:
+            self._conn.commit()
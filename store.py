@@ -0,0 +1,455 @@
+import asyncio
+import heapq
+import sys
+from collections import defaultdict, deque
+
+from recurrence import next_fire
+from sharding import shard_for_guild
+
+FIELDS = ('id', 'server', 'channel', 'message', 'user', 'date', 'interval', 'last', 'disabled', 'rule')
+BULK_CHUNK = 5000  # add_many가 이벤트 루프에 양보하기 전에 만드는 레코드 수
+RULE_LOOKBACKS = (3600, 86400, 31 * 86400)  # 오래 밀린 규칙 스케줄은 최근 이 기간(초) 안의 슬롯부터 살펴봄
+RULE_MAX_SLOTS = 10000  # 밀린 규칙 슬롯을 셀 때 살펴볼 최대 개수
+
+
+class Schedule:
+    """스케줄 한 개를 담는 __slots__ 레코드
+
+    dict 대신 쓰면 스케줄마다 드는 메모리가 크게 줄어들며, schedule['id']처럼 키로도
+    접근할 수 있어 기존 코드가 그대로 동작합니다. 같은 메시지 본문은 문자열 하나를 공유합니다.
+    """
+
+    __slots__ = FIELDS + ('version',)
+
+    def __init__(self, id, server, channel, message, user, date, interval, last=0, disabled="", rule=""):
+        self.id = id
+        self.server = server
+        self.channel = channel
+        self.message = sys.intern(message) if isinstance(message, str) else message
+        self.user = user
+        self.date = date
+        self.interval = interval
+        self.last = last
+        self.disabled = disabled  # 비활성화된 이유 (빈 문자열이면 활성)
+        self.rule = rule  # cron 반복 규칙 (빈 문자열이면 interval마다 반복)
+        self.version = 0  # 수정될 때마다 올라가는 번호 (저장하지 않으며 표시 내용 캐시의 키로 씀)
+
+    @classmethod
+    def from_dict(cls, data):
+        """dict 형태의 스케줄을 레코드로 변환합니다"""
+        if len(data) == len(FIELDS):
+            try:
+                return cls(**data)  # 스냅샷과 로그의 스케줄은 모든 필드를 가지고 있음
+            except TypeError:
+                pass
+        return cls(**{key: data[key] for key in FIELDS if key in data})
+
+    @classmethod
+    def from_rows(cls, fields, rows):
+        """스냅샷의 필드 이름 목록과 값 목록들을 레코드 목록으로 변환합니다"""
+        if tuple(fields) == FIELDS:
+            return [cls(*row) for row in rows]  # 중간 dict 없이 바로 만듦
+        return [cls.from_dict(dict(zip(fields, row))) for row in rows]
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in FIELDS:
+            raise KeyError(key)
+        if key == 'message' and isinstance(value, str):
+            value = sys.intern(value)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in FIELDS
+
+    def __repr__(self):
+        return f"Schedule({dict(self)!r})"
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self):
+        return FIELDS
+
+    def values(self):
+        """FIELDS 순서의 값 목록을 반환합니다 (스냅샷 행)"""
+        return [self.id, self.server, self.channel, self.message, self.user, self.date, self.interval, self.last,
+                self.disabled, self.rule]
+
+    def copy(self):
+        """dict 형태의 복사본을 반환합니다 (dict(schedule)보다 빠름)"""
+        return {'id': self.id, 'server': self.server, 'channel': self.channel, 'message': self.message,
+                'user': self.user, 'date': self.date, 'interval': self.interval, 'last': self.last,
+                'disabled': self.disabled, 'rule': self.rule}
+
+    def update(self, changes):
+        for key, value in changes.items():
+            self[key] = value
+
+
+def get_next_run(schedule):
+    """스케줄의 다음 실행 시각을 계산합니다
+
+    규칙 스케줄은 date를 기준으로 규칙에 맞는 첫 시각부터, 이후에는 직전 실행 다음 시각에 실행합니다.
+    규칙 계산 결과는 next_fire가 캐시하므로 같은 규칙과 직전 실행을 가진 스케줄은 다시 계산하지 않습니다.
+    """
+    rule = schedule.get('rule')
+    if rule:
+        return next_fire(rule, schedule['last'] if schedule['last'] > 0 else schedule['date'] - 1)
+    if schedule['last'] > 0:
+        return schedule['last'] + schedule['interval']
+    return schedule['date']
+
+
+def plan_run(schedule, now, policy="coalesce", replay_limit=1, grace=60):
+    """밀린 실행을 정책에 따라 처리할 방법을 정합니다
+
+    실행 시각은 date + k * interval 슬롯에 맞춰 계산되므로 늦게 실행되어도 밀리지 않습니다.
+    (전송 여부, last로 기록할 슬롯)을 반환합니다.
+    - skip: grace보다 오래 밀린 실행은 보내지 않고 건너뜀
+    - coalesce: 밀린 실행을 한 번으로 합쳐 보냄
+    - replay: 밀린 실행을 최근 replay_limit개까지 하나씩 다시 보냄
+    """
+    next_run = get_next_run(schedule)
+    if schedule.get('rule'):
+        slots = _rule_slots(schedule['rule'], next_run, now, replay_limit)
+        latest = slots[-1]
+        if policy == "replay":
+            return True, slots[0]
+    else:
+        interval = max(schedule['interval'], 1)
+        latest = next_run + (now - next_run) // interval * interval  # now 이전의 마지막 슬롯
+        if policy == "replay":
+            return True, max(next_run, latest - (replay_limit - 1) * interval)
+    if policy == "skip" and now - latest > grace:
+        return False, latest
+    return True, latest
+
+
+def _rule_slots(rule, next_run, now, count):
+    """next_run부터 now까지 규칙에 맞는 슬롯 중 마지막 count개를 반환합니다"""
+    count = max(count, 1)
+    for lookback in RULE_LOOKBACKS + (None,):  # 자주 도는 규칙은 짧은 기간만 보면 됨
+        if lookback is None or now - next_run <= lookback:
+            first = next_run
+        else:
+            first = next_fire(rule, now - lookback)
+            if first > now:
+                continue
+        slots = deque([first], maxlen=count)
+        slot = first
+        for _ in range(RULE_MAX_SLOTS):
+            slot = next_fire(rule, slot)
+            if slot > now:
+                break
+            slots.append(slot)
+        if len(slots) == count or first == next_run:  # 기간 안의 슬롯이 모자라면 더 긴 기간을 살펴봄
+            return slots
+
+
+class ScheduleStore:
+    """ID와 보조 인덱스(서버/사용자, 채널, 서버)로 스케줄을 관리하는 메모리 저장소
+
+    조회/수정 메서드는 SqliteScheduleStore와 같은 비동기 인터페이스를 따릅니다.
+    """
+
+    def __init__(self, log=None, shard_count=1):
+        self.log = log  # 변경 사항을 기록할 ScheduleLog (선택)
+        self.shard_count = shard_count  # 샤드마다 겹치지 않는 ID를 쓰도록 나눔
+        self._next_ids = {}  # 샤드 -> 다음 스케줄 ID 하한
+        self._min_id = 1  # 불러온 스케줄보다 큰 ID만 쓰도록 하는 하한
+        self._by_id = {}
+        self._by_user = defaultdict(dict)  # (서버 ID, 사용자 ID) -> {스케줄 ID: 스케줄}
+        self._by_channel = defaultdict(dict)  # 채널 ID -> {스케줄 ID: 스케줄}
+        self._by_server = defaultdict(dict)  # 서버 ID -> {스케줄 ID: 스케줄}
+        self.listeners = []  # 스케줄이 추가/수정/삭제될 때 호출할 콜백
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(list(self._by_id.values()))
+
+    def __contains__(self, schedule_id):
+        return schedule_id in self._by_id
+
+    async def get(self, schedule_id):
+        """ID로 스케줄을 찾습니다"""
+        return self._by_id.get(schedule_id)
+
+    async def find(self, schedule_id, guild_id, user_id):
+        """ID로 스케줄을 찾습니다 (본인 것만)"""
+        return self._by_user.get((guild_id, user_id), {}).get(schedule_id)
+
+    async def find_many(self, schedule_ids, guild_id, user_id):
+        """ID 목록 중 사용자의 스케줄만 ID 순으로 찾습니다 (ID 수에 비례)"""
+        bucket = self._by_user.get((guild_id, user_id), {})
+        return [bucket[schedule_id] for schedule_id in sorted(schedule_ids) if schedule_id in bucket]
+
+    async def user_schedules(self, guild_id, user_id):
+        """사용자의 스케줄 목록을 가져옵니다"""
+        return list(self._by_user.get((guild_id, user_id), {}).values())
+
+    async def user_page(self, guild_id, user_id, after_id=0, limit=10):
+        """ID가 after_id보다 큰 사용자의 스케줄을 ID 순으로 limit개까지 가져옵니다"""
+        bucket = self._by_user.get((guild_id, user_id), {})
+        ids = heapq.nsmallest(limit, (schedule_id for schedule_id in bucket if schedule_id > after_id))
+        return [bucket[schedule_id] for schedule_id in ids]
+
+    async def user_count(self, guild_id, user_id):
+        """사용자의 스케줄 수를 반환합니다"""
+        return len(self._by_user.get((guild_id, user_id), {}))
+
+    async def server_count(self, guild_id):
+        """서버의 스케줄 수를 반환합니다"""
+        return len(self._by_server.get(guild_id, {}))
+
+    async def server_counts(self):
+        """서버별 스케줄 수를 반환합니다"""
+        return {guild_id: len(bucket) for guild_id, bucket in self._by_server.items()}
+
+    async def iter_schedules(self, guild_id, user_id=None, batch_size=500):
+        """서버(또는 서버 안 사용자)의 스케줄을 ID 순으로 batch_size개씩 나눠 돌려줍니다"""
+        if user_id is None:
+            bucket = self._by_server.get(guild_id, {})
+        else:
+            bucket = self._by_user.get((guild_id, user_id), {})
+        ids = sorted(bucket)  # 도중에 삭제된 스케줄은 건너뜀
+        for start in range(0, len(ids), batch_size):
+            batch = [self._by_id[schedule_id] for schedule_id in ids[start:start + batch_size]
+                     if schedule_id in self._by_id]
+            if batch:
+                yield batch
+
+    async def channel_schedules(self, channel_id):
+        """채널의 스케줄 목록을 가져옵니다"""
+        return list(self._by_channel.get(channel_id, {}).values())
+
+    async def server_schedules(self, guild_id):
+        """서버의 스케줄 목록을 가져옵니다"""
+        return list(self._by_server.get(guild_id, {}).values())
+
+    async def add(self, server, channel, message, user, date, interval, last=0, rule=""):
+        """새 스케줄을 추가하고 반환합니다"""
+        schedule = Schedule(self._allocate_id(server), server, channel, message, user, date, interval, last,
+                            rule=rule)
+        self._index(schedule)
+        if self.log:
+            self.log.put(schedule)
+        self._notify(schedule)
+        return schedule
+
+    async def add_many(self, server, user, rows, replace=False):
+        """사용자의 스케줄을 한꺼번에 추가하고 (추가된 목록, 삭제된 목록)을 반환합니다
+
+        replace면 사용자의 기존 스케줄을 먼저 삭제합니다. 삭제와 추가는 로그에 한 레코드로 기록됩니다.
+        """
+        # 레코드는 이벤트 루프를 오래 막지 않도록 나눠서 만들고, 인덱스 반영은 한 번에 처리
+        ids = self._allocate_ids(server, len(rows))
+        added = []
+        for start in range(0, len(rows), BULK_CHUNK):
+            if start:
+                await asyncio.sleep(0)
+            for schedule_id, row in zip(ids[start:start + BULK_CHUNK], rows[start:start + BULK_CHUNK]):
+                added.append(Schedule(schedule_id, server, row['channel'], row['message'], user,
+                                      row['date'], row['interval'], row.get('last', 0),
+                                      row.get('disabled', ""), row.get('rule', "")))
+
+        removed = list(self._by_user.pop((server, user), {}).values()) if replace else []
+        for schedule in removed:
+            schedule_id = schedule.id
+            del self._by_id[schedule_id]
+            self._discard(self._by_channel, schedule.channel, schedule_id)
+            self._discard(self._by_server, server, schedule_id)
+
+        # 모두 같은 서버/사용자이므로 인덱스 버킷을 한 번만 찾음
+        user_bucket = self._by_user[(server, user)]
+        server_bucket = self._by_server[server]
+        for schedule in added:
+            schedule_id = schedule.id
+            self._by_id[schedule_id] = user_bucket[schedule_id] = server_bucket[schedule_id] = schedule
+            self._by_channel[schedule.channel][schedule_id] = schedule
+        for index, key in ((self._by_user, (server, user)), (self._by_server, server)):
+            if not index[key]:
+                del index[key]
+        if self.log:
+            self.log.put_many(added, removed)
+        if added or removed:
+            self._notify((added or removed)[0])  # 모두 같은 사용자의 스케줄
+        return added, removed
+
+    def restore(self, schedules, last_id=0):
+        """저장된 스케줄을 기록 없이 불러옵니다
+
+        시작할 때 전체 스케줄을 한 번에 불러오므로 _index 대신 인덱스에 직접 넣습니다.
+        """
+        by_id, by_user, by_channel, by_server = self._by_id, self._by_user, self._by_channel, self._by_server
+        for data in schedules:
+            schedule = data if type(data) is Schedule else Schedule.from_dict(data)
+            schedule_id, server = schedule.id, schedule.server
+            by_id[schedule_id] = by_user[(server, schedule.user)][schedule_id] = \
+                by_channel[schedule.channel][schedule_id] = by_server[server][schedule_id] = schedule
+            if schedule_id > last_id:
+                last_id = schedule_id
+        self._min_id = max(self._min_id, last_id + 1)
+
+    def clear(self):
+        """모든 스케줄을 기록 없이 지웁니다"""
+        self._by_id.clear()
+        self._by_user.clear()
+        self._by_channel.clear()
+        self._by_server.clear()
+
+    def apply(self, record):
+        """다른 프로세스가 기록한 로그 레코드를 기록 없이 반영하고 바뀐 스케줄 목록을 반환합니다"""
+        op = record['op']
+        if op == 'last':
+            schedule = self._by_id.get(record['id'])
+            if schedule is None:
+                return []
+            schedule['last'] = record['last']
+            schedule.version += 1
+            self._notify(schedule)
+            return [schedule]
+
+        if op == 'batch':
+            deleted, puts = record['del'], record['put']
+        elif op == 'put':
+            deleted, puts = (), [record['schedule']]
+        else:
+            deleted, puts = [record['id']], ()
+        changed = []
+        for schedule_id in deleted:
+            schedule = self._by_id.get(schedule_id)
+            if schedule is not None:
+                self._unindex(schedule)
+                schedule.version += 1
+                changed.append(schedule)
+        for data in puts:
+            schedule = Schedule.from_dict(data)
+            old = self._by_id.get(schedule['id'])
+            if old is not None:
+                self._unindex(old)
+                schedule.version = old.version + 1  # 이전 내용으로 만든 캐시를 쓰지 않도록
+            self._index(schedule)
+            self._min_id = max(self._min_id, schedule['id'] + 1)
+            changed.append(schedule)
+        for schedule in changed:
+            self._notify(schedule)
+        return changed
+
+    def _allocate_ids(self, server, count):
+        """같은 서버의 스케줄 count개에 쓸 ID를 한 번에 할당합니다"""
+        if not count:
+            return range(0)
+        first = self._allocate_id(server)
+        ids = range(first, first + count * self.shard_count, self.shard_count)
+        self._next_ids[shard_for_guild(server, self.shard_count)] = ids[-1] + 1
+        return ids
+
+    def _allocate_id(self, server):
+        """샤드 s의 스케줄에는 (ID - 1) % 샤드 수 == s 인 ID를 할당합니다"""
+        shard = shard_for_guild(server, self.shard_count)
+        candidate = max(self._next_ids.get(shard, 1), self._min_id)
+        schedule_id = candidate + (shard + 1 - candidate) % self.shard_count
+        self._next_ids[shard] = schedule_id + 1
+        return schedule_id
+
+    async def update(self, schedule, **changes):
+        """스케줄 필드를 수정하고 키가 바뀐 인덱스만 갱신합니다"""
+        self._apply_changes(schedule, changes)
+        if self.log:
+            if changes.keys() == {'last'}:
+                self.log.advance(schedule)
+            else:
+                self.log.put(schedule)
+        self._notify(schedule)
+
+    async def update_many(self, updates):
+        """(스케줄, 바꿀 필드 dict) 목록을 한꺼번에 수정합니다 (로그에 한 레코드로 기록)"""
+        for schedule, changes in updates:
+            self._apply_changes(schedule, changes)
+        if self.log and updates:
+            self.log.put_many([schedule for schedule, _ in updates])
+        for schedule, _ in updates:
+            self._notify(schedule)
+
+    def _apply_changes(self, schedule, changes):
+        old_keys = self._index_keys(schedule)
+        schedule.update(changes)
+        schedule.version += 1
+        schedule_id = schedule['id']
+        for (index, old_key), (_, new_key) in zip(old_keys, self._index_keys(schedule)):
+            if old_key != new_key:
+                self._discard(index, old_key, schedule_id)
+                index[new_key][schedule_id] = schedule
+
+    async def remove(self, schedule):
+        """스케줄을 삭제합니다"""
+        self._unindex(schedule)
+        schedule.version += 1
+        if self.log:
+            self.log.delete(schedule)
+        self._notify(schedule)
+
+    async def remove_many(self, schedules):
+        """여러 스케줄을 한꺼번에 삭제합니다 (로그에 한 레코드로 기록)"""
+        for schedule in schedules:
+            self._unindex(schedule)
+            schedule.version += 1
+        if self.log and schedules:
+            self.log.put_many([], schedules)
+        for schedule in schedules:
+            self._notify(schedule)
+
+    async def count(self):
+        """전체 스케줄 수를 반환합니다"""
+        return len(self._by_id)
+
+    async def fire_times(self, start=None, end=None):
+        """실행 시각이 (start, end] 범위인 활성 스케줄의 (ID, 서버, 사용자, 채널, 실행 시각) 목록을 반환합니다"""
+        entries = []
+        for schedule in self._by_id.values():
+            if schedule.disabled:
+                continue
+            next_run = get_next_run(schedule)
+            if (start is None or next_run > start) and (end is None or next_run <= end):
+                entries.append((schedule['id'], schedule['server'], schedule['user'], schedule['channel'], next_run))
+        return entries
+
+    async def commit(self):
+        """변경 사항이 디스크에 기록될 때까지 대기합니다"""
+        if self.log:
+            await self.log.commit()
+
+    def _notify(self, schedule):
+        for listener in self.listeners:
+            listener(schedule)
+
+    def _index_keys(self, schedule):
+        return ((self._by_user, (schedule['server'], schedule['user'])),
+                (self._by_channel, schedule['channel']),
+                (self._by_server, schedule['server']))
+
+    def _index(self, schedule):
+        schedule_id = schedule['id']
+        self._by_id[schedule_id] = schedule
+        for index, key in self._index_keys(schedule):
+            index[key][schedule_id] = schedule
+
+    def _unindex(self, schedule):
+        schedule_id = schedule['id']
+        del self._by_id[schedule_id]
+        for index, key in self._index_keys(schedule):
+            self._discard(index, key, schedule_id)
+
+    @staticmethod
+    def _discard(index, key, schedule_id):
+        bucket = index[key]
+        del bucket[schedule_id]
+        if not bucket:
+            del index[key]
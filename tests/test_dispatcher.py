@@ -0,0 +1,216 @@
+import asyncio
+
+from dispatcher import Dispatcher, RateLimiter, SendQueue, pack_messages
+
+
+def test_pop_due_in_time_order():
+    dispatcher = Dispatcher()
+    for key, when in (("c", 30), ("a", 10), ("b", 20)):
+        dispatcher.schedule(key, when, key.upper())
+    assert dispatcher.next_time() == 10
+    assert dispatcher.pop_due(20) == [("a", 10, "A"), ("b", 20, "B")]
+    assert dispatcher.pop_due(25) == []
+    assert len(dispatcher) == 1 and "c" in dispatcher
+
+
+def test_reschedule_and_cancel():
+    dispatcher = Dispatcher()
+    dispatcher.schedule("a", 10)
+    dispatcher.schedule("a", 50)  # 이전 힙 항목은 꺼낼 때 버림
+    dispatcher.schedule("b", 20)
+    dispatcher.cancel("b")
+    assert dispatcher.next_time() == 50
+    dispatcher.schedule("a", 10)  # 같은 시각으로 되돌려도 한 번만 꺼냄
+    assert dispatcher.pop_due(100) == [("a", 10, None)]
+    assert dispatcher.next_time() is None
+
+
+def test_same_time_does_not_grow_heap():
+    dispatcher = Dispatcher()
+    dispatcher.schedule("a", 10, 1)
+    for item in range(100):
+        dispatcher.schedule("a", 10, item)
+    assert len(dispatcher._heap) == 1
+    assert dispatcher.pop_due(10) == [("a", 10, 99)]  # 항목은 최신으로 바뀜
+
+
+def test_stale_entries_are_compacted():
+    dispatcher = Dispatcher()
+    for when in range(1000):
+        dispatcher.schedule("a", when)
+    assert len(dispatcher._heap) <= 2 * len(dispatcher) + 64
+
+
+def test_load_replaces_heap():
+    dispatcher = Dispatcher()
+    dispatcher.schedule("a", 50)
+    dispatcher.load([("a", 5, 1), ("b", 7, 2)])
+    assert dispatcher.pop_due(10) == [("a", 5, 1), ("b", 7, 2)]
+
+
+def test_complete_after_run():
+    dispatcher = Dispatcher()
+    dispatcher.schedule("a", 10, "item")
+    dispatcher.pop_due(10)
+    assert "a" not in dispatcher
+    dispatcher.complete("a", 70)  # 꺼낼 때의 항목을 그대로 등록
+    assert dispatcher.pop_due(70) == [("a", 70, "item")]
+    dispatcher.complete("a")
+    dispatcher.complete("a", 130)  # 이미 완료한 키는 다시 등록하지 않음
+    assert "a" not in dispatcher
+
+
+def test_complete_ignored_when_changed_while_running():
+    dispatcher = Dispatcher()
+    dispatcher.schedule("a", 10, "old")
+    dispatcher.schedule("b", 10)
+    dispatcher.pop_due(10)
+    dispatcher.schedule("a", 15, "new")  # 실행 중에 수정됨
+    dispatcher.cancel("b")  # 실행 중에 삭제됨
+    dispatcher.complete("a", 70)
+    dispatcher.complete("b", 70)
+    assert dispatcher.pop_due(100) == [("a", 15, "new")]
+
+
+def test_wait_due_returns_when_due():
+    now = [0]
+    dispatcher = Dispatcher(clock=lambda: now[0])
+
+    async def run():
+        waiter = asyncio.ensure_future(dispatcher.wait_due())
+        await asyncio.sleep(0)
+        assert not waiter.done()  # 비어 있으면 등록될 때까지 대기
+        now[0] = 10
+        dispatcher.schedule("a", 5)
+        await asyncio.wait_for(waiter, 1)
+
+    asyncio.run(run())
+
+
+class Sender:
+    """보낸 순서와 채널별 동시 전송 수를 기록하는 가짜 전송 함수"""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.sent = []
+        self.active = {}
+        self.peak = {}
+
+    async def __call__(self, job):
+        channel_id, value = job
+        self.active[channel_id] = self.active.get(channel_id, 0) + 1
+        self.peak[channel_id] = max(self.peak.get(channel_id, 0), self.active[channel_id])
+        await asyncio.sleep(self.delay)
+        self.active[channel_id] -= 1
+        if value == "fail":
+            raise RuntimeError(value)
+        self.sent.append(value)
+
+
+def jobs(*entries):
+    return [(guild_id, channel_id, (channel_id, value)) for guild_id, channel_id, value in entries]
+
+
+def test_send_queue_channel_cap():
+    async def run():
+        sender = Sender()
+        queue = SendQueue(sender, 8, channel_concurrency=2)
+        await queue.submit(jobs(*[(1, 10, i) for i in range(6)], *[(1, 20, i) for i in range(6, 9)]))
+        assert sender.peak == {10: 2, 20: 2}
+        assert sorted(sender.sent) == list(range(9)) and len(queue) == 0
+        await queue.close()
+
+    asyncio.run(run())
+
+
+def test_send_queue_slow_channel_does_not_block_others():
+    async def run():
+        sender = Sender()
+        queue = SendQueue(sender, 2)
+        slow = queue.submit(jobs(*[(1, 10, f"slow{i}") for i in range(5)]))
+        await queue.submit(jobs((2, 20, "fast")))
+        assert not slow.done() and "fast" in sender.sent
+        await slow
+        await queue.close()
+
+    asyncio.run(run())
+
+
+def test_send_queue_survives_errors_and_close_drops_queued():
+    async def run():
+        sender = Sender()
+        queue = SendQueue(sender, 1)
+        await queue.submit(jobs((1, 10, "fail"), (1, 10, "after")))  # 오류가 나도 워커가 계속 돎
+        assert sender.sent == ["after"]
+        queue.submit(jobs(*[(1, 10, i) for i in range(5)]))
+        await asyncio.sleep(0.005)
+        await queue.close()  # 보내는 중인 작업만 마침
+        assert sender.sent == ["after", 0] and len(queue) == 0
+
+    asyncio.run(run())
+
+
+def test_send_queue_round_robin_across_guilds():
+    async def run():
+        sender = Sender(delay=0)
+        queue = SendQueue(sender, 1)
+        # 서버 1의 채널 10에 작업이 몰려 있어도 서버 2와 서버 안의 다른 채널이 번갈아 나감
+        await queue.submit(jobs((1, 10, "a1"), (1, 10, "a2"), (1, 11, "b1"), (2, 20, "c1"), (2, 20, "c2")))
+        assert sender.sent == ["a1", "c1", "b1", "c2", "a2"]
+        await queue.close()
+
+    asyncio.run(run())
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_rate_limiter_bucket():
+    clock = Clock()
+    limiter = RateLimiter(60, clock)
+    for _ in range(60):  # 1분치는 바로 보냄
+        assert limiter.delay("g") == 0
+        limiter.take("g")
+    assert limiter.delay("g") == 1.0
+    assert limiter.delay("other") == 0  # 키마다 따로
+    clock.now += 0.5
+    assert limiter.delay("g") == 0.5
+    clock.now += 0.5
+    assert limiter.delay("g") == 0
+    assert RateLimiter(0, clock).delay("g") == 0  # 0이면 제한하지 않음
+
+
+def test_rate_limiter_compacts_full_buckets():
+    clock = Clock()
+    limiter = RateLimiter(60, clock)
+    for key in range(1024):
+        limiter.take(key)
+    clock.now += 2  # 처음 쓴 키들은 다시 가득 참
+    limiter.take("busy")  # 버킷 수가 한도를 넘어 정리됨
+    assert set(limiter._buckets) == {"busy"}
+    limiter.take("busy")
+    clock.now += 0.5
+    assert limiter._tokens("busy", clock.now) == 58.5
+
+
+def pack(lengths, limit=2000):
+    items = [str(i) * length for i, length in enumerate(lengths)]
+    return [[len(item) for item in chunk] for chunk in pack_messages(items, str, limit)]
+
+
+def test_pack_messages_limit_boundary():
+    assert pack([1000, 999]) == [[1000, 999]]  # 구분자까지 정확히 2000자
+    assert pack([1000, 1000]) == [[1000], [1000]]  # 2001자는 나눔
+    assert pack([2000, 1]) == [[2000], [1]]
+    assert pack([]) == []
+
+
+def test_pack_messages_first_fit_keeps_order():
+    assert pack([1500, 1200, 400, 700, 98]) == [[1500, 400, 98], [1200, 700]]
+    chunks = pack_messages(["a", "b", "c"], str, 2000, separator=" / ")
+    assert chunks == [["a", "b", "c"]]
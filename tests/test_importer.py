@@ -0,0 +1,126 @@
+import asyncio
+import gzip
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from export import export_row
+from importer import (INVALID_JSON, INVALID_VALUE, MISSING_FIELDS, PAST_DATE, QUOTA_EXCEEDED, UNKNOWN_CHANNEL,
+                      ImportValidator, iter_import_rows, open_import)
+from store import Schedule, ScheduleStore
+
+GUILD_ID = 1
+NOW = 1000
+
+
+def schedule(**changes):
+    data = {'channel': 10, 'message': "m", 'date': 2000, 'interval': 60}
+    data.update(changes)
+    return data
+
+
+class ShortReads(io.StringIO):
+    """요청보다 조금씩만 돌려주는 스트림 (청크 경계 확인용)"""
+
+    def read(self, size=-1):
+        return super().read(7)
+
+
+def rows(text, stream_type=io.StringIO):
+    return list(iter_import_rows(stream_type(text)))
+
+
+def get_channel(channel_id):
+    guild_id = {10: GUILD_ID, 20: 2}.get(channel_id)
+    return SimpleNamespace(guild=SimpleNamespace(id=guild_id)) if guild_id else None
+
+
+def test_formats():
+    data = [schedule(), schedule(message="n")]
+    expected = [(1, data[0]), (2, data[1])]
+    assert rows(json.dumps(data)) == expected
+    assert rows(json.dumps({'schedules': data, 'export_info': {}}, indent=4)) == expected
+    assert rows("\n".join(json.dumps(row) for row in data) + '\n{"export_info": {}}\n') == expected
+    assert rows(json.dumps(data, indent=4), ShortReads) == expected  # 청크 경계에서 잘린 값
+
+
+def test_gzip():
+    data = gzip.compress(json.dumps([schedule()]).encode())
+    assert list(iter_import_rows(open_import(data))) == [(1, schedule())]
+
+
+def test_empty_file():
+    with pytest.raises(ValueError):
+        rows(" \n")
+
+
+@pytest.mark.parametrize("text", ['{\n"foo": 1\n}', '{"foo": 1}', '{"foo": 1}\n' + json.dumps(schedule()),
+                                  '[{"channel": 1}', '{"schedules": [1, 2'])
+def test_broken_structure(text):
+    with pytest.raises(ValueError):
+        rows(text)
+
+
+def test_broken_ndjson_line_is_skipped():
+    text = json.dumps(schedule()) + '\n{"channel": \n' + json.dumps(schedule(message="n")) + '\n'
+    result = rows(text)
+    assert [row for row, _ in result] == [1, 2, 3]
+    accepted, skipped = ImportValidator(GUILD_ID, get_channel, NOW).check(result)
+    assert [data['message'] for data in accepted] == ["m", "n"]
+    assert skipped == [(2, INVALID_JSON)]
+
+
+@pytest.mark.parametrize("data, reason", [
+    (None, INVALID_JSON),
+    ([1, 2], MISSING_FIELDS),
+    ({'channel': 10, 'message': "m"}, MISSING_FIELDS),
+    ({'channel': 10, 'message': "m", 'date': 2000}, MISSING_FIELDS),
+    (schedule(channel=True), INVALID_VALUE),
+    (schedule(channel="10"), INVALID_VALUE),
+    (schedule(message=""), INVALID_VALUE),
+    (schedule(message="x" * 2001), INVALID_VALUE),
+    (schedule(interval=0), INVALID_VALUE),
+    (schedule(rule="0 0 30 2 *"), INVALID_VALUE),
+    (schedule(disabled=1), INVALID_VALUE),
+    (schedule(channel=20), UNKNOWN_CHANNEL),
+    (schedule(channel=30), UNKNOWN_CHANNEL),
+    (schedule(date=500), PAST_DATE),
+])
+def test_rejected_rows(data, reason):
+    accepted, skipped = ImportValidator(GUILD_ID, get_channel, NOW).check([(1, data)])
+    assert accepted == [] and skipped == [(1, reason)]
+
+
+def test_accepted_rows():
+    validator = ImportValidator(GUILD_ID, get_channel, NOW)
+    accepted, skipped = validator.check([(1, schedule(date=500, last=800)),
+                                        (2, schedule(rule="0  9 * *  MON", interval=60))])
+    assert skipped == []
+    assert accepted[0]['date'] == 500  # 이미 실행된 스케줄은 과거 시작 시각도 허용
+    assert accepted[1]['rule'] == "0 9 * * MON" and accepted[1]['interval'] == 0
+
+
+def test_quota():
+    validator = ImportValidator(GUILD_ID, get_channel, NOW, limit=2)
+    accepted, skipped = validator.check([(1, schedule()), (2, schedule(channel=20)), (3, schedule())])
+    assert len(accepted) == 2
+    accepted, skipped = validator.check([(4, schedule())])
+    assert accepted == [] and skipped == [(4, QUOTA_EXCEEDED)]
+
+
+def test_disabled_round_trip():
+    paused = Schedule(7, GUILD_ID, 10, "m", 5, 500, 60, disabled="일시 정지됨")  # 시작 시각이 지난 정지 스케줄
+    active = Schedule(8, GUILD_ID, 10, "n", 5, 2000, 60)
+    text = "\n".join(json.dumps(export_row(data), ensure_ascii=False) for data in (paused, active))
+    accepted, skipped = ImportValidator(GUILD_ID, get_channel, NOW).check(rows(text))
+    assert skipped == []
+    assert [data['disabled'] for data in accepted] == ["일시 정지됨", ""]
+
+    async def run():
+        store = ScheduleStore()
+        added, _ = await store.add_many(GUILD_ID, 5, accepted)
+        assert [data['disabled'] for data in added] == ["일시 정지됨", ""]
+
+    asyncio.run(run())
@@ -0,0 +1,93 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from lease import Lease, LeaseLost
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def leases(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / "lease.db")
+    first, second = Lease(path, ttl=10, clock=clock), Lease(path, ttl=10, clock=clock)
+    first.holder, second.holder = "first", "second"  # 한 프로세스 안에서 두 인스턴스처럼 동작
+    return first, second, clock, path
+
+
+def claimed_rows(path):
+    with sqlite3.connect(path) as conn:
+        return sorted(conn.execute("SELECT schedule_id, slot, token FROM claims"))
+
+
+def test_only_one_holder(tmp_path):
+    async def run():
+        first, second, clock, _ = leases(tmp_path)
+        assert await first.acquire() and first.token == 1
+        assert not await second.acquire()
+        clock.now += 5
+        assert await first.acquire() and first.token == 1  # 연장은 토큰을 바꾸지 않음
+        await first.release()
+        assert await second.acquire() and second.token == 2  # 넘겨주면 기다리지 않고 가져감
+
+    asyncio.run(run())
+
+
+def test_superseded_holder_is_fenced(tmp_path):
+    async def run():
+        first, second, clock, path = leases(tmp_path)
+        await first.acquire()
+        clock.now += 11  # first가 멈춘 사이 만료
+        assert await second.acquire() and second.token == 2
+        assert first.token == 1  # first는 아직 리스를 가졌다고 믿음
+        with pytest.raises(LeaseLost):
+            await first.claim([(1, 100)])
+        assert first.token is None
+        assert claimed_rows(path) == []
+
+    asyncio.run(run())
+
+
+def test_same_token_can_claim_again(tmp_path):
+    async def run():
+        first, _, _, path = leases(tmp_path)
+        await first.acquire()
+        assert await first.claim([(1, 100), (2, 100)]) == {(1, 100), (2, 100)}
+        assert await first.claim([(1, 100)]) == {(1, 100)}  # 전송 재시도
+        assert claimed_rows(path) == [(1, 100, 1), (2, 100, 1)]
+
+    asyncio.run(run())
+
+
+def test_slot_claimed_by_previous_holder_is_skipped(tmp_path):
+    async def run():
+        first, second, clock, path = leases(tmp_path)
+        await first.acquire()
+        assert await first.claim([(1, 100)]) == {(1, 100)}
+        clock.now += 11
+        await second.acquire()
+        assert await second.claim([(1, 100), (1, 160), (2, 100)]) == {(1, 160), (2, 100)}
+        assert claimed_rows(path) == [(1, 100, 1), (1, 160, 2), (2, 100, 2)]
+
+    asyncio.run(run())
+
+
+def test_prune_keeps_live_claims(tmp_path):
+    async def run():
+        first, second, clock, path = leases(tmp_path)
+        await first.acquire()
+        await first.claim([(1, 100), (1, 200), (2, 300)])
+        await first.prune(200)
+        assert claimed_rows(path) == [(1, 200, 1), (2, 300, 1)]
+        clock.now += 11
+        await second.acquire()
+        assert await second.claim([(1, 200), (1, 100)]) == {(1, 100)}  # 남은 claim은 계속 막음
+
+    asyncio.run(run())
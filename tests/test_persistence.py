@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from persistence import ScheduleLog
+from store import Schedule, ScheduleStore
+
+
+def open_store(directory):
+    log = ScheduleLog(directory, 0, Schedule.from_rows)
+    schedules, last_id = log.load()
+    store = ScheduleStore(log)
+    store.restore(schedules, last_id)
+    log.start()
+    return store, log
+
+
+def test_torn_tail_is_dropped(tmp_path):
+    async def write():
+        store, log = open_store(tmp_path)
+        for i in range(3):
+            await store.add(1, 2, f"m{i}", 4, 1000, 60)
+        await store.commit()
+
+    asyncio.run(write())
+    with open(log_path(tmp_path), 'a', encoding='utf-8') as f:
+        f.write('{"op":"put","schedule":{"id":4,')  # 기록 도중 중단
+    size = os.path.getsize(log_path(tmp_path))
+
+    schedules, last_id = ScheduleLog(tmp_path, 0).load()
+    assert sorted(schedule['id'] for schedule in schedules) == [1, 2, 3]
+    assert last_id == 3
+    assert os.path.getsize(log_path(tmp_path)) < size  # 잘린 줄은 잘라냄
+
+    async def append():
+        store, log = open_store(tmp_path)
+        await store.add(1, 2, "m3", 4, 1000, 60)
+        await store.commit()
+
+    asyncio.run(append())
+    schedules, last_id = ScheduleLog(tmp_path, 0).load()
+    assert [schedule['message'] for schedule in schedules] == ["m0", "m1", "m2", "m3"]
+
+
+def test_torn_tail_kept_without_repair(tmp_path):
+    os.makedirs(tmp_path, exist_ok=True)
+    with open(log_path(tmp_path), 'w', encoding='utf-8') as f:
+        f.write('{"op":"del","id":1}\n{"op":"del"')
+    size = os.path.getsize(log_path(tmp_path))
+    ScheduleLog(tmp_path, 0).load(False)
+    assert os.path.getsize(log_path(tmp_path)) == size
+
+
+def test_corrupt_middle_line_is_not_truncated(tmp_path):
+    os.makedirs(tmp_path, exist_ok=True)
+    with open(log_path(tmp_path), 'w', encoding='utf-8') as f:
+        f.write('{"op":"del","id":1}\n{"op":"del",\x00\n{"op":"del","id":2}\n')
+    size = os.path.getsize(log_path(tmp_path))
+    with pytest.raises(ValueError):
+        ScheduleLog(tmp_path, 0).load()
+    assert os.path.getsize(log_path(tmp_path)) == size  # 뒤의 기록을 잃지 않음
+
+
+def test_bad_last_line_with_newline_is_dropped(tmp_path):
+    os.makedirs(tmp_path, exist_ok=True)
+    with open(log_path(tmp_path), 'w', encoding='utf-8') as f:
+        f.write('{"op":"del","id":1}\n{"op":"del",\x00\n\n')
+    ScheduleLog(tmp_path, 0).load()
+    assert os.path.getsize(log_path(tmp_path)) == len('{"op":"del","id":1}\n')
+
+
+def test_compact_then_load(tmp_path):
+    async def write():
+        store, log = open_store(tmp_path)
+        schedules = [await store.add(1, 2, f"m{i}", 4, 1000, 60) for i in range(3)]
+        await store.update(schedules[0], last=1060)
+        await store.remove(schedules[-1])  # 가장 큰 ID 삭제
+        await store.commit()
+        await log.compact(store)
+        assert log.records == 0
+        await store.add(1, 2, "after", 4, 1000, 60)  # 스냅샷 이후 변경은 로그에 남음
+        await store.commit()
+
+    asyncio.run(write())
+    assert not os.path.exists(log_path(tmp_path) + ".1")
+    with open(os.path.join(tmp_path, "schedules.json"), encoding='utf-8') as f:
+        assert json.load(f)['last_id'] == 3
+
+    async def reload():
+        store, log = open_store(tmp_path)
+        assert [(s['id'], s['message'], s['last']) for s in sorted(store, key=lambda s: s['id'])] == \
+            [(1, "m0", 1060), (2, "m1", 0), (4, "after", 0)]
+        assert (await store.add(1, 2, "new", 4, 1000, 60))['id'] == 5  # 삭제된 ID를 다시 쓰지 않음
+
+    asyncio.run(reload())
+
+
+def test_compact_refused(tmp_path):
+    async def run():
+        store, log = open_store(tmp_path)
+        await store.add(1, 2, "m", 4, 1000, 60)
+        await store.commit()
+
+        async def lost():
+            return False
+
+        assert not await log.compact(store, lost)  # 리스를 잃었으면 로그를 교체하지 않음
+        assert log.records == 1
+
+    asyncio.run(run())
+    assert not os.path.exists(os.path.join(tmp_path, "schedules.json"))
+    assert [schedule['message'] for schedule in ScheduleLog(tmp_path, 0).load()[0]] == ["m"]
+
+
+def test_legacy_array_snapshot(tmp_path):
+    row = {'id': 7, 'server': 1, 'channel': 2, 'message': "m", 'user': 4, 'date': 1000, 'interval': 60,
+           'last': 0, 'disabled': "", 'rule': ""}
+    with open(os.path.join(tmp_path, "schedules.json"), 'w', encoding='utf-8') as f:
+        json.dump([row], f)
+    schedules, last_id = ScheduleLog(tmp_path, 0, Schedule.from_rows).load()
+    assert schedules == [row] and last_id == 7
+
+
+def log_path(directory):
+    return os.path.join(directory, "schedules.log")
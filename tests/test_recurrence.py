@@ -0,0 +1,43 @@
+import datetime
+
+import pytest
+
+from recurrence import compile_rule, next_fire
+
+
+def at(*args):
+    return int(datetime.datetime(*args).timestamp())
+
+
+def test_last_day_of_month():
+    assert next_fire("0 9 L * *", at(2027, 2, 1)) == at(2027, 2, 28, 9)
+    assert next_fire("0 9 L * *", at(2028, 2, 1)) == at(2028, 2, 29, 9)  # 윤년
+    assert next_fire("0 9 L * *", at(2026, 10, 31, 9)) == at(2026, 11, 30, 9)
+
+
+def test_nth_weekday():
+    assert next_fire("0 9 * * MON#1", at(2026, 10, 18)) == at(2026, 11, 2, 9)
+    assert next_fire("0 9 * * MON#1", at(2026, 11, 2, 9)) == at(2026, 12, 7, 9)
+
+
+def test_last_weekday():
+    assert next_fire("0 18 * * FRIL", at(2026, 10, 18)) == at(2026, 10, 30, 18)
+    assert next_fire("0 18 * * FRIL", at(2026, 10, 30, 18)) == at(2026, 11, 27, 18)
+    assert next_fire("0 18 * * 5L", at(2026, 10, 18)) == at(2026, 10, 30, 18)
+
+
+def test_february_29():
+    assert next_fire("0 0 29 2 *", at(2026, 10, 18)) == at(2028, 2, 29)
+    assert next_fire("0 0 29 2 *", at(2028, 2, 29)) == at(2032, 2, 29)
+
+
+def test_day_or_weekday():
+    # 일과 요일을 모두 지정하면 둘 중 하나만 맞아도 실행
+    assert next_fire("0 9 15 * MON", at(2026, 10, 13)) == at(2026, 10, 15, 9)
+    assert next_fire("0 9 15 * MON", at(2026, 10, 15, 9)) == at(2026, 10, 19, 9)
+
+
+@pytest.mark.parametrize("text", ["0 0 30 2 *", "0 9 * *", "0 9 * * MON#6", "60 * * * *"])
+def test_invalid_rules(text):
+    with pytest.raises(ValueError):
+        compile_rule(text)
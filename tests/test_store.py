@@ -0,0 +1,62 @@
+import asyncio
+import datetime
+
+import pytest
+
+import sqlite_store
+from sqlite_store import SqliteScheduleStore
+from store import ScheduleStore, plan_run
+
+
+def interval_schedule(date, interval, last=0):
+    return {'id': 1, 'date': date, 'interval': interval, 'last': last, 'rule': ""}
+
+
+def test_on_time_run():
+    schedule = interval_schedule(1000, 60)
+    for policy in ("skip", "coalesce", "replay"):
+        assert plan_run(schedule, 1000, policy) == (True, 1000)
+
+
+def test_coalesce_sends_latest_slot_once():
+    schedule = interval_schedule(1000, 60)
+    assert plan_run(schedule, 1400, "coalesce") == (True, 1360)
+
+
+def test_skip_drops_stale_runs():
+    schedule = interval_schedule(1000, 60)
+    assert plan_run(schedule, 1400, "skip", grace=30) == (False, 1360)
+    assert plan_run(schedule, 1380, "skip", grace=30) == (True, 1360)  # grace 안이면 보냄
+
+
+def test_replay_resends_recent_slots():
+    schedule = interval_schedule(1000, 60)
+    assert plan_run(schedule, 1400, "replay", replay_limit=3) == (True, 1240)
+    assert plan_run(schedule, 1400, "replay", replay_limit=100) == (True, 1000)  # 첫 슬롯보다 앞서지 않음
+    schedule['last'] = 1240
+    assert plan_run(schedule, 1400, "replay", replay_limit=3) == (True, 1300)
+
+
+def test_rule_slots():
+    start = int(datetime.datetime(2026, 10, 18, 9).timestamp())
+    schedule = {'id': 1, 'date': start, 'interval': 0, 'last': 0, 'rule': "0 * * * *"}
+    now = start + 3 * 3600 + 300
+    assert plan_run(schedule, now, "coalesce") == (True, start + 3 * 3600)
+    assert plan_run(schedule, now, "skip", grace=60) == (False, start + 3 * 3600)
+    assert plan_run(schedule, now, "replay", replay_limit=2) == (True, start + 2 * 3600)
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_find_many(tmp_path, backend, monkeypatch):
+    monkeypatch.setattr(sqlite_store, "ID_BATCH_SIZE", 2)  # 여러 쿼리로 나눠 읽는 경우
+
+    async def run():
+        store = ScheduleStore() if backend == "memory" else SqliteScheduleStore(str(tmp_path / "schedules.db"))
+        mine = [(await store.add(1, 10, f"m{i}", 5, 1000, 60))['id'] for i in range(5)]
+        other_user = (await store.add(1, 10, "other", 6, 1000, 60))['id']
+        other_server = (await store.add(2, 10, "other", 5, 1000, 60))['id']
+        found = await store.find_many({mine[4], mine[0], mine[2], other_user, other_server, 999}, 1, 5)
+        assert [schedule['id'] for schedule in found] == [mine[0], mine[2], mine[4]]
+        assert await store.find_many(set(), 1, 5) == []
+
+    asyncio.run(run())
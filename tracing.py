@@ -0,0 +1,166 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+_current = contextvars.ContextVar("span", default=None)
+
+
+class Tracer:
+    """작업을 span으로 나눠 시간을 재고, 느린 작업은 구간별 시간을 로그로 남기는 도구
+
+    span은 contextvars로 부모를 찾으므로 태스크로 나눠 실행되는 작업도 부모 span에 묶입니다.
+    꺼져 있으면 span()은 아무것도 기록하지 않습니다.
+    """
+
+    def __init__(self, enabled=False, slow_threshold=1.0, log=print):
+        self.enabled = enabled
+        self.slow_threshold = slow_threshold  # 이 시간(초)보다 오래 걸린 최상위 span을 로그로 남김
+        self.log = log
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """with 블록을 span 하나로 기록합니다"""
+        if not self.enabled:
+            yield None
+            return
+        parent = _current.get()
+        span = Span(name, attrs)
+        token = _current.set(span)
+        try:
+            yield span
+        finally:
+            _current.reset(token)
+            span.duration = time.perf_counter() - span.started
+            if parent is not None:
+                parent.children.append(span)
+            elif span.duration >= self.slow_threshold:
+                self.log("느린 작업: " + json.dumps(span.breakdown(), ensure_ascii=False))
+
+    def traced(self, name):
+        """비동기 함수를 span으로 감싸는 데코레이터를 반환합니다"""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+class Span:
+    __slots__ = ('name', 'attrs', 'started', 'duration', 'children')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.children = []
+
+    def breakdown(self):
+        """하위 span을 이름별로 묶어 (횟수, 합계, 최대) 시간을 정리합니다"""
+        parts = {}
+        for child in self._descendants():
+            part = parts.setdefault(child.name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            part["count"] += 1
+            part["total_ms"] += child.duration * 1000
+            part["max_ms"] = max(part["max_ms"], child.duration * 1000)
+        for part in parts.values():
+            part["total_ms"] = round(part["total_ms"], 3)
+            part["max_ms"] = round(part["max_ms"], 3)
+        # 바로 아래 span에 잡히지 않은 시간 (동시에 실행된 하위 작업이 있으면 음수일 수 있음)
+        untracked = self.duration - sum(child.duration for child in self.children)
+        return {"span": self.name, "ms": round(self.duration * 1000, 3), **self.attrs,
+                "untracked_ms": round(untracked * 1000, 3), "breakdown": parts}
+
+    def _descendants(self):
+        for child in self.children:
+            yield child
+            yield from child._descendants()
+
+
+class TracedProxy:
+    """대상 객체의 비동기 메서드 호출을 모두 span으로 감싸는 프록시"""
+
+    def __init__(self, target, tracer, prefix):
+        self._target = target
+        self._tracer = tracer
+        self._prefix = prefix
+        self._wrapped = {}
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if not inspect.iscoroutinefunction(value):
+            return value
+        wrapped = self._wrapped.get(name)
+        if wrapped is None:
+            wrapped = self._wrapped[name] = self._tracer.traced(f"{self._prefix}.{name}")(value)
+        return wrapped
+
+    def __len__(self):
+        return len(self._target)
+
+    def __iter__(self):
+        return iter(self._target)
+
+    def __contains__(self, item):
+        return item in self._target
+
+
+class SamplingProfiler:
+    """정해진 시간 동안 메인 스레드의 호출 스택을 주기적으로 수집해 파일로 저장하는 프로파일러
+
+    결과는 flamegraph.pl이나 speedscope가 읽는 "함수;함수;함수 횟수" 형식입니다.
+    """
+
+    def __init__(self, directory, interval=0.005):
+        self.directory = directory
+        self.interval = interval
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration, thread_id=None):
+        """duration초 동안 프로파일링을 시작하고 결과 파일 경로를 반환합니다 (이미 실행 중이면 None)"""
+        if self.running:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, time.strftime("profile-%Y%m%d-%H%M%S.txt"))
+        target = thread_id or threading.main_thread().ident
+        self._thread = threading.Thread(target=self._run, args=(duration, target, path),
+                                        name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return path
+
+    def _run(self, duration, thread_id, path):
+        stacks = Counter()
+        samples = 0
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                stacks[_collapse(frame)] += 1
+                samples += 1
+            time.sleep(self.interval)
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"프로파일 저장: {path} (샘플 {samples}개, {duration}초)")
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))